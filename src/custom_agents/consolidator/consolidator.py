@@ -7,6 +7,7 @@ from tools.transform.dataset import (
     append_cleaned_risk_column,
     finalize_and_clean_dataset
 )
+from tools.transform.matching import intersect_cooperatives, build_index_mapping
 from tools.formats.csv import get_csv_columns_headers
 from tools.utils.datetime import get_current_date
 from tools.github.push import push_to_public_repo
@@ -25,10 +26,9 @@ Tu OBJETIVO es generar `data/processed/dataset.csv` paso a paso, usando tu intel
 TU MISION:
 1. Recibirás una lista de `csv_files` y un `risk_csv` (que contiene las etiquetas).
 2. OBTENER INTERSECCIÓN Y REFERENCIA:
-   - Usa `get_first_column` para leer los nombres de cooperativas de TODOS los archivos.
-   - Calcula la INTERSECCIÓN de nombres (cooperativas presentes en todos).
-   - Elige la lista de nombres más "limpia" (generalmente la más corta) como referencia.
-   - Filtra esa lista para dejar solo los nombres que están en la intersección.
+   - Llama UNA VEZ a `intersect_cooperatives` pasando TODOS los archivos (csv_files + risk_csv).
+   - La herramienta normaliza los nombres (tildes, "LTDA", "COOPERATIVA DE AHORRO Y CREDITO", puntuación), elige la lista más corta como referencia y devuelve en `cooperatives` los nombres presentes en todos los archivos.
+   - Revisa `missing_by_file`: si ves nombres que claramente son la misma cooperativa escrita distinto, puedes reintentar con un `threshold` menor (ej: 0.8).
 
 3. CREAR DATASET BASE:
    - Genera una lista de ABREVIACIONES para esas cooperativas (ej: "JEP", "15ABR", etc.) usando tu criterio.
@@ -36,16 +36,15 @@ TU MISION:
 
 4. AGREGAR DATOS (Iterar por cada CSV excepto risk_csv):
    - Para cada archivo:
-     - Obtén su primera columna con `get_first_column`.
-     - Genera un `index_mapping`: una lista de enteros donde `mapping[i]` es el índice en el archivo origen que corresponde a la cooperativa `i` del dataset final.
-       - Si la cooperativa `i` del dataset es "Coop A" y en el archivo origen "Coop A" está en la fila 5, entonces `mapping[i] = 5`.
-       - Si no existe (no debería pasar si hiciste bien la intersección), usa -1.
+     - Llama a `build_index_mapping(reference_csv="data/processed/dataset.csv", source_csv=<archivo>)`.
+       - Devuelve `index_mapping` (una lista de enteros donde `mapping[i]` es el índice en el archivo origen que corresponde a la cooperativa `i` del dataset final, o -1), además de `intersection`, `unmatched_reference`, `unmatched_source` y `to_review`.
+       - Revisa `to_review` (coincidencias con puntaje < 0.95). Si alguna es incorrecta, cambia ese elemento del mapping a -1 (o al índice correcto usando `get_first_column`).
      - Llama a `append_aligned_columns` con ese mapping.
 
 5. AGREGAR LABEL (Risk CSV):
    - Usa `get_csv_columns_headers` en el `risk_csv`.
    - Identifica la columna de riesgo correcta basada en la fecha requerida (ej: "Junio 2025"). Usa `get_current_date` si necesitas contexto.
-   - Genera el `index_mapping` para el `risk_csv` (igual que en el paso 4).
+   - Genera el `index_mapping` para el `risk_csv` con `build_index_mapping` (igual que en el paso 4).
    - Llama a `append_cleaned_risk_column` pasando el nombre de la columna identificada y el mapping.
      - Esta herramienta aplicará automáticamente la limpieza (peor calificación, sin signos, etc.).
 
@@ -74,6 +73,8 @@ CRITICO:
 """,
     tools=[
         report_agent_start,
+        intersect_cooperatives,
+        build_index_mapping,
         get_first_column,
         create_dataset,
         append_aligned_columns,
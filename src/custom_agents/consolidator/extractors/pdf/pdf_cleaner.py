@@ -1,6 +1,7 @@
 from agents import Agent
 from tools.shared import report_agent_start, report_agent_completion
 from agents.model_settings import ModelSettings
+from tools.formats.table_store import FlushTablesHooks
 from tools.formats.csv import (
     get_csv_shape, 
     get_csv_columns_headers, 
@@ -10,7 +11,9 @@ from tools.formats.csv import (
     get_unique_column_values,
     rename_column,
     move_column_to_index,
-    normalize_csv_columns
+    normalize_csv_columns,
+    apply_csv_operations,
+    flush_csv
 )
 
 NAME = "Pdf Cleaner"
@@ -58,6 +61,19 @@ TU MISION:
         - Identifica filas que no son cooperativas reales (ej: "TOTAL", "FUENTE:", "ELABORADO POR:", etc).
         - Usa `delete_rows_by_values` (índice 0) para borrarlas.
 
+   MODO EN LOTE (PREFERIDO, MENOS LLAMADAS):
+     - Haz primero TODO el análisis sobre el archivo original (headers, valores únicos del segmento, filas basura de la columna de cooperativas) sin modificarlo.
+     - Luego aplica todos los cambios con UNA sola llamada a `apply_csv_operations`, en este orden:
+         1. {{"op": "delete_rows", "column_index": <índice columna segmento>, "values_to_delete": [...]}} (si aplica).
+         2. {{"op": "delete_rows", "column_index": <índice columna cooperativas>, "values_to_delete": [...]}}.
+         3. {{"op": "rename_column", "column_index": <índice columna cooperativas>, "new_name": "cooperativa"}} (si aplica).
+         4. {{"op": "delete_columns", "column_names": [...]}} (columnas basura).
+         5. {{"op": "move_column", "column_name": "cooperativa", "new_index": 0}} (si aplica).
+         6. {{"op": "normalize_columns"}}.
+         7. {{"op": "delete_columns", "column_names": ["segmento"]}} (opcional, tras filtrar).
+     - Los índices y nombres se refieren a la tabla tal como está justo antes de cada operación.
+     - Si la herramienta responde "No changes applied", corrige las operaciones indicadas y vuelve a llamarla.
+
 2. FINALIZACIÓN (OBLIGATORIO):
     - Llama a `report_agent_completion` pasando title="{TITLE}" y todo tu output.
 
@@ -67,6 +83,7 @@ CRITICO:
 - Si `target_segment` es "Segmento 1", borra todo lo que sea "Segmento 2", "Segmento 3", "Segmento 1 Especializado", etc. Solo manten el mismo target_segment puro.
 
 USO DE HERRAMIENTAS:
+- `apply_csv_operations` (preferido: todas las operaciones en una sola llamada)
 - `get_csv_columns_headers`
 - `delete_columns`
 - `rename_column`
@@ -75,6 +92,7 @@ USO DE HERRAMIENTAS:
 - `get_unique_column_values`
 - `delete_rows_by_values`
 - `get_csv_rows_headers`
+- `flush_csv` (los cambios se guardan automáticamente al terminar; úsalo solo si necesitas persistirlos antes)
 """,
     tools=[
       report_agent_start,
@@ -87,6 +105,9 @@ USO DE HERRAMIENTAS:
         rename_column,
         move_column_to_index,
         normalize_csv_columns,
+        apply_csv_operations,
+        flush_csv,
         report_agent_completion,
     ],
+    hooks=FlushTablesHooks(),
 )
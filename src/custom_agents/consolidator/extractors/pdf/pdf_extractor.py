@@ -1,13 +1,20 @@
+import asyncio
+import csv
 import os
-from agents import Agent, Runner, function_tool
+from agents import Agent, Runner
 from tools.shared import print_header, report_agent_completion
 from tools.shared import log
 from tools.formats.pdf import (
+    extract_pdf_tables,
     extract_text_from_pdf,
     file_to_base64,
+    prepare_pdf_for_model,
     save_csv_from_pdf,
-    update_csv_with_correction
+    update_csv_with_correction,
+    write_table_csv
 )
+from tools.utils.stage_cache import run_cached_stage_async
+from tools.utils.filesystem import materialize_member
 from custom_agents.consolidator.extractors.pdf.pdf_cleaner import pdf_cleaner
 
 NAME = "Pdf Extractor"
@@ -53,24 +60,158 @@ pdf_extractor = Agent(
     ]
 )
 
-@function_tool
-async def process_pdf(file_path: str, output_filename: str, target_segment: str = None) -> str:
-    """
-    Procesa un archivo PDF para extraer tablas y guardarlas como CSV.
+pdf_page_extractor = Agent(
+    name="Pdf Page Extractor",
+    model="gpt-5",
+    instructions="""
+    Eres un agente experto en extracción de datos de documentos PDF.
+    Parte de la tabla de este PDF ya fue extraída automáticamente; tu tarea es transcribir SOLO las filas de las páginas que se te indican, EXACTAMENTE como están.
     
-    Args:
-        file_path: Ruta al archivo PDF (ej: 'data/preprocessed/archivo.pdf').
-        output_filename: Nombre del archivo CSV de salida (ej: 'riesgo_junio_2025.csv').
-        target_segment: (Opcional) Segmento específico a filtrar (ej: "1").
+    FLUJO DE TRABAJO:
+    1. Analiza visualmente las páginas indicadas del PDF adjunto.
+    2. Guarda sus filas en formato CSV con `save_csv_from_pdf`, usando EXACTAMENTE el header que se te da (mismas columnas, mismo orden); en la primera columna `pagina` pon el número de página ORIGINAL de cada fila. No incluyas filas de otras páginas.
+    3. Llama a `extract_text_from_pdf` con `start_page`/`end_page` de esas páginas, compara los valores numéricos y de riesgo y corrige con `update_csv_with_correction` si hay discrepancias (sin cambiar la estructura).
+    4. Responde con un resumen corto de cuántas filas transcribiste.
+    """,
+    tools=[
+        save_csv_from_pdf,
+        extract_text_from_pdf,
+        update_csv_with_correction,
+    ]
+)
+
+def _pdf_message(file_path: str, prompt: str, pages: list = None) -> list:
+    """
+    Builds the model input for a PDF. Only the relevant pages (or `pages`) are uploaded, and the
+    prompt tells the model which original page numbers the attached file contains. The upload is embedded
+    as one base64 data URL (see `file_to_base64`), so its full encoding is held in memory.
+    """
+    upload_path, kept_pages = prepare_pdf_for_model(file_path, pages)
+    if upload_path != file_path:
+        prompt += (
+            f" NOTA: el PDF adjunto contiene SOLO las páginas {', '.join(str(p) for p in kept_pages)} del original (en ese orden); "
+            f"usa esos números de página originales con extract_text_from_pdf."
+        )
+    file_data = "data:application/pdf;base64," + file_to_base64(upload_path)
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "input_file",
+                    "file_data": file_data,
+                    "filename": os.path.basename(file_path),
+                }
+            ],
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+def _clean_prompt(output_filename: str, target_segment: str = None) -> str:
+    prompt = f"Limpia el archivo 'data/preprocessed/{output_filename}'."
+    if target_segment:
+        prompt += f" target_segment='{target_segment}'."
+    return prompt
+
+async def _extract_failed_pages(file_path: str, output_filename: str, header: list, pages: list) -> dict:
     """
+    Transcribes only `pages` with the vision model and returns their rows grouped by page (same header as the
+    deterministic table). The model prefixes every row with its page number so each page's rows can go back to
+    that page's place in the table; rows with an unusable page number go to the first failed page.
+    """
+    stem, _ = os.path.splitext(output_filename)
+    pages_filename = f"{stem}__paginas.csv"
+    pages_path = os.path.join("data/preprocessed", pages_filename)
+    pages_text = ", ".join(str(p) for p in pages)
+    prompt = (
+        f"Transcribe SOLO las filas de las páginas {pages_text} y guárdalas como '{pages_filename}'. "
+        f"Header: pagina,{','.join(header)}. La columna `pagina` es el número de página del PDF donde está cada fila. "
+        f"Verifica con extract_text_from_pdf('{file_path}', start_page={min(pages)}, end_page={max(pages)})."
+    )
+    await Runner.run(
+        starting_agent=pdf_page_extractor,
+        input=_pdf_message(file_path, prompt, pages),
+        max_turns=15
+    )
+    if not os.path.exists(pages_path):
+        raise RuntimeError(f"El agente no generó {pages_path}")
+    with open(pages_path, encoding="utf-8-sig", newline="") as f:
+        rows = [row for row in csv.reader(f) if any(cell.strip() for cell in row)]
+    os.remove(pages_path)
+    if rows and rows[0][1:] == header:
+        rows = rows[1:]
+
+    rows_by_page = {page: [] for page in pages}
+    for row in rows:
+        if len(row) != len(header) + 1:
+            continue
+        page = row[0].strip()
+        page = int(page) if page.isdigit() and int(page) in rows_by_page else min(pages)
+        rows_by_page[page].append(row[1:])
+    return rows_by_page
+
+async def _run_deterministic_extraction(file_path: str, output_filename: str, target_segment: str = None) -> str:
+    """
+    Fast path: pdfplumber table finder first; the vision model only sees the pages that failed the
+    confidence check. Returns None when no table could be extracted deterministically.
+    """
+    output_path = os.path.join("data/preprocessed", output_filename)
+    result = extract_pdf_tables(file_path)
+    header = result["header"]
+    rows_by_page = result["rows_by_page"]
+    if header is None or not rows_by_page:
+        return None
+    log(f"📐 Tabla extraída localmente: páginas OK {result['pages_ok']}, fallidas {result['pages_failed']}")
+
+    if result["pages_failed"]:
+        log(f"👁️ Transcribiendo con el modelo solo las páginas {result['pages_failed']}")
+        rows_by_page.update(await _extract_failed_pages(file_path, output_filename, header, result["pages_failed"]))
+
+    rows = [row for page in sorted(rows_by_page) for row in rows_by_page[page]]
+    write_table_csv(output_path, header, rows)
+    log(f"💾 CSV guardado en {output_path} ({len(rows)} filas, {len(header)} columnas)")
+
+    cleaned = await Runner.run(
+        starting_agent=pdf_cleaner,
+        input=_clean_prompt(output_filename, target_segment),
+        max_turns=15
+    )
+    return (
+        f"Tabla extraída de forma determinística ({len(rows)} filas; páginas por el modelo: {result['pages_failed'] or 'ninguna'}). "
+        f"Limpieza: {cleaned.final_output}"
+    )
+
+async def run_pdf_extraction(file_path: str, output_filename: str, target_segment: str = None) -> str:
     print_header(title=TITLE, description="Extracción de tablas de PDF")
     log(f"📄 Procesando PDF: {file_path} (Segmento: {target_segment})")
-    
+
+    try:
+        file_path = await asyncio.to_thread(materialize_member, file_path)
+    except RuntimeError as e:
+        return f"Error: {e}"
     if not os.path.exists(file_path):
         return f"Error: El archivo {file_path} no existe."
-        
+
+    return await run_cached_stage_async(
+        "pdf_extraction",
+        inputs=[file_path],
+        params={"output_filename": output_filename, "target_segment": target_segment},
+        outputs=[os.path.join("data/preprocessed", output_filename)],
+        run=lambda: _run_pdf_flow(file_path, output_filename, target_segment),
+    )
+
+async def _run_pdf_flow(file_path: str, output_filename: str, target_segment: str = None) -> str:
     try:
-        b64_file = file_to_base64(file_path)
+        try:
+            fast_result = await _run_deterministic_extraction(file_path, output_filename, target_segment)
+        except Exception as e:
+            log(f"⚠️ Extracción determinística falló, se usará el modelo: {e}")
+            fast_result = None
+        if fast_result is not None:
+            return f"Procesamiento de PDF completado. Resultado: {fast_result}"
         
         prompt = f"Extrae la tabla de este PDF y guárdala como '{output_filename}'. Luego verifica el texto con extract_text_from_pdf('{file_path}') y corrige si es necesario."
         if target_segment:
@@ -79,25 +220,9 @@ async def process_pdf(file_path: str, output_filename: str, target_segment: str
             prompt += f" Finalmente, usa clean_csvs pasando el archivo 'data/preprocessed/{output_filename}'."
         
         prompt += " Al finalizar todo, llama a report_agent_completion."
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "input_file",
-                        "file_data": f"data:application/pdf;base64,{b64_file}",
-                        "filename": os.path.basename(file_path),
-                    }
-                ],
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
         result = await Runner.run(
             starting_agent=pdf_extractor,
-            input=messages,
+            input=_pdf_message(file_path, prompt),
             max_turns=15
         )
                 
@@ -1,12 +1,15 @@
 from agents import Agent
 from tools.shared import report_agent_start, report_agent_completion
+from tools.formats.table_store import FlushTablesHooks
 from tools.formats.csv import (
     get_csv_shape, 
     get_csv_columns_headers, 
     get_csv_rows_headers, 
     delete_columns, 
     delete_rows_by_values,
-    get_unique_column_values
+    get_unique_column_values,
+    apply_csv_operations,
+    flush_csv
 )
 from tools.utils.filesystem import list_files_recursive
 
@@ -26,7 +29,7 @@ TU MISION:
 2. Lista los archivos CSV en esa carpeta usando `list_files_recursive`.
 3. PROCESAMIENTO SECUENCIAL ESTRICTO (UNO A LA VEZ):
    - NO intentes procesar todos los archivos al mismo tiempo.
-   - Toma el PRIMER archivo de la lista, procésalo COMPLETAMENTE (pasos a, b, c, d), y SOLO ENTONCES pasa al siguiente.
+   - Toma el PRIMER archivo de la lista, procésalo COMPLETAMENTE (pasos a, b, c, d, e), y SOLO ENTONCES pasa al siguiente.
 
    PROCESO POR ARCHIVO:
      a) OBTENER DIMENSIONES:
@@ -37,16 +40,14 @@ TU MISION:
         - Usa `get_csv_columns_headers(offset=..., limit=200)` iterativamente.
         - Para cada lote de columnas:
             - Identifica columnas redundantes o columnas que indiquen subdatos de otra columna por ejemplo "de n a n días", para borrarlas.
-            - Acumula los nombres de las columnas a borrar.
-            - Llama a `delete_columns` pasando la lista de columnas a eliminar de ese lote.
-            - ESPERA la confirmación de la herramienta (que incluye el nuevo shape) antes de continuar.
+            - Acumula los nombres de las columnas a borrar (NO las borres todavía, se aplican en el paso e).
 
      c) FILTRADO POR SEGMENTO (Si se proporcionó `target_segment`):
         - Busca si existe una columna llamada "Segmento" (o similar) en los headers que obtuviste.
         - Si existe:
           - Obtén sus valores únicos con `get_unique_column_values`.
           - Identifica los valores que NO coinciden con `target_segment`.
-          - Usa `delete_rows_by_values` en esa columna para eliminar las filas de los otros segmentos.
+          - Acumula el índice de esa columna y esos valores (se aplican en el paso e).
 
      d) ANÁLISIS Y LIMPIEZA DE FILAS:
         - Debes analizar la PRIMERA COLUMNA (índice 0) para encontrar filas basura.
@@ -54,10 +55,18 @@ TU MISION:
             - Itera con `offset=0`, `offset=200`, etc., usando `limit=200`.
             - Para cada lote de valores:
                 - Identifica valores que NO sean cooperativas (ej: "TOTAL", "FUENTE:", "GRUPO 1", celdas vacías).
-                - Llama a `delete_rows_by_values` pasando la lista de valores EXACTOS a borrar.
-                - ESPERA la confirmación de la herramienta antes de continuar.
+                - Acumula la lista de valores EXACTOS a borrar.
 
-     e) Solo cuando termines de limpiar un archivo (columnas y filas), pasa al siguiente.
+     e) APLICAR CAMBIOS EN LOTE (UNA SOLA LLAMADA POR ARCHIVO):
+        - Llama a `apply_csv_operations` con TODAS las operaciones acumuladas, en este orden:
+            1. {{"op": "delete_rows", "column_index": <índice columna segmento>, "values_to_delete": [...]}} (si aplica).
+            2. {{"op": "delete_rows", "column_index": 0, "values_to_delete": [...]}} (filas basura).
+            3. {{"op": "delete_columns", "column_names": [...]}} (columnas acumuladas de todos los lotes).
+        - Los índices se refieren a la tabla tal como está justo antes de cada operación; por eso las filas se borran antes que las columnas.
+        - Si la herramienta responde "No changes applied", corrige las operaciones indicadas y vuelve a llamarla.
+        - Usa `delete_columns` / `delete_rows_by_values` solo para correcciones puntuales posteriores.
+
+     f) Solo cuando termines de limpiar un archivo (columnas y filas), pasa al siguiente.
 
 4. FINALIZACIÓN (OBLIGATORIO):
     - Llama a `report_agent_completion` pasando title="{TITLE}" y todo tu output.
@@ -72,9 +81,11 @@ USO DE HERRAMIENTAS:
 - `get_csv_shape`: Ver tamaño del archivo.
 - `get_csv_columns_headers`: Ver nombres de columnas (con offset/limit).
 - `get_csv_rows_headers`: Ver valores de la primera columna (con offset/limit).
+- `apply_csv_operations`: Aplicar todas las operaciones de un archivo en una sola llamada (preferido).
 - `delete_columns`: Borrar lista de columnas.
 - `delete_rows_by_values`: Borrar lista de filas por valor.
 - `get_unique_column_values`: Ver valores únicos de una columna (para filtrar segmentos).
+- `flush_csv`: Guarda en disco los cambios pendientes (se guardan automáticamente al terminar, úsalo solo si necesitas persistirlos antes).
 
 Al finalizar, reporta qué archivos fueron limpiados.
 """,
@@ -87,6 +98,9 @@ Al finalizar, reporta qué archivos fueron limpiados.
         delete_columns,
         delete_rows_by_values,
         get_unique_column_values,
+        apply_csv_operations,
+        flush_csv,
         report_agent_completion,
     ],
+    hooks=FlushTablesHooks(),
 )
@@ -1,8 +1,16 @@
-from agents import Agent
+import os
+from agents import Agent, Runner
 from tools.shared import report_agent_start, report_agent_completion
 from tools.formats.excel import get_excel_sheet_names, read_excel_range, extract_features_to_csv
 from custom_agents.consolidator.extractors.xlsm.xlsm_cleaner import xlsm_cleaner
 from tools.transform.merger import merge_and_clean_csvs
+from tools.shared import log
+from tools.utils.stage_cache import run_cached_stage_async
+from custom_agents.consolidator.extractors.xlsm.xlsm_sheet_extractor import (
+    FEATURE_CRITERIA,
+    SHEET_EXTRACTION_STEPS,
+    extract_sheets_in_parallel,
+)
 
 NAME = "Xlsm Extractor"
 TITLE = f"[3/7] {NAME}"
@@ -15,58 +23,13 @@ Eres un agente experto en extracción de datos financieros de archivos Excel (.x
 PRIMERO: Llama a `report_agent_start` 1 vez, con title="{TITLE}" y una descripción corta.
 
 Tu objetivo es extraer exclusivamente **ratios financieros relevantes**, no montos brutos, no subtotales, no duplicados, y producir un dataset limpio y estandarizado.
-
-🏆 EXTRAER SOLO ESTOS TIPOS DE INDICADORES:
-
-1️⃣ Riesgo de cartera (clave)
-- Morosidad total
-- Morosidad de cartera productiva
-- Cartera improductiva
-- Cartera vencida
-- Cobertura de cartera problemática
-- Refinanciada / reestructurada
-
-2️⃣ Solvencia
-- Patrimonio técnico
-- Solvencia patrimonial
-- Patrimonio / activos
-- Activos productivos / total activos
-- Activos productivos / pasivos con costo
-
-3️⃣ Rentabilidad
-- ROA
-- ROE
-- Margen financiero
-- Margen de intermediación
-
-4️⃣ Eficiencia operativa
-- Gastos operativos / activos
-- Gastos administración / cartera
-- Productividad del personal
-
-5️⃣ Estructura / tamaño (solo ratios)
-- Cartera / activos
-- Depósitos / pasivos
-- Cartera / depósitos
-
-❗ PROHIBIDO EXTRAER:
-- Montos en dólares
-- Totales o subtotales
-- Variaciones (% crecimiento)
-- Filas duplicadas
-- Columnas que representen el mismo indicador desglosado por tipo (ej: “morosidad consumo”, “morosidad microcrédito”, etc.) si ya existe el general
-
-❗ SIEMPRE ESTANDARIZA NOMBRES:
-Convierte los nombres a snake_case, por ejemplo:
-- “Morosidad General (%)” → “morosidad_general”
-- “Patrimonio/Activos” → “patrimonio_sobre_activos”
-
-TU MISIÓN, OBLIGATORIAMENTE HACERLA DE MANERA SECUENCIAL:
+{FEATURE_CRITERIA}
+TU MISIÓN (los pasos 1 a 3 son solo de detección y planificación; en ellos NO extraigas datos):
 1. Recibirás la ruta de un archivo .xlsm y el nombre del archivo de salida (`output_filename`).
 2. Obtén la lista de hojas con `get_excel_sheet_names`.
-3. PROCESAMIENTO SECUENCIAL (Hoja por Hoja):
+3. DETECCIÓN Y PLANIFICACIÓN (revisa cada hoja, sin extraer todavía):
   - Solo analiza hojas que comiencen con un número (ej: "1. ...").
-    DETECCIÓN DE NUMERO DE DATA EXAMPLES y CONTEXTO DE CADA HOJ:
+    DETECCIÓN DE NUMERO DE DATA EXAMPLES y CONTEXTO DE CADA HOJA:
         - Lee un batch inicial (0,0) a (60,60) con `read_excel_range`.
         - Lee el contexto de la hoja (suele estar en las filas iniciales).
         - Busca la fila de headers (nombres de cooperativas). Esta es tu `fila_inicial`.
@@ -76,50 +39,21 @@ TU MISIÓN, OBLIGATORIAMENTE HACERLA DE MANERA SECUENCIAL:
         
         - Una vez tengas la columna inicial y final, toma en cuenta que (columna_final - columna_inicial) es el numero aproximado de data examples.
         - Cuando ya sepas los contextos de cada hoja y el numero aproximado de data examples, debes tomar en mente cuantos y cuales features (indicadores) vas a tratar de conseguir para crear un buen dataset para ML.
-        - Luego de tener ese plan, puedes ir al siguiente paso donde ahora si vas a ir a las hojas y extraer los features que consideres relevantes para el dataset.
+        - Con ese plan listo, pasa al paso 4, donde recién se extraen los features que consideres relevantes para el dataset.
         
-4. PROCESAMIENTO SECUENCIAL (Hoja por Hoja):
-   - Solo analiza hojas que comiencen con un número (ej: "1. ...").
-   - Para cada hoja donde detectaste estructura válida en el paso (3) y un contexto que te sirva para unas features de calidad (indicadores):
-     a) DETECCIÓN DE ESTRUCTURA:
-        - Lee un batch inicial (0,0) a (60,60) con `read_excel_range`.
-        - Busca la fila de headers (nombres de cooperativas). Esta es tu `fila_inicial`.
-        - Busca la columna de nombres de features (ej: "ACTIVOS", "FONDOS"). Esta es tu `columna_inicial`.
-        - Determina la `columna_fin` (última cooperativa).
-        - Si no encuentras estructura válida, descarta la hoja.
-
-     b) EXTRACCIÓN INCREMENTAL DE FEATURES:
-        - Define el archivo temporal para esta hoja: `data/preprocessed/temp/{{nombre_hoja}}.csv`.
-        - Itera leyendo batches de filas hacia abajo (ej: de 200 en 200) desde `fila_inicial` en la `columna_inicial` hasta `columna_inicial + 1` para ver si el nombre de la fila (feature) es un titulo sin datos a la derecha o efectivamente es un feature con datos a la derecha.
-        - En cada batch:
-          1. Identifica los índices de las filas que contienen features RELEVANTES según los criterios arriba.
-          2. Si encuentras filas relevantes, llama a `extract_features_to_csv` (siempre con el mismo nombre de archivo temporal `data/preprocessed/temp/{{nombre_hoja}}.csv`):
-             - `feature_row_indices`: Lista de índices encontrados en este batch.
-             - `header_row_index`: La `fila_inicial` detectada en el paso (a).
-             - `start_col`: La `columna_inicial`.
-             - `end_col`: La `columna_fin`.
-             - `output_csv_path`: El archivo temporal de esta hoja.
-             - `feature_name_map_json`: String JSON `{{"indice_fila": "nuevo_nombre_snake_case" }}` para renombrar features.
-               - ÚSALO para estandarizar nombres (ej: "Patrimonio / Activos" -> "patrimonio_sobre_activos").
-               - Si no lo usas, se aplicará una normalización automática básica.
-          3. Detente si encuentras indicadores de fin de tabla (Totales, notas, vacíos consecutivos).
-
-     c) Solo cuando termines con la hoja actual, pasa a la siguiente.
-
-   ⚠️ CRITICO SOBRE LA EXTRACCIÓN:
-   - La data de un indicador SIEMPRE está en la MISMA FILA que su nombre.
-   - Si encuentras "Morosidad" en la fila 10, los datos ESTÁN en la fila 10.
-   - NO asumas que los datos están en la fila siguiente.
-   - NO sumes 1 al índice de la fila. Usa el índice EXACTO donde encontraste el nombre.
-   - Si el valor en Excel es un porcentaje (ej: 87.5%), extrae el valor numérico decimal (0.875). Esto es CORRECTO para Machine Learning. No lo multipliques por 100.
-
-4. LIMPIEZA FINAL (OBLIGATORIO):
+4. EXTRACCIÓN EN PARALELO (Hojas independientes):
+   - Llama UNA VEZ a `extract_sheets_in_parallel` con `excel_path` y la lista `sheets` de las hojas donde detectaste estructura válida en el paso (3) y un contexto que te sirva para unas features de calidad (indicadores).
+     - Para cada hoja pasa `sheet_name` y en `notes` tu plan para esa hoja (qué indicadores buscar, `fila_inicial`, `columna_inicial` y `columna_fin` si ya los detectaste).
+   - Cada hoja la procesa un sub-agente (pasos a y b de abajo) que escribe `data/preprocessed/temp/{{nombre_hoja}}.csv`; la herramienta responde cuando TODAS terminaron.
+   - Si alguna hoja falla o quedó incompleta, procésala tú manualmente con los pasos a y b, usando el archivo temporal `data/preprocessed/temp/{{nombre_hoja}}.csv`:
+{SHEET_EXTRACTION_STEPS}
+5. LIMPIEZA FINAL (OBLIGATORIO):
    - Una vez hayas procesado TODAS las hojas y generado los CSVs, DEBES llamar al agente `clean_csvs`.
    - Pásale la ruta de la carpeta donde guardaste los archivos: `data/preprocessed/temp/`.
    - Si recibiste un `target_segment`, PÁSALO también a `clean_csvs`.
    - Este paso es CRÍTICO para entregar datos de calidad.
 
-5. UNIFICACIÓN FINAL (MERGE):
+6. UNIFICACIÓN FINAL (MERGE):
    - UNA VEZ que `clean_csvs` haya terminado exitosamente.
    - EJECUTA `merge_and_clean_csvs`.
    - Parámetros:
@@ -128,12 +62,12 @@ TU MISIÓN, OBLIGATORIAMENTE HACERLA DE MANERA SECUENCIAL:
      - output_filename: El nombre del archivo de salida (`output_filename`) que se te proporcionó al inicio.
    - Esta herramienta unificará todos los CSVs en uno solo, usando la primera columna como llave primaria, y limpiará columnas vacías o constantes.
 
-6. FINALIZACIÓN (OBLIGATORIO):
+7. FINALIZACIÓN (OBLIGATORIO):
     - Llama a `report_agent_completion` pasando title="{TITLE}" y todo tu output.
 
 CRITICO:
 - NO extraigas toda la tabla. Solo las filas relevantes.
-- Usa `extract_features_to_csv` para ir construyendo el CSV columna por columna (feature por feature).
+- Prefiere `extract_sheets_in_parallel`; si extraes a mano, usa `extract_features_to_csv` para ir construyendo el CSV columna por columna (feature por feature).
 - La primera vez que llames a `extract_features_to_csv` para una hoja, se creará el archivo con la columna 'cooperativa'.
 """,
     tools=[
@@ -141,6 +75,7 @@ CRITICO:
         get_excel_sheet_names,
         read_excel_range,
         extract_features_to_csv,
+        extract_sheets_in_parallel,
         xlsm_cleaner.as_tool(
             tool_name="clean_csvs",
             tool_description="Limpia y refina los archivos CSV generados, eliminando columnas redundantes, filas inválidas y filtrando por segmento si es necesario.",
@@ -150,3 +85,31 @@ CRITICO:
         report_agent_completion,
     ],
 )
+
+async def run_xlsm_extraction(file_path: str, output_filename: str, target_segment: str = None) -> str:
+    """
+    Runs the XlsmExtractor agent on one workbook, outside of any agent's tool loop (used by the extract stage).
+    """
+    log(f"📊 Procesando XLSM: {file_path} (Segmento: {target_segment})")
+    return await run_cached_stage_async(
+        "xlsm_extraction",
+        inputs=[file_path],
+        params={"output_filename": output_filename, "target_segment": target_segment},
+        outputs=[os.path.join("data/preprocessed", output_filename)],
+        run=lambda: _run_xlsm_agent(file_path, output_filename, target_segment),
+    )
+
+async def _run_xlsm_agent(file_path: str, output_filename: str, target_segment: str = None) -> str:
+    prompt = f"Procesa el archivo '{file_path}' y genera output_filename='{output_filename}'."
+    if target_segment:
+        prompt += f" target_segment='{target_segment}'."
+    try:
+        result = await Runner.run(
+            starting_agent=xlsm_extractor,
+            input=prompt,
+            max_turns=40,
+        )
+        return f"Procesamiento de XLSM completado. Resultado: {result.final_output}"
+    except Exception as e:
+        print(f"Error procesando XLSM: {str(e)}")
+        return f"Error procesando XLSM: {str(e)}"
@@ -0,0 +1,170 @@
+import asyncio
+import os
+import shutil
+from typing import List, Optional
+from pydantic import BaseModel
+from agents import Agent, Runner, function_tool
+from tools.shared import log
+from tools.formats.excel import read_excel_range, extract_features_to_csv
+from tools.formats.workbook_cache import prefetch_sheets
+
+NAME = "Xlsm Sheet Extractor"
+
+TEMP_FOLDER = "data/preprocessed/temp"
+STAGING_FOLDER = os.path.join(TEMP_FOLDER, "_staging")
+SHEET_CONCURRENCY = int(os.getenv("XLSM_SHEET_CONCURRENCY", "4"))
+
+FEATURE_CRITERIA = """
+🏆 EXTRAER SOLO ESTOS TIPOS DE INDICADORES:
+
+1️⃣ Riesgo de cartera (clave)
+- Morosidad total
+- Morosidad de cartera productiva
+- Cartera improductiva
+- Cartera vencida
+- Cobertura de cartera problemática
+- Refinanciada / reestructurada
+
+2️⃣ Solvencia
+- Patrimonio técnico
+- Solvencia patrimonial
+- Patrimonio / activos
+- Activos productivos / total activos
+- Activos productivos / pasivos con costo
+
+3️⃣ Rentabilidad
+- ROA
+- ROE
+- Margen financiero
+- Margen de intermediación
+
+4️⃣ Eficiencia operativa
+- Gastos operativos / activos
+- Gastos administración / cartera
+- Productividad del personal
+
+5️⃣ Estructura / tamaño (solo ratios)
+- Cartera / activos
+- Depósitos / pasivos
+- Cartera / depósitos
+
+❗ PROHIBIDO EXTRAER:
+- Montos en dólares
+- Totales o subtotales
+- Variaciones (% crecimiento)
+- Filas duplicadas
+- Columnas que representen el mismo indicador desglosado por tipo (ej: “morosidad consumo”, “morosidad microcrédito”, etc.) si ya existe el general
+
+❗ SIEMPRE ESTANDARIZA NOMBRES:
+Convierte los nombres a snake_case, por ejemplo:
+- “Morosidad General (%)” → “morosidad_general”
+- “Patrimonio/Activos” → “patrimonio_sobre_activos”
+"""
+
+SHEET_EXTRACTION_STEPS = """
+     a) DETECCIÓN DE ESTRUCTURA:
+        - Lee un batch inicial (0,0) a (60,60) con `read_excel_range`.
+        - Busca la fila de headers (nombres de cooperativas). Esta es tu `fila_inicial`.
+        - Busca la columna de nombres de features (ej: "ACTIVOS", "FONDOS"). Esta es tu `columna_inicial`.
+        - Determina la `columna_fin` (última cooperativa).
+        - Si no encuentras estructura válida, descarta la hoja.
+
+     b) EXTRACCIÓN INCREMENTAL DE FEATURES:
+        - Itera leyendo batches de filas hacia abajo (ej: de 200 en 200) desde `fila_inicial` en la `columna_inicial` hasta `columna_inicial + 1` para ver si el nombre de la fila (feature) es un titulo sin datos a la derecha o efectivamente es un feature con datos a la derecha.
+        - En cada batch:
+          1. Identifica los índices de las filas que contienen features RELEVANTES según los criterios arriba.
+          2. Si encuentras filas relevantes, llama a `extract_features_to_csv` (siempre con el mismo archivo temporal de la hoja):
+             - `feature_row_indices`: Lista de índices encontrados en este batch.
+             - `header_row_index`: La `fila_inicial` detectada en el paso (a).
+             - `start_col`: La `columna_inicial`.
+             - `end_col`: La `columna_fin`.
+             - `output_csv_path`: El archivo temporal de esta hoja.
+             - `feature_name_map_json`: String JSON `{"indice_fila": "nuevo_nombre_snake_case" }` para renombrar features.
+               - ÚSALO para estandarizar nombres (ej: "Patrimonio / Activos" -> "patrimonio_sobre_activos").
+               - Si no lo usas, se aplicará una normalización automática básica.
+          3. Detente si encuentras indicadores de fin de tabla (Totales, notas, vacíos consecutivos).
+
+   ⚠️ CRITICO SOBRE LA EXTRACCIÓN:
+   - La data de un indicador SIEMPRE está en la MISMA FILA que su nombre.
+   - Si encuentras "Morosidad" en la fila 10, los datos ESTÁN en la fila 10.
+   - NO asumas que los datos están en la fila siguiente.
+   - NO sumes 1 al índice de la fila. Usa el índice EXACTO donde encontraste el nombre.
+   - Si el valor en Excel es un porcentaje (ej: 87.5%), extrae el valor numérico decimal (0.875). Esto es CORRECTO para Machine Learning. No lo multipliques por 100.
+"""
+
+xlsm_sheet_extractor = Agent(
+    name=NAME,
+    model="gpt-5",
+    instructions=f"""
+Eres un agente experto en extracción de datos financieros de UNA hoja de un archivo Excel (.xlsm), para generar un dataset para ser analizado con Machine Learning.
+Otros agentes procesan las demás hojas en paralelo: trabaja SOLO sobre la hoja que se te indica.
+
+Tu objetivo es extraer exclusivamente **ratios financieros relevantes**, no montos brutos, no subtotales, no duplicados.
+{FEATURE_CRITERIA}
+Recibirás: `excel_path`, `sheet_name`, `output_csv_path` (el archivo temporal de esta hoja) y opcionalmente notas del plan general (qué indicadores buscar en esta hoja).
+
+PASOS:
+{SHEET_EXTRACTION_STEPS}
+Al terminar, responde con un resumen corto: estructura detectada y lista de features extraídos (o por qué descartaste la hoja).
+""",
+    tools=[
+        read_excel_range,
+        extract_features_to_csv,
+    ],
+)
+
+class SheetTask(BaseModel):
+    sheet_name: str
+    notes: Optional[str] = None
+
+async def _extract_sheet(excel_path: str, task: SheetTask, semaphore: asyncio.Semaphore) -> str:
+    async with semaphore:
+        staged_path = os.path.join(STAGING_FOLDER, f"{task.sheet_name}.csv")
+        final_path = os.path.join(TEMP_FOLDER, f"{task.sheet_name}.csv")
+        if os.path.exists(staged_path):
+            os.remove(staged_path)
+
+        prompt = f"excel_path='{excel_path}', sheet_name='{task.sheet_name}', output_csv_path='{staged_path}'."
+        if task.notes:
+            prompt += f" Notas del plan: {task.notes}"
+        log(f"🧵 Extrayendo hoja '{task.sheet_name}'")
+        result = await Runner.run(starting_agent=xlsm_sheet_extractor, input=prompt, max_turns=25)
+
+        if not os.path.exists(staged_path):
+            return f"{task.sheet_name}: sin features extraídos. {result.final_output}"
+        # The staged CSV only becomes visible to the cleaner/merge once the sheet is complete.
+        os.replace(staged_path, final_path)
+        return f"{task.sheet_name}: OK -> {final_path}. {result.final_output}"
+
+@function_tool
+async def extract_sheets_in_parallel(excel_path: str, sheets: List[SheetTask], max_concurrency: int = SHEET_CONCURRENCY) -> str:
+    """
+    Extrae features de varias hojas en paralelo: las hojas se parsean en un pool de procesos y luego
+    un sub-agente por hoja genera `data/preprocessed/temp/{nombre_hoja}.csv`. Responde cuando TODAS terminaron.
+
+    Args:
+        excel_path: Ruta al archivo .xlsm.
+        sheets: Hojas a procesar, cada una con `sheet_name` y `notes` opcionales (qué indicadores buscar según tu plan).
+        max_concurrency: Máximo de hojas procesándose a la vez (por defecto 4, configurable con XLSM_SHEET_CONCURRENCY).
+    """
+    log(f"🚦 Extrayendo {len(sheets)} hojas de {excel_path} (máx. {max_concurrency} simultáneas)")
+    os.makedirs(STAGING_FOLDER, exist_ok=True)
+    try:
+        await asyncio.to_thread(prefetch_sheets, excel_path, [s.sheet_name for s in sheets])
+    except Exception as e:
+        log(f"⚠️ Parseo paralelo falló, las hojas se leerán bajo demanda: {e}")
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    try:
+        results = await asyncio.gather(
+            *(_extract_sheet(excel_path, task, semaphore) for task in sheets),
+            return_exceptions=True,
+        )
+    finally:
+        shutil.rmtree(STAGING_FOLDER, ignore_errors=True)
+
+    lines = [
+        f"- {task.sheet_name}: ERROR {result}" if isinstance(result, BaseException) else f"- {result}"
+        for task, result in zip(sheets, results)
+    ]
+    return "Extracción por hojas completada:\n" + "\n".join(lines)
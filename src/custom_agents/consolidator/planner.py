@@ -0,0 +1,55 @@
+from typing import List, Literal, Optional
+from pydantic import BaseModel
+from agents import Agent
+from agents.model_settings import ModelSettings
+from tools.utils.filesystem import list_files_recursive, read_json_file
+from tools.utils.manifest import get_manifest
+from tools.utils.datetime import get_current_date
+
+NAME = "Extraction Planner"
+
+class ExtractionJob(BaseModel):
+    kind: Literal["xlsm", "pdf"]
+    file_path: str
+    output_filename: str
+    target_segment: Optional[str] = None
+
+class ExtractionPlan(BaseModel):
+    jobs: List[ExtractionJob]
+    risk_output_filename: str
+    required_date: str
+
+extraction_planner = Agent(
+    name=NAME,
+    model="gpt-4.1",
+    instructions="""
+Eres un agente PLANIFICADOR. No extraes datos: decides QUÉ archivos hay que extraer para cumplir el objetivo del usuario.
+
+- Los archivos descargados están en `data/raw/`. Los ZIP NO se descomprimen: `get_manifest` lista su contenido (`members`) y cada miembro trae un `path` ('data/raw/archivo.zip::carpeta/archivo.xlsm') que debes usar TAL CUAL como `file_path` del trabajo. Los .xlsm se leen directamente desde el zip y los .pdf se extraen solos cuando hacen falta.
+- Llama PRIMERO a `get_manifest` (sin carpetas): en una sola llamada te da todos los archivos de `data/raw/` y `data/preprocessed/` con su tipo real, su descripción de `download_summary.json`, las hojas de cada Excel, las páginas de cada PDF y el contenido de cada ZIP.
+- Usa `list_files_recursive` o `read_json_file` solo si el manifiesto no te basta.
+
+DEVUELVE un plan con:
+- `jobs`: un trabajo por archivo final a extraer (.xlsm o .pdf):
+  - `kind`: "xlsm" o "pdf".
+  - `file_path`: ruta exacta del archivo, o el `path` del miembro del zip tal como aparece en el manifiesto.
+  - `output_filename`: nombre del CSV de salida (ej: "2025-EEFF-MEN.csv", "riesgo_junio_2025.csv"). Debe ser único.
+  - `target_segment`: el segmento del objetivo si el archivo contiene varios segmentos (ej: "Segmento 1"), si no, vacío.
+- `risk_output_filename`: el `output_filename` del trabajo que contiene las calificaciones de riesgo.
+- `required_date`: la fecha requerida por el objetivo (ej: "Junio 2025"). Usa `get_current_date` si el objetivo dice "más reciente".
+
+NOTA:
+- No incluyas archivos que no correspondan al objetivo (ej: si piden Segmento 1, ignora archivos solo de Segmento 2).
+- Si hay varios cortes del mismo archivo, elige el más reciente.
+""",
+    tools=[
+        get_manifest,
+        list_files_recursive,
+        read_json_file,
+        get_current_date,
+    ],
+    output_type=ExtractionPlan,
+    model_settings=ModelSettings(
+        temperature=0.1,
+    ),
+)
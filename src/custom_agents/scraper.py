@@ -2,7 +2,8 @@ from agents import Agent
 from agents.model_settings import ModelSettings
 from tools.shared import report_agent_start
 
-from tools.internet.search import internet_search
+from tools.internet.search import internet_search, internet_search_many
+from tools.internet.crawler import crawl_links
 from tools.browser.navigation import (
 	browser_open,
 	browser_click,
@@ -10,17 +11,20 @@ from tools.browser.navigation import (
 	browser_wait,
 	browser_scroll,
 	browser_eval,
+	browser_list_pages,
+	browser_close_page,
     browser_close,
 )
 from tools.browser.extraction import (
 	browser_get_text,
 	browser_get_links,
+	browser_extract_tables,
 )
 from tools.browser.download import (
 	download_file,
 	browser_download_from_click,
 )
-from tools.utils.http import inspect_download_url
+from tools.utils.http import inspect_download_url, inspect_download_urls
 from tools.utils.datetime import get_current_date
 from tools.utils.file_logging import save_download_summary
 from tools.utils.filesystem import clear_directories
@@ -60,6 +64,7 @@ Siempre que el objetivo mencione "más reciente", "último", "actual" o similar:
 1) INVESTIGACIÓN
 - Si NO recibes una URL exacta y verificable en el objetivo, DEBES usar internet_search() antes de intentar cualquier browser_open().
 - Incluso si crees saber la URL, debes validarla primero con internet_search().
+- Si necesitas varias búsquedas (ej: el portal de estadísticas Y la página de calificaciones de riesgo), haz UNA llamada a internet_search_many() con todas las consultas en lugar de varias llamadas a internet_search(). Los resultados se guardan en caché, así que repetir una búsqueda ya hecha es instantáneo.
 - Prioriza buscar primero si hay una entidad oficial que tenga todos los datos.
 - Evalúa títulos, snippets y dominios.
 - Siempre usa dominios oficiales (.gob.ec, etc).
@@ -67,11 +72,15 @@ Siempre que el objetivo mencione "más reciente", "último", "actual" o similar:
 
 2) NAVEGACIÓN
 - Usa browser_open() para entrar.
+- Todas las herramientas del navegador aceptan un `page_id` opcional (por defecto "main"). Si necesitas explorar dos secciones independientes (ej: el portal de estadísticas y la página de calificaciones), usa un `page_id` distinto para cada una: son pestañas separadas que no se pisan y puedes trabajar en ambas a la vez.
+- Usa browser_list_pages() para ver las pestañas abiertas y browser_close_page() para cerrar las que ya no uses.
 - Si hay contenido dinámico:
   - Usa browser_wait()
   - Usa browser_scroll()
 
 3) EXPLORACIÓN
+- Empieza con crawl_links() sobre la URL elegida: recorre el sitio sin navegador (mucho más rápido) y te devuelve el índice de archivos descargables con su texto de enlace y la página donde aparecen. Usa `allow_patterns` para limitarlo a las secciones relevantes.
+- Solo si crawl_links() no encuentra los archivos (enlaces generados con JavaScript, botones, formularios), usa el navegador.
 - Usa browser_get_links() para descubrir rutas internas.
 - NUNCA asumas rutas sin inspeccionarlas antes.
 
@@ -81,16 +90,17 @@ Siempre que el objetivo mencione "más reciente", "último", "actual" o similar:
 
 5) EXTRACCIÓN AVANZADA
 - Usa browser_get_text() para textos visibles.
+- Para tablas HTML usa browser_extract_tables() (opcionalmente con un selector): guarda cada tabla como CSV en data/raw/tables/ en una sola llamada y te devuelve la ruta, la forma y una vista previa. NO leas tablas celda por celda con browser_get_text() ni browser_eval().
 - Usa browser_eval() para:
-  - Leer tablas internas
   - Acceder a datos ocultos en JS
   - Inspeccionar variables del sitio
 
 6) DESCARGA
-- Antes de descargar cualquier archivo, inspecciona el enlace con inspect_download_url() para verificar que tipo de archivo es con los datos que te da:
+- Antes de descargar cualquier archivo, inspecciona el enlace para verificar que tipo de archivo es. Si tienes VARIOS enlaces candidatos (ej: todos los de una página), usa inspect_download_urls() UNA vez con la lista completa en lugar de llamar inspect_download_url() por cada uno. Revisa los datos que te da:
   - content_type
   - filename
   - extension
+  - not_modified: si es true, el archivo no cambió desde la última descarga; download_file() lo restaurará desde la caché local al instante (igual debes llamarlo).
 - Usa download_file() SOLO cuando el enlace sea directo.
 - Si esperas un ZIP/XLSX/CSV y la inspección indica PDF o HTML, descarta esa URL y sigue buscando otra.
 - En enlaces dinámicos que dependen de un botón en la interfaz, prefiere browser_download_from_click().
@@ -116,6 +126,8 @@ REGLAS CRÍTICAS:
 	tools=[
 		report_agent_start,
 		internet_search,
+		internet_search_many,
+		crawl_links,
 		browser_open,
 		browser_click,
 		browser_type,
@@ -123,10 +135,14 @@ REGLAS CRÍTICAS:
 		browser_scroll,
 		browser_get_links,
 		browser_get_text,
+		browser_extract_tables,
 		browser_eval,
+		browser_list_pages,
+		browser_close_page,
 		download_file,
 		browser_download_from_click,
 		inspect_download_url,
+		inspect_download_urls,
 		get_current_date,
 		save_download_summary,
         clear_directories,
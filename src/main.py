@@ -1,40 +1,45 @@
+import argparse
 import asyncio
 import os
 from dotenv import load_dotenv
-from agents import Runner, set_default_openai_key
-from custom_agents.scraper import scraper
-from custom_agents.consolidator.orchestrator import consolidatorOrchestrator
+from agents import set_default_openai_key
+from pipeline.graph import PipelineContext, PipelineRunner
+from pipeline.stages import STAGE_NAMES, build_pipeline
 from tools.shared import clear_agents_log, reorder_agents_log
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Pipeline de consolidación de datos de cooperativas.")
+    parser.add_argument("--objective", default="Segmento 1, fecha más reciente", help="Objetivo del dataset.")
+    parser.add_argument("--resume", action="store_true", help="Reanuda desde los checkpoints de la última ejecución.")
+    parser.add_argument(
+        "--from-stage",
+        help=f"Vuelve a ejecutar desde esta etapa (y todo lo que depende de ella), reutilizando las anteriores. Etapas: {', '.join(STAGE_NAMES)}.",
+    )
+    parser.add_argument("--run-scraper", action="store_true", help="Ejecuta el Scraper (por defecto se salta).")
+    parser.add_argument("--skip-publish", action="store_true", help="No sube el dataset al repositorio público.")
+    return parser.parse_args()
+
 async def main():
+    args = parse_args()
     load_dotenv()
     set_default_openai_key(os.getenv("OPENAI_API_KEY"))
     
-    clear_agents_log()
+    if not (args.resume or args.from_stage):
+        clear_agents_log()
 
     print("🚀 Agente autónomo iniciado...\n")
-    objetivo = "Segmento 1, fecha más reciente"
-    print(f"🎯 Objetivo: {objetivo}")
-
-    skip_scraper = True
+    print(f"🎯 Objetivo: {args.objective}")
 
-    if not skip_scraper:
-        await Runner.run(
-            starting_agent=scraper,
-            input=objetivo,
-            max_turns=40,
-        )
-    else:
-         print("⏭️ Saltando Scraper...")
-
-    await Runner.run(
-        starting_agent=consolidatorOrchestrator,
-        input=f"Objetivo original: {objetivo}. Por favor consolida la información descargada.",
-        max_turns=40,
+    context = PipelineContext(
+        objective=args.objective,
+        options={"skip_scraper": not args.run_scraper, "skip_publish": args.skip_publish},
     )
-    
-    reorder_agents_log()
+    runner = PipelineRunner(build_pipeline(), context, resume=args.resume, from_stage=args.from_stage)
+    try:
+        await runner.run()
+    finally:
+        reorder_agents_log()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,159 @@
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from tools.shared import log
+from tools.utils.cache import cache_path, atomic_write_bytes
+
+class StageFailed(Exception):
+    """Raised by a stage whose outputs are missing or invalid, so it is not checkpointed."""
+
+@dataclass
+class Stage:
+    """
+    A node of the pipeline graph.
+
+    Attributes:
+        name: Unique name. Dynamic nodes use "group:item" names (e.g., "extract:riesgo.csv").
+        run: Coroutine receiving the PipelineContext; its JSON-serializable return value is checkpointed.
+        deps: Names of the stages that must finish first.
+        expand: Optional callback that receives this stage's result and returns new stages to add to the graph
+            (called both after a run and when the result is restored from a checkpoint).
+    """
+    name: str
+    run: Callable[["PipelineContext"], Awaitable[Any]]
+    deps: List[str] = field(default_factory=list)
+    expand: Optional[Callable[[Any], List["Stage"]]] = None
+
+@dataclass
+class PipelineContext:
+    objective: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    results: Dict[str, Any] = field(default_factory=dict)
+
+def _checkpoint_file() -> str:
+    return cache_path("pipeline", "checkpoints.json")
+
+def load_checkpoints() -> Dict[str, Dict]:
+    path = _checkpoint_file()
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_checkpoints(checkpoints: Dict[str, Dict]):
+    data = json.dumps(checkpoints, ensure_ascii=False, indent=2, default=str)
+    atomic_write_bytes(_checkpoint_file(), data.encode("utf-8"))
+
+def _matches(name: str, selector: str) -> bool:
+    return name == selector or name.startswith(f"{selector}:")
+
+class PipelineRunner:
+    """
+    Runs a graph of stages, starting every stage whose dependencies are done (independent stages run
+    concurrently) and checkpointing each finished stage to `data/cache/pipeline/checkpoints.json`.
+
+    - resume=False: every stage runs and previous checkpoints are discarded.
+    - resume=True: checkpointed stages are skipped (their stored result is reused) unless one of their
+      dependencies ran again in this run.
+    - from_stage: implies resume; the selected stage (or every "from_stage:*" node) runs again, and so
+      does everything downstream of it.
+    """
+
+    def __init__(self, stages: List[Stage], context: PipelineContext, resume: bool = False, from_stage: Optional[str] = None):
+        self.stages: Dict[str, Stage] = {}
+        self.context = context
+        self.from_stage = from_stage
+        self.checkpoints = load_checkpoints() if (resume or from_stage) else {}
+        self.rerun: set = set()
+        for stage in stages:
+            self._add(stage)
+        known = list(self.stages) + list(self.checkpoints)
+        if from_stage and not any(_matches(name, from_stage) for name in known):
+            raise ValueError(f"Unknown stage '{from_stage}'. Stages: {', '.join(self.stages)}")
+
+    def _add(self, stage: Stage):
+        if stage.name in self.stages:
+            raise ValueError(f"Duplicated stage '{stage.name}'")
+        self.stages[stage.name] = stage
+
+    def _finished(self, stage: Stage, result: Any):
+        self.context.results[stage.name] = result
+        if stage.expand is not None:
+            for child in stage.expand(result):
+                self._add(child)
+
+    def _restorable(self, stage: Stage) -> bool:
+        if self.from_stage and _matches(stage.name, self.from_stage):
+            return False
+        if any(dep in self.rerun for dep in stage.deps):
+            return False
+        return self.checkpoints.get(stage.name, {}).get("status") == "done"
+
+    async def _run_stage(self, stage: Stage):
+        log(f"▶️ Stage '{stage.name}' started")
+        started = datetime.now()
+        result = await stage.run(self.context)
+        self.checkpoints[stage.name] = {
+            "status": "done",
+            "result": result,
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "seconds": round((datetime.now() - started).total_seconds(), 1),
+        }
+        save_checkpoints(self.checkpoints)
+        log(f"✅ Stage '{stage.name}' done")
+        return result
+
+    async def run(self) -> Dict[str, Any]:
+        """Runs the graph until every stage is done. Raises the first stage error after in-flight stages finish."""
+        save_checkpoints(self.checkpoints)
+        done: set = set()
+        running: Dict[asyncio.Task, Stage] = {}
+
+        while True:
+            # Restoring a stage can unblock (or add) others, so keep scanning until nothing changes.
+            progressed = True
+            while progressed:
+                progressed = False
+                running_names = {s.name for s in running.values()}
+                for name, stage in list(self.stages.items()):
+                    if name in done or name in running_names:
+                        continue
+                    missing = [d for d in stage.deps if d not in self.stages]
+                    if missing:
+                        raise ValueError(f"Stage '{name}' depends on unknown stage(s) {missing}")
+                    if not all(d in done for d in stage.deps):
+                        continue
+                    if self._restorable(stage):
+                        log(f"⏭️ Stage '{name}' restored from checkpoint")
+                        done.add(name)
+                        self._finished(stage, self.checkpoints[name]["result"])
+                        progressed = True
+                        continue
+                    self.rerun.add(name)
+                    running_names.add(name)
+                    running[asyncio.create_task(self._run_stage(stage))] = stage
+            if not running:
+                break
+
+            finished, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in finished:
+                stage = running.pop(task)
+                error = task.exception()
+                if error is not None:
+                    self.checkpoints[stage.name] = {"status": "failed", "error": str(error)}
+                    save_checkpoints(self.checkpoints)
+                    log(f"❌ Stage '{stage.name}' failed: {error}")
+                    # Let in-flight stages finish (and checkpoint themselves) so --resume can reuse them.
+                    if running:
+                        await asyncio.wait(running)
+                    raise error
+                done.add(stage.name)
+                self._finished(stage, task.result())
+
+        pending = [name for name in self.stages if name not in done]
+        if pending:
+            raise StageFailed(f"Stages never became ready: {pending}")
+        return self.context.results
@@ -0,0 +1,139 @@
+import asyncio
+import os
+from typing import Any, Dict, List
+from agents import Runner
+from tools.shared import log
+from tools.utils.filesystem import clear_directory_contents
+from tools.utils.manifest import build_manifest
+from tools.transform.dataset import finalize_dataset
+from tools.github.push import publish_dataset
+from custom_agents.scraper import scraper
+from custom_agents.consolidator.consolidator import consolidator
+from custom_agents.consolidator.planner import extraction_planner, ExtractionJob, ExtractionPlan
+from custom_agents.consolidator.extractors.xlsm.xlsm_extractor import run_xlsm_extraction
+from custom_agents.consolidator.extractors.pdf.pdf_extractor import run_pdf_extraction
+from pipeline.graph import PipelineContext, Stage, StageFailed
+
+RAW_FOLDER = "data/raw"
+PREPROCESSED_FOLDER = "data/preprocessed"
+PROCESSED_FOLDER = "data/processed"
+DATASET_PATH = os.path.join(PROCESSED_FOLDER, "dataset.csv")
+ERROR_PREFIXES = ("Error", "❌")
+EXTRACTION_CONCURRENCY = int(os.getenv("EXTRACTION_CONCURRENCY", "2"))
+
+async def download(ctx: PipelineContext) -> Dict[str, Any]:
+    if ctx.options.get("skip_scraper", True):
+        log("⏭️ Saltando Scraper...")
+        return {"skipped": True}
+    result = await Runner.run(starting_agent=scraper, input=ctx.objective, max_turns=40)
+    return {"skipped": False, "output": str(result.final_output)}
+
+async def index(ctx: PipelineContext) -> Dict[str, Any]:
+    """
+    Clears the work folders and indexes data/raw (types, zip members, sheets, pages). Archives are not
+    unzipped: extraction jobs read workbooks straight from the zip ("archive.zip::member") and extract
+    single PDF members on demand.
+    """
+    clear_directory_contents(PREPROCESSED_FOLDER)
+    clear_directory_contents(PROCESSED_FOLDER)
+    manifest = await asyncio.to_thread(build_manifest, [RAW_FOLDER])
+    archives = {path: len(entry.get("members", [])) for path, entry in manifest.items() if entry["type"] == "zip"}
+    return {"files": len(manifest), "archives": archives}
+
+async def plan(ctx: PipelineContext) -> Dict[str, Any]:
+    result = await Runner.run(
+        starting_agent=extraction_planner,
+        input=f"Objetivo original: {ctx.objective}.",
+        max_turns=20,
+    )
+    extraction_plan: ExtractionPlan = result.final_output
+    if not extraction_plan.jobs:
+        raise StageFailed("El planificador no encontró archivos para extraer.")
+    log(f"🗺️ Plan: {[job.file_path for job in extraction_plan.jobs]}")
+    return extraction_plan.model_dump()
+
+def _extraction_limits(ctx: PipelineContext):
+    if "extraction_semaphore" not in ctx.options:
+        concurrency = ctx.options.get("extraction_concurrency", EXTRACTION_CONCURRENCY)
+        ctx.options["extraction_semaphore"] = asyncio.Semaphore(max(1, concurrency))
+        ctx.options["xlsm_lock"] = asyncio.Lock()
+    return ctx.options["extraction_semaphore"], ctx.options["xlsm_lock"]
+
+async def _run_extraction(ctx: PipelineContext, job: ExtractionJob) -> str:
+    """
+    Runs one extraction job. The extract nodes are started together by the runner, so at most
+    EXTRACTION_CONCURRENCY of them hold the semaphore at once. XLSM jobs share data/preprocessed/temp/,
+    so they are also serialized by a lock, taken before the semaphore so that XLSM jobs waiting for
+    their turn do not occupy slots that PDF jobs could use.
+    """
+    semaphore, xlsm_lock = _extraction_limits(ctx)
+    if job.kind == "pdf":
+        async with semaphore:
+            return await run_pdf_extraction(job.file_path, job.output_filename, job.target_segment)
+    async with xlsm_lock:
+        async with semaphore:
+            return await run_xlsm_extraction(job.file_path, job.output_filename, job.target_segment)
+
+def _extraction_stage(job: ExtractionJob) -> Stage:
+    async def extract(ctx: PipelineContext) -> Dict[str, Any]:
+        message = await _run_extraction(ctx, job)
+        output_path = os.path.join(PREPROCESSED_FOLDER, job.output_filename)
+        if message.startswith(ERROR_PREFIXES) or not os.path.exists(output_path):
+            raise StageFailed(f"{job.file_path}: {message}")
+        return {"output_path": output_path, "result": message}
+
+    return Stage(name=f"extract:{job.output_filename}", run=extract, deps=["plan"])
+
+async def consolidate(ctx: PipelineContext) -> Dict[str, Any]:
+    extraction_plan = ExtractionPlan(**ctx.results["plan"])
+    paths = {job.output_filename: os.path.join(PREPROCESSED_FOLDER, job.output_filename) for job in extraction_plan.jobs}
+    risk_csv = paths[extraction_plan.risk_output_filename]
+    csv_files = [path for name, path in paths.items() if name != extraction_plan.risk_output_filename]
+    message = (
+        f"Por favor consolida los siguientes archivos: csv_files={csv_files}, risk_csv='{risk_csv}'. "
+        f"Fecha requerida: '{extraction_plan.required_date}'. "
+        "NO ejecutes la limpieza final (`finalize_and_clean_dataset`) ni la publicación (`push_to_public_repo`): "
+        "el pipeline las ejecuta como etapas separadas."
+    )
+    result = await Runner.run(starting_agent=consolidator, input=message, max_turns=40)
+    if not os.path.exists(DATASET_PATH):
+        raise StageFailed(f"El consolidador no generó {DATASET_PATH}. {result.final_output}")
+    return {"dataset": DATASET_PATH, "output": str(result.final_output)}
+
+async def finalize(ctx: PipelineContext) -> Dict[str, Any]:
+    message = await asyncio.to_thread(finalize_dataset, DATASET_PATH)
+    if message.startswith(ERROR_PREFIXES):
+        raise StageFailed(message)
+    return {"dataset": DATASET_PATH, "result": message}
+
+async def publish(ctx: PipelineContext) -> Dict[str, Any]:
+    if ctx.options.get("skip_publish", False):
+        log("⏭️ Saltando publicación...")
+        return {"skipped": True}
+    message = await asyncio.to_thread(publish_dataset, DATASET_PATH)
+    if message.startswith(ERROR_PREFIXES):
+        raise StageFailed(message)
+    return {"skipped": False, "result": message}
+
+def expand_plan(plan_result: Dict[str, Any]) -> List[Stage]:
+    """Builds the per-file extraction nodes and everything downstream of them from the plan."""
+    extraction_plan = ExtractionPlan(**plan_result)
+    extraction_stages = [_extraction_stage(job) for job in extraction_plan.jobs]
+    return extraction_stages + [
+        Stage(name="consolidate", run=consolidate, deps=[s.name for s in extraction_stages]),
+        Stage(name="finalize", run=finalize, deps=["consolidate"]),
+        Stage(name="publish", run=publish, deps=["finalize"]),
+    ]
+
+def build_pipeline() -> List[Stage]:
+    """
+    Returns the static part of the pipeline graph: download -> index -> plan.
+    The plan stage expands into one `extract:<output_filename>` node per file, then consolidate -> finalize -> publish.
+    """
+    return [
+        Stage(name="download", run=download),
+        Stage(name="index", run=index, deps=["download"]),
+        Stage(name="plan", run=plan, deps=["index"], expand=expand_plan),
+    ]
+
+STAGE_NAMES = ["download", "index", "plan", "extract", "consolidate", "finalize", "publish"]
@@ -1,36 +1,435 @@
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
 from playwright.async_api import async_playwright
+from tools.utils.cache import cache_path, atomic_write_bytes
+from tools.utils import replay
+
+DEFAULT_PAGE_ID = "main"
+MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "4"))
+PAGE_IDLE_SECONDS = float(os.getenv("BROWSER_PAGE_IDLE_SECONDS", "300"))
+
+PERSISTENT_BROWSER = os.getenv("BROWSER_PERSISTENT", "0") == "1"
+BROWSER_CDP_URL = os.getenv("BROWSER_CDP_URL")
+BROWSER_CDP_PORT = int(os.getenv("BROWSER_CDP_PORT", "9222"))
+BROWSER_START_TIMEOUT = float(os.getenv("BROWSER_START_TIMEOUT", "20"))
+
+BLOCKING_ENABLED = os.getenv("BROWSER_BLOCKING", "1") == "1"
+BLOCKED_RESOURCE_TYPES = {
+    t.strip() for t in os.getenv("BROWSER_BLOCK_RESOURCE_TYPES", "image,media,font,stylesheet").split(",") if t.strip()
+}
+BLOCKED_DOMAINS = [
+    d.strip().lower() for d in os.getenv(
+        "BROWSER_BLOCK_DOMAINS",
+        "google-analytics.com,googletagmanager.com,doubleclick.net,googlesyndication.com,facebook.net,"
+        "connect.facebook.com,hotjar.com,clarity.ms,youtube.com,ytimg.com,fonts.googleapis.com,fonts.gstatic.com",
+    ).split(",") if d.strip()
+]
+
+# URL -> content-length of responses seen by any page, kept across runs (see `_known_sizes`).
+RESOURCE_SIZES_MAX = int(os.getenv("BROWSER_RESOURCE_SIZES_MAX", "5000"))
 
 _playwright = None
 _browser = None
-_context = None
-_page = None
+_resource_sizes: Optional[Dict[str, int]] = None
 
 
-async def init_browser(headless=True):
-    global _playwright, _browser, _context, _page
+@dataclass
+class PageStats:
+    requests: int = 0
+    loaded_bytes: int = 0
+    blocked: Counter = field(default_factory=Counter)
+    # Bytes not downloaded thanks to blocking, over the `saved_known` blocked requests whose size is known.
+    saved_bytes: int = 0
+    saved_known: int = 0
+    load_seconds: Optional[float] = None
+
+    def summary(self) -> str:
+        blocked = ", ".join(f"{k}: {v}" for k, v in self.blocked.most_common()) or "ninguna"
+        load = f"{self.load_seconds:.1f}s" if self.load_seconds is not None else "-"
+        saved = f"; ahorro {self.saved_bytes / 1024:.0f} KB ({self.saved_known} de tamaño conocido)" if self.saved_known else ""
+        return (
+            f"carga {load}; {self.requests} solicitudes ({self.loaded_bytes / 1024:.0f} KB); "
+            f"bloqueadas {sum(self.blocked.values())} ({blocked}){saved}"
+        )
+
+
+@dataclass
+class _PooledPage:
+    context: object
+    page: object
+    last_used: float
+    stats: PageStats = field(default_factory=PageStats)
+
+
+_pages: Dict[str, _PooledPage] = {}
+_pool_lock = asyncio.Lock()
+
+
+def _endpoint_file() -> str:
+    return cache_path("browser", "endpoint.json")
+
+
+def _storage_state_file() -> str:
+    return cache_path("browser", "storage_state.json")
+
+
+def _profile_dir() -> str:
+    return os.path.abspath(os.path.dirname(cache_path("browser", "profile", "Default")))
 
-    if _browser is None:
-        print("🌐 [BROWSER] Iniciando Playwright...", flush=True)
-        _playwright = await async_playwright().start()
 
-        print("🌐 [BROWSER] Lanzando Chromium...", flush=True)
-        _browser = await _playwright.chromium.launch(
-            headless=headless,
-            args=["--disable-blink-features=AutomationControlled"]
+def _launch_detached_chromium(headless: bool) -> str:
+    """
+    Starts Chromium as an independent process with remote debugging enabled (it outlives this Python
+    process) and records its pid/port in data/cache/browser/endpoint.json. Returns the CDP URL.
+    """
+    args = [
+        _playwright.chromium.executable_path,
+        f"--remote-debugging-port={BROWSER_CDP_PORT}",
+        f"--user-data-dir={_profile_dir()}",
+        "--disable-blink-features=AutomationControlled",
+        "--no-first-run",
+        "--no-default-browser-check",
+        "about:blank",
+    ]
+    if headless:
+        args.insert(1, "--headless=new")
+    if os.name == "nt":
+        process = subprocess.Popen(
+            args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            creationflags=subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP,
         )
+    else:
+        process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    cdp_url = f"http://127.0.0.1:{BROWSER_CDP_PORT}"
+    with open(_endpoint_file(), "w", encoding="utf-8") as f:
+        json.dump({"pid": process.pid, "cdp_url": cdp_url}, f)
+    return cdp_url
 
-        print("🌐 [BROWSER] Creando contexto y página...", flush=True)
-        _context = await _browser.new_context()
-        _page = await _context.new_page()
 
+def _read_endpoint() -> Optional[Dict]:
+    path = _endpoint_file()
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _owns_endpoint(endpoint: Dict) -> bool:
+    """
+    Whether the Chromium recorded in endpoint.json is still running: its pid is alive and, where the command
+    line can be read (/proc), it is a Chromium started with our profile. Guards against attaching to, or killing,
+    whatever else took over the port or the pid since.
+    """
+    pid = endpoint.get("pid")
+    if not isinstance(pid, int):
+        return False
+    if os.name == "nt":
+        output = subprocess.run(["tasklist", "/FI", f"PID eq {pid}", "/NH"], capture_output=True, text=True).stdout
+        return str(pid) in output
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    cmdline = f"/proc/{pid}/cmdline"
+    if os.path.exists(cmdline):
+        with open(cmdline, "rb") as f:
+            return f"--user-data-dir={_profile_dir()}".encode() in f.read().split(b"\0")
+    return True
+
+
+async def _connect(cdp_url: str, timeout: float):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return await _playwright.chromium.connect_over_cdp(cdp_url, timeout=5000)
+        except Exception:
+            if time.monotonic() >= deadline:
+                raise
+            await asyncio.sleep(0.5)
+
+
+def _on_disconnected(_):
+    global _browser
+    print("⚠️ [BROWSER] Conexión con el navegador perdida; se reconectará en el próximo uso", flush=True)
+    _browser = None
+    _pages.clear()
+
+
+async def _ensure_browser(headless=True):
+    """
+    Returns a live browser. With BROWSER_PERSISTENT=1 (opt-in), it connects over CDP to a long-lived Chromium
+    (BROWSER_CDP_URL, or the one recorded by a previous run if that process is still alive) and launches a
+    detached one if none answers.
+    A browser that is no longer connected is dropped and reconnected/relaunched.
+    """
+    global _playwright, _browser
+
+    if _browser is not None and not _browser.is_connected():
+        _browser = None
+        _pages.clear()
+
+    if _browser is None:
+        if _playwright is None:
+            print("🌐 [BROWSER] Iniciando Playwright...", flush=True)
+            _playwright = await async_playwright().start()
+
+        if not PERSISTENT_BROWSER:
+            print("🌐 [BROWSER] Lanzando Chromium...", flush=True)
+            _browser = await _playwright.chromium.launch(
+                headless=headless,
+                args=["--disable-blink-features=AutomationControlled"]
+            )
+        else:
+            endpoint = _read_endpoint()
+            if endpoint and not BROWSER_CDP_URL and not _owns_endpoint(endpoint):
+                print("🌐 [BROWSER] El Chromium registrado ya no está corriendo; se lanzará uno nuevo", flush=True)
+                os.remove(_endpoint_file())
+                endpoint = None
+            cdp_url = BROWSER_CDP_URL or (endpoint or {}).get("cdp_url")
+            if cdp_url:
+                try:
+                    print(f"🌐 [BROWSER] Conectando a Chromium existente ({cdp_url})...", flush=True)
+                    _browser = await _connect(cdp_url, timeout=2)
+                except Exception:
+                    _browser = None
+            if _browser is None:
+                if BROWSER_CDP_URL:
+                    raise RuntimeError(f"No se pudo conectar al navegador en BROWSER_CDP_URL={BROWSER_CDP_URL}")
+                print("🌐 [BROWSER] Lanzando Chromium persistente...", flush=True)
+                cdp_url = _launch_detached_chromium(headless)
+                _browser = await _connect(cdp_url, timeout=BROWSER_START_TIMEOUT)
+
+        _browser.on("disconnected", _on_disconnected)
         print("✅ [BROWSER] Navegador listo", flush=True)
 
-    return _page
+    return _browser
+
+
+async def _new_context():
+    state_path = _storage_state_file()
+    if os.path.exists(state_path):
+        try:
+            return await _browser.new_context(storage_state=state_path)
+        except Exception as e:
+            print(f"⚠️ [BROWSER] Ignorando storage state inválido: {e}", flush=True)
+    return await _browser.new_context()
+
+
+async def _save_storage_state(context):
+    try:
+        state_path = _storage_state_file()
+        tmp_path = f"{state_path}.tmp"
+        await context.storage_state(path=tmp_path)
+        os.replace(tmp_path, state_path)
+    except Exception as e:
+        print(f"⚠️ [BROWSER] No se pudo guardar el storage state: {e}", flush=True)
+
+
+def _resource_sizes_file() -> str:
+    return cache_path("browser", "resource_sizes.json")
+
+
+def _known_sizes() -> Dict[str, int]:
+    """
+    Content-length of every URL a page has loaded, loaded from disk on first use. An aborted request has no
+    response, so this is the only way to know what blocking a URL saves: its size is known if it was loaded
+    before (e.g. in a run with BROWSER_BLOCKING=0).
+    """
+    global _resource_sizes
+    if _resource_sizes is None:
+        _resource_sizes = {}
+        path = _resource_sizes_file()
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    _resource_sizes = json.load(f)
+            except (OSError, ValueError):
+                pass
+    return _resource_sizes
+
+
+def _save_known_sizes():
+    if _resource_sizes is None:
+        return
+    # Keep the most recently seen URLs only.
+    sizes = dict(list(_resource_sizes.items())[-RESOURCE_SIZES_MAX:])
+    try:
+        atomic_write_bytes(_resource_sizes_file(), json.dumps(sizes).encode("utf-8"))
+    except OSError as e:
+        print(f"⚠️ [BROWSER] No se pudieron guardar los tamaños de recursos: {e}", flush=True)
+
+
+def _blocked_reason(resource_type: str, url: str) -> Optional[str]:
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return resource_type
+    host = (urlparse(url).hostname or "").lower()
+    if any(host == d or host.endswith(f".{d}") for d in BLOCKED_DOMAINS):
+        return "domain"
+    return None
+
+
+async def _install_routing(pooled: _PooledPage):
+    """
+    Aborts blocked requests (by resource type or domain) and records per-page traffic in `pooled.stats`,
+    including the bytes saved by blocking when the blocked URL's size is known.
+    """
+    def on_response(response):
+        pooled.stats.requests += 1
+        length = response.headers.get("content-length", "")
+        if length.isdigit():
+            pooled.stats.loaded_bytes += int(length)
+            sizes = _known_sizes()
+            sizes.pop(response.url, None)
+            sizes[response.url] = int(length)
+
+    pooled.page.on("response", on_response)
+    if not BLOCKING_ENABLED:
+        return
+
+    async def handle(route):
+        reason = _blocked_reason(route.request.resource_type, route.request.url)
+        if reason is None:
+            await route.fallback()
+            return
+        pooled.stats.blocked[reason] += 1
+        size = _known_sizes().get(route.request.url)
+        if size is not None:
+            pooled.stats.saved_bytes += size
+            pooled.stats.saved_known += 1
+        await route.abort()
+
+    await pooled.context.route("**/*", handle)
+
+
+async def _close_pooled(page_id: str):
+    pooled = _pages.pop(page_id, None)
+    if pooled is not None:
+        await _save_storage_state(pooled.context)
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            print(f"⚠️ [BROWSER] Error cerrando página '{page_id}': {e}", flush=True)
+
+
+async def reap_idle_pages(max_idle_seconds: float = PAGE_IDLE_SECONDS, keep: Optional[str] = None) -> List[str]:
+    """Closes the pages (and their contexts) that were not used for `max_idle_seconds`, except `keep`. Returns their ids."""
+    now = time.monotonic()
+    idle = [pid for pid, pooled in _pages.items() if pid != keep and now - pooled.last_used > max_idle_seconds]
+    for page_id in idle:
+        print(f"🧹 [BROWSER] Cerrando página inactiva '{page_id}'", flush=True)
+        await _close_pooled(page_id)
+    return idle
+
+
+async def _get_pooled(page_id: Optional[str] = None, headless=True) -> _PooledPage:
+    """
+    Returns the pool entry registered under `page_id` (default: "main"), creating its page in its own browser
+    context on first use. At most MAX_PAGES pages are kept: idle pages are reaped first, then the least recently
+    used one is closed to make room.
+    """
+    page_id = page_id or DEFAULT_PAGE_ID
+    async with _pool_lock:
+        await _ensure_browser(headless)
+        await reap_idle_pages(keep=page_id)
+
+        pooled = _pages.get(page_id)
+        if pooled is None or pooled.page.is_closed():
+            if pooled is not None:
+                await _close_pooled(page_id)
+            while len(_pages) >= MAX_PAGES:
+                oldest = min(_pages, key=lambda pid: _pages[pid].last_used)
+                print(f"♻️ [BROWSER] Pool lleno, cerrando página '{oldest}'", flush=True)
+                await _close_pooled(oldest)
+
+            print(f"🌐 [BROWSER] Creando contexto y página '{page_id}'...", flush=True)
+            context = await _new_context()
+            await replay.attach_to_context(context, page_id)
+            page = await context.new_page()
+            pooled = _PooledPage(context=context, page=page, last_used=time.monotonic())
+            await _install_routing(pooled)
+            _pages[page_id] = pooled
+
+        pooled.last_used = time.monotonic()
+        return pooled
+
+
+async def get_page(page_id: Optional[str] = None, headless=True):
+    """Returns the page registered under `page_id` (default: "main"); see `_get_pooled`."""
+    return (await _get_pooled(page_id, headless)).page
+
+
+async def init_browser(headless=True, page_id: Optional[str] = None):
+    return await get_page(page_id, headless)
+
+
+async def navigate(url: str, page_id: Optional[str] = None, timeout: int = 60000) -> PageStats:
+    """Opens `url` on a pooled page and returns that navigation's stats (load time, traffic, blocked requests)."""
+    # Keep the entry returned by the pool: another task may evict this page id once the lock is released.
+    pooled = await _get_pooled(page_id)
+    pooled.stats = PageStats()
+    started = time.monotonic()
+    await pooled.page.goto(url, timeout=timeout)
+    pooled.stats.load_seconds = time.monotonic() - started
+    return pooled.stats
+
+
+def get_page_stats(page_id: Optional[str] = None) -> Optional[PageStats]:
+    pooled = _pages.get(page_id or DEFAULT_PAGE_ID)
+    return pooled.stats if pooled else None
+
+
+def list_pages() -> Dict[str, str]:
+    """Returns the open page ids and their current URLs."""
+    return {pid: pooled.page.url for pid, pooled in _pages.items() if not pooled.page.is_closed()}
+
 
+async def close_page(page_id: str) -> bool:
+    """Closes one page of the pool. Returns False if there was no such page."""
+    if page_id not in _pages:
+        return False
+    await _close_pooled(page_id)
+    return True
 
 
-async def close_browser():
+async def close_browser(terminate: bool = False):
+    """
+    Closes every pooled page (saving cookies/storage to disk) and releases the Playwright connection.
+    A persistent browser keeps running for the next run unless `terminate` is True.
+    """
     global _playwright, _browser
-    if _browser:
-        await _browser.close()
+    for page_id in list(_pages):
+        await _close_pooled(page_id)
+    _save_known_sizes()
+    if _browser is not None:
+        _browser.remove_listener("disconnected", _on_disconnected)
+        try:
+            await _browser.close()
+        except Exception as e:
+            print(f"⚠️ [BROWSER] Error cerrando navegador: {e}", flush=True)
+    if terminate and PERSISTENT_BROWSER and not BROWSER_CDP_URL:
+        endpoint = _read_endpoint()
+        if endpoint:
+            if _owns_endpoint(endpoint):
+                try:
+                    os.kill(endpoint["pid"], signal.SIGTERM)
+                except OSError:
+                    pass
+            os.remove(_endpoint_file())
+    if _playwright is not None:
         await _playwright.stop()
+    _browser = None
+    _playwright = None
+    _pages.clear()
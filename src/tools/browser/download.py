@@ -1,13 +1,22 @@
 from agents import function_tool
 from tools.browser.controller import init_browser
 from tools.shared import log
-import requests
+from tools.utils.downloader import download, DownloadError
+import asyncio
 import os
 
 @function_tool
-async def browser_download_from_click(selector: str, filename: str):
+async def browser_download_from_click(selector: str, filename: str, page_id: str = None):
+    """
+    Descarga un archivo haciendo click en un elemento de la página.
+
+    Args:
+        selector: Selector del elemento que inicia la descarga.
+        filename: Nombre del archivo dentro de data/raw/.
+        page_id: (Opcional) Pestaña sobre la que actuar; por defecto "main".
+    """
     log(f"⬇️ Iniciando descarga desde navegador → {selector}")
-    page = await init_browser()
+    page = await init_browser(page_id=page_id)
     os.makedirs("data/raw", exist_ok=True)
     path = f"data/raw/{filename}"
 
@@ -20,15 +29,23 @@ async def browser_download_from_click(selector: str, filename: str):
     return f"Downloaded: {path}"
 
 @function_tool
-async def download_file(url: str, filename: str):
+async def download_file(url: str, filename: str, expected_sha256: str = None):
+    """
+    Downloads a file to data/raw/ with resume, parallel ranged segments and size/checksum verification.
+
+    Args:
+        url: The file URL.
+        filename: Name of the file inside data/raw/.
+        expected_sha256: (Optional) SHA-256 the file must match.
+    """
     log(f"⬇️ Iniciando descarga directa → {url}")
-    os.makedirs("data/raw", exist_ok=True)
     path = f"data/raw/{filename}"
 
-    r = requests.get(url, stream=True, timeout=60)
-    with open(path, "wb") as f:
-        for chunk in r.iter_content(8192):
-            f.write(chunk)
+    try:
+        result = await asyncio.to_thread(download, url, path, expected_sha256)
+    except DownloadError as e:
+        log(f"❌ Descarga fallida → {e}")
+        return f"Error downloading {url}: {e}. Partial data (if any) is kept in {path}.part; calling again resumes it."
 
-    log(f"✅ Descarga directa completada → {path}")
-    return f"Downloaded: {path}"
+    log(f"✅ Descarga directa completada → {path} ({result.throughput_mbps:.2f} MB/s)")
+    return f"Downloaded: {result.summary()}"
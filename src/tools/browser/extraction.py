@@ -1,20 +1,109 @@
+import os
+import re
+import unicodedata
+from urllib.parse import urlparse
 from agents import function_tool
 from tools.browser.controller import init_browser
 from tools.shared import log
 
 @function_tool
-async def browser_get_text(selector: str):
-    page = await init_browser()
+async def browser_get_text(selector: str, page_id: str = None):
+    """
+    Devuelve el texto visible de un elemento.
+
+    Args:
+        selector: Selector del elemento.
+        page_id: (Opcional) Pestaña sobre la que actuar; por defecto "main".
+    """
+    page = await init_browser(page_id=page_id)
     txt = await page.inner_text(selector)
     log(f"📄 Texto extraído → {selector}")
     return txt.strip()
 
 @function_tool
-async def browser_get_links():
-    page = await init_browser()
+async def browser_get_links(page_id: str = None):
+    """
+    Devuelve los enlaces de la página (texto y href).
+
+    Args:
+        page_id: (Opcional) Pestaña sobre la que actuar; por defecto "main".
+    """
+    page = await init_browser(page_id=page_id)
     links = await page.eval_on_selector_all(
         "a",
         "els => els.map(e => ({ text: e.innerText, href: e.href }))"
     )
     log(f"🔗 {len(links)} enlaces encontrados")
     return links
+
+TABLES_FOLDER = "data/raw/tables"
+
+_EXTRACT_TABLES_JS = """
+({ selector }) => {
+    const roots = Array.from(document.querySelectorAll(selector || "table"));
+    const tables = roots.flatMap(el => el.tagName === "TABLE" ? [el] : Array.from(el.querySelectorAll("table")));
+    const escape = v => /[",\\n\\r]/.test(v) ? '"' + v.replace(/"/g, '""') + '"' : v;
+    return tables.map((table, index) => {
+        const grid = [];
+        Array.from(table.rows).forEach((row, r) => {
+            grid[r] = grid[r] || [];
+            let c = 0;
+            Array.from(row.cells).forEach(cell => {
+                while (grid[r][c] !== undefined) c++;
+                const text = (cell.innerText || cell.textContent || "").replace(/\\s+/g, " ").trim();
+                const rowSpan = Math.max(1, cell.rowSpan || 1);
+                const colSpan = Math.max(1, cell.colSpan || 1);
+                for (let i = 0; i < rowSpan; i++) {
+                    grid[r + i] = grid[r + i] || [];
+                    for (let j = 0; j < colSpan; j++) grid[r + i][c + j] = text;
+                }
+                c += colSpan;
+            });
+        });
+        const width = grid.reduce((w, row) => Math.max(w, row.length), 0);
+        const rows = grid.map(row => Array.from({ length: width }, (_, j) => row[j] ?? ""));
+        const caption = table.caption ? table.caption.innerText.trim() : (table.id || "");
+        return { index, caption, n_rows: rows.length, n_cols: width, csv: rows.map(row => row.map(escape).join(",")).join("\\n") };
+    });
+}
+"""
+
+def _slug(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII').lower()
+    return re.sub(r'[^a-z0-9]+', '_', text).strip('_')[:40] or "pagina"
+
+@function_tool
+async def browser_extract_tables(selector: str = None, max_rows: int = 5, page_id: str = None):
+    """
+    Extrae TODAS las tablas HTML de la página (o las que coinciden con `selector`) en una sola evaluación,
+    expandiendo colspan/rowspan, y guarda cada una como CSV en data/raw/tables/.
+    Devuelve por tabla: ruta del CSV, forma (filas x columnas), título y una vista previa de las primeras filas.
+
+    Args:
+        selector: (Opcional) Selector CSS de las tablas o de sus contenedores. Por defecto, todas las `<table>`.
+        max_rows: Filas de vista previa por tabla (el CSV guardado siempre tiene todas las filas).
+        page_id: (Opcional) Pestaña sobre la que actuar; por defecto "main".
+    """
+    page = await init_browser(page_id=page_id)
+    tables = await page.evaluate(_EXTRACT_TABLES_JS, {"selector": selector})
+    prefix = _slug(urlparse(page.url).netloc + urlparse(page.url).path)
+    os.makedirs(TABLES_FOLDER, exist_ok=True)
+
+    results, skipped = [], 0
+    for table in tables:
+        # One-row or one-column tables are almost always layout, not data.
+        if table["n_rows"] < 2 or table["n_cols"] < 2:
+            skipped += 1
+            continue
+        path = os.path.join(TABLES_FOLDER, f"{prefix}_{table['index']}.csv")
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            f.write(table["csv"] + "\n")
+        results.append({
+            "path": path,
+            "caption": table["caption"],
+            "shape": [table["n_rows"], table["n_cols"]],
+            "preview": "\n".join(table["csv"].split("\n")[:max(1, max_rows)]),
+        })
+
+    log(f"📊 {len(results)} tablas extraídas de {page.url} ({skipped} descartadas por ser de maquetación)")
+    return {"tables": results, "skipped_layout_tables": skipped}
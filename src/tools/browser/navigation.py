@@ -1,55 +1,116 @@
 from agents import function_tool
-from tools.browser.controller import init_browser, close_browser
+from tools.browser.controller import init_browser, close_browser, close_page, list_pages, navigate
 from tools.shared import log
 
 @function_tool
-async def browser_open(url: str):
+async def browser_open(url: str, page_id: str = None):
+    """
+    Abre una URL.
+
+    Args:
+        url: URL a abrir.
+        page_id: (Opcional) Pestaña sobre la que actuar. Cada id es una pestaña independiente (ej: "estadisticas", "calificaciones"); por defecto "main".
+    """
     log(f"🌐 Abriendo página → {url}")
-    page = await init_browser()
-    await page.goto(url, timeout=60000)
-    log("✅ Página cargada")
-    return f"OK: opened {url}"
+    stats = await navigate(url, page_id)
+    log(f"✅ Página cargada ({stats.summary()})")
+    return f"OK: opened {url} ({stats.summary()})"
 
 @function_tool
-async def browser_click(selector: str):
+async def browser_click(selector: str, page_id: str = None):
+    """
+    Hace click en un elemento.
+
+    Args:
+        selector: Selector del elemento.
+        page_id: (Opcional) Pestaña sobre la que actuar; por defecto "main".
+    """
     log(f"🖱️ Click → {selector}")
-    page = await init_browser()
+    page = await init_browser(page_id=page_id)
     await page.click(selector)
     return f"OK: clicked {selector}"
 
 @function_tool
-async def browser_type(selector: str, text: str):
+async def browser_type(selector: str, text: str, page_id: str = None):
+    """
+    Escribe texto en un campo.
+
+    Args:
+        selector: Selector del campo.
+        text: Texto a escribir.
+        page_id: (Opcional) Pestaña sobre la que actuar; por defecto "main".
+    """
     log(f"⌨️ Escribiendo en {selector}: {text}")
-    page = await init_browser()
+    page = await init_browser(page_id=page_id)
     await page.fill(selector, text)
     return "OK"
 
 @function_tool
-async def browser_wait(selector: str):
+async def browser_wait(selector: str, page_id: str = None):
+    """
+    Espera a que un elemento sea visible.
+
+    Args:
+        selector: Selector del elemento.
+        page_id: (Opcional) Pestaña sobre la que actuar; por defecto "main".
+    """
     log(f"⏳ Esperando elemento → {selector}")
-    page = await init_browser()
+    page = await init_browser(page_id=page_id)
     await page.wait_for_selector(selector, timeout=60000)
     log(f"👀 Visible → {selector}")
     return "OK"
 
 @function_tool
-async def browser_scroll(pixels: int = 2000):
+async def browser_scroll(pixels: int = 2000, page_id: str = None):
+    """
+    Hace scroll vertical.
+
+    Args:
+        pixels: Píxeles a desplazar.
+        page_id: (Opcional) Pestaña sobre la que actuar; por defecto "main".
+    """
     log(f"🌀 Scroll → {pixels}px")
-    page = await init_browser()
+    page = await init_browser(page_id=page_id)
     await page.mouse.wheel(0, pixels)
     return f"Scroll {pixels}px"
 
 @function_tool
-async def browser_eval(script: str):
+async def browser_eval(script: str, page_id: str = None):
+    """
+    Ejecuta JavaScript en la página y devuelve el resultado.
+
+    Args:
+        script: Código JavaScript.
+        page_id: (Opcional) Pestaña sobre la que actuar; por defecto "main".
+    """
     log("🧮 Ejecutando JavaScript en la página")
-    page = await init_browser()
+    page = await init_browser(page_id=page_id)
     result = await page.evaluate(script)
     log("📤 Resultado de JavaScript obtenido")
     return result
 
+@function_tool
+async def browser_list_pages():
+    """Lista las pestañas abiertas (page_id → URL actual)."""
+    pages = list_pages()
+    log(f"🗂️ {len(pages)} pestañas abiertas")
+    return pages
+
+@function_tool
+async def browser_close_page(page_id: str):
+    """
+    Cierra una pestaña cuando ya no la necesitas (las pestañas inactivas se cierran solas tras unos minutos).
+
+    Args:
+        page_id: Pestaña a cerrar.
+    """
+    closed = await close_page(page_id)
+    log(f"🗑️ Pestaña '{page_id}' {'cerrada' if closed else 'no existe'}")
+    return f"Pestaña '{page_id}' cerrada." if closed else f"No existe la pestaña '{page_id}'."
+
 @function_tool
 async def browser_close():
-    """Cierra el navegador y libera recursos."""
+    """Cierra las pestañas y libera recursos (cookies y sesión quedan guardadas; el navegador persistente sigue listo para la próxima ejecución)."""
     log("🛑 Cerrando navegador...")
     await close_browser()
     return "Navegador cerrado correctamente."
\ No newline at end of file
@@ -1,8 +1,42 @@
 import pandas as pd
-from typing import List, Any
+from typing import List, Any, Literal, Optional
+from pydantic import BaseModel
 from agents import function_tool
 from tools.shared import log
 from tools.utils.parsing import normalize_feature_name
+from tools.formats.table_store import get_table, put_table, flush_tables, dedup_column_names
+
+def _columns_after_delete(columns: List[str], to_drop: List[str]) -> List[str]:
+    kept = [c for c in columns if c not in to_drop]
+    return dedup_column_names(pd.Index(kept, dtype=object).str.replace(r'\.\d+$', '', regex=True))
+
+def _columns_after_rename(columns: List[str], column_index: int, new_name: str) -> List[str]:
+    columns = list(columns)
+    columns[column_index] = new_name
+    return dedup_column_names(columns)
+
+def _columns_after_move(columns: List[str], column_name: str, new_index: int) -> List[str]:
+    columns = list(columns)
+    columns.remove(column_name)
+    columns.insert(new_index, column_name)
+    return columns
+
+def _columns_after_normalize(columns: List[str]) -> List[str]:
+    new_columns = [normalize_feature_name(col) for col in columns]
+    counts = {}
+    deduped_columns = []
+    for col in new_columns:
+        if col in counts:
+            counts[col] += 1
+            deduped_columns.append(f"{col}_{counts[col]}")
+        else:
+            counts[col] = 0
+            deduped_columns.append(col)
+    return deduped_columns
+
+def _rows_matching(df: pd.DataFrame, column_index: int, values_to_delete: List[str]) -> pd.Series:
+    values_str = [str(v) for v in values_to_delete]
+    return df.iloc[:, column_index].astype(str).isin(values_str)
 
 @function_tool
 def get_csv_shape(file_path: str) -> str:
@@ -17,7 +51,7 @@ def get_csv_shape(file_path: str) -> str:
     """
     log(f"📏 Calculating shape of {file_path}...")
     try:
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        df = get_table(file_path)
         rows, cols = df.shape
         log(f"   -> Found {rows} rows and {cols} columns")
         return f"Rows: {rows}, Columns: {cols}"
@@ -40,7 +74,7 @@ def get_csv_columns_headers(file_path: str, offset: int = 0, limit: int = 200) -
     end_idx = offset + limit
     log(f"📊 Reading Headers (Cols {offset} to {end_idx}) from {file_path}")
     try:
-        df = pd.read_csv(file_path, encoding='utf-8-sig', nrows=0)
+        df = get_table(file_path)
         all_columns = df.columns.tolist()
         return all_columns[offset : offset + limit]
     except Exception as e:
@@ -60,7 +94,7 @@ def read_csv_head(file_path: str, n_rows: int = 3) -> List[List[Any]]:
     """
     log(f"👀 Reading headers and first {n_rows} rows from {file_path}")
     try:
-        df = pd.read_csv(file_path, nrows=n_rows, encoding='utf-8-sig')
+        df = get_table(file_path).head(n_rows)
         headers = df.columns.tolist()
         values = df.where(pd.notnull(df), None).values.tolist()
         return [headers] + values
@@ -84,8 +118,8 @@ def get_csv_rows_headers(file_path: str, column_index: int = 0, offset: int = 0,
     end_idx = offset + limit
     log(f"🧐 Reading First Column (Rows {offset} to {end_idx}) from {file_path}")
     try:
-        df = pd.read_csv(file_path, usecols=[column_index], encoding='utf-8-sig')
-        subset = df.iloc[offset : offset + limit, 0]
+        df = get_table(file_path)
+        subset = df.iloc[offset : offset + limit, column_index]
         return subset.where(pd.notnull(subset), None).tolist()
     except Exception as e:
         return [f"Error reading column: {str(e)}"]
@@ -104,16 +138,17 @@ def delete_columns(file_path: str, column_names: List[str]) -> str:
     """
     log(f"🗑️ Deleting columns {column_names} from {file_path}")
     try:
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        df = get_table(file_path)
         to_drop = [c for c in column_names if c in df.columns]
         
         if not to_drop:
             return "No matching columns found to delete."
             
-        df.drop(columns=to_drop, inplace=True)
-        df.columns = df.columns.str.replace(r'\.\d+$', '', regex=True)
+        new_columns = _columns_after_delete(df.columns.tolist(), to_drop)
+        df = df.drop(columns=to_drop)
+        df.columns = new_columns
 
-        df.to_csv(file_path, index=False, encoding='utf-8-sig')
+        put_table(file_path, df)
         rows, cols = df.shape
         return f"Successfully deleted {len(to_drop)} columns. New shape: Rows: {rows}, Columns: {cols}. WAIT for this confirmation before proceeding."
     except Exception as e:
@@ -134,21 +169,19 @@ def delete_rows_by_values(file_path: str, column_index: int, values_to_delete: L
     """
     log(f"✂️ Deleting rows in {file_path} where column {column_index} is in {values_to_delete}")
     try:
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        df = get_table(file_path)
         
         if column_index >= len(df.columns):
             return f"Column index {column_index} out of bounds"
             
-        col_name = df.columns[column_index]
         original_count = len(df)
-        values_str = [str(v) for v in values_to_delete]
-        mask = df[col_name].astype(str).isin(values_str)
+        mask = _rows_matching(df, column_index, values_to_delete)
         
         df_clean = df[~mask]
         
         deleted_count = original_count - len(df_clean)
         
-        df_clean.to_csv(file_path, index=False, encoding='utf-8-sig')
+        put_table(file_path, df_clean.reset_index(drop=True))
         rows, cols = df_clean.shape
         return f"Successfully deleted {deleted_count} rows. New shape: Rows: {rows}, Columns: {cols}. WAIT for this confirmation before proceeding."
     except Exception as e:
@@ -168,8 +201,8 @@ def get_unique_column_values(file_path: str, column_index: int) -> List[Any]:
     """
     log(f"🔍 Getting unique values from column {column_index} in {file_path}")
     try:
-        df = pd.read_csv(file_path, usecols=[column_index], encoding='utf-8-sig')
-        unique_values = df.iloc[:, 0].unique().tolist()
+        df = get_table(file_path)
+        unique_values = df.iloc[:, column_index].unique().tolist()
         return [x for x in unique_values if pd.notnull(x)]
     except Exception as e:
         return [f"Error reading column: {str(e)}"]
@@ -189,14 +222,15 @@ def rename_column(file_path: str, column_index: int, new_name: str) -> str:
     """
     log(f"🏷️ Renaming column {column_index} to '{new_name}' in {file_path}")
     try:
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        df = get_table(file_path)
         if column_index >= len(df.columns):
             return f"Column index {column_index} out of bounds"
             
         old_name = df.columns[column_index]
-        df.rename(columns={old_name: new_name}, inplace=True)
+        df = df.copy()
+        df.columns = _columns_after_rename(df.columns.tolist(), column_index, new_name)
         
-        df.to_csv(file_path, index=False, encoding='utf-8-sig')
+        put_table(file_path, df)
         return f"Successfully renamed column '{old_name}' to '{new_name}'."
     except Exception as e:
         return f"Error renaming column: {str(e)}"
@@ -216,7 +250,7 @@ def move_column_to_index(file_path: str, column_name: str, new_index: int) -> st
     """
     log(f"🚚 Moving column '{column_name}' to index {new_index} in {file_path}")
     try:
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        df = get_table(file_path)
         
         if column_name not in df.columns:
             return f"Column '{column_name}' not found in CSV."
@@ -224,13 +258,11 @@ def move_column_to_index(file_path: str, column_name: str, new_index: int) -> st
         if new_index < 0 or new_index >= len(df.columns):
             return f"New index {new_index} is out of bounds."
             
-        cols = df.columns.tolist()
-        cols.remove(column_name)
-        cols.insert(new_index, column_name)
+        cols = _columns_after_move(df.columns.tolist(), column_name, new_index)
         
         df = df[cols]
         
-        df.to_csv(file_path, index=False, encoding='utf-8-sig')
+        put_table(file_path, df)
         return f"Successfully moved column '{column_name}' to index {new_index}."
     except Exception as e:
         return f"Error moving column: {str(e)}"
@@ -249,29 +281,152 @@ def normalize_csv_columns(file_path: str) -> str:
     """
     log(f"🐍 Normalizing column names in {file_path}")
     try:
-        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        df = get_table(file_path).copy()
         
         original_columns = df.columns.tolist()
-        new_columns = [normalize_feature_name(col) for col in original_columns]
+        new_columns = _columns_after_normalize(original_columns)
         if original_columns == new_columns:
             return "All columns are already normalized."
             
         df.columns = new_columns
-        if len(set(new_columns)) != len(new_columns):
-            counts = {}
-            deduped_columns = []
-            for col in new_columns:
-                if col in counts:
-                    counts[col] += 1
-                    deduped_columns.append(f"{col}_{counts[col]}")
-                else:
-                    counts[col] = 0
-                    deduped_columns.append(col)
-            df.columns = deduped_columns
             
-        df.to_csv(file_path, index=False, encoding='utf-8-sig')
+        put_table(file_path, df)
         return f"Successfully normalized {len(original_columns)} columns."
     except Exception as e:
         return f"Error normalizing columns: {str(e)}"
 
+class CsvOperation(BaseModel):
+    op: Literal["delete_columns", "delete_rows", "rename_column", "move_column", "normalize_columns"]
+    column_names: Optional[List[str]] = None
+    column_index: Optional[int] = None
+    values_to_delete: Optional[List[str]] = None
+    new_name: Optional[str] = None
+    column_name: Optional[str] = None
+    new_index: Optional[int] = None
+
+def _validate_csv_operations(columns: List[str], operations: List[CsvOperation]) -> List[str]:
+    """
+    Checks every operation against the column layout it will see when it runs, without touching data.
+    Returns a list of error messages (empty when the whole batch is valid).
+    """
+    errors = []
+    columns = list(columns)
+    for i, operation in enumerate(operations, start=1):
+        prefix = f"Op {i} ({operation.op})"
+        if operation.op == "delete_columns":
+            if not operation.column_names:
+                errors.append(f"{prefix}: 'column_names' is required.")
+                continue
+            to_drop = [c for c in operation.column_names if c in columns]
+            if not to_drop:
+                errors.append(f"{prefix}: none of {operation.column_names} exist at this point.")
+                continue
+            columns = _columns_after_delete(columns, to_drop)
+        elif operation.op == "delete_rows":
+            if operation.column_index is None or operation.values_to_delete is None:
+                errors.append(f"{prefix}: 'column_index' and 'values_to_delete' are required.")
+            elif not 0 <= operation.column_index < len(columns):
+                errors.append(f"{prefix}: column index {operation.column_index} out of bounds.")
+        elif operation.op == "rename_column":
+            if operation.column_index is None or not operation.new_name:
+                errors.append(f"{prefix}: 'column_index' and 'new_name' are required.")
+            elif not 0 <= operation.column_index < len(columns):
+                errors.append(f"{prefix}: column index {operation.column_index} out of bounds.")
+            else:
+                columns = _columns_after_rename(columns, operation.column_index, operation.new_name)
+        elif operation.op == "move_column":
+            if not operation.column_name or operation.new_index is None:
+                errors.append(f"{prefix}: 'column_name' and 'new_index' are required.")
+            elif operation.column_name not in columns:
+                errors.append(f"{prefix}: column '{operation.column_name}' not found at this point.")
+            elif not 0 <= operation.new_index < len(columns):
+                errors.append(f"{prefix}: new index {operation.new_index} is out of bounds.")
+            else:
+                columns = _columns_after_move(columns, operation.column_name, operation.new_index)
+        elif operation.op == "normalize_columns":
+            columns = _columns_after_normalize(columns)
+    return errors
+
+def _apply_csv_operation(df: pd.DataFrame, operation: CsvOperation):
+    if operation.op == "delete_columns":
+        to_drop = [c for c in operation.column_names if c in df.columns]
+        new_columns = _columns_after_delete(df.columns.tolist(), to_drop)
+        df = df.drop(columns=to_drop)
+        df.columns = new_columns
+        return df, f"deleted {len(to_drop)} columns"
+    if operation.op == "delete_rows":
+        mask = _rows_matching(df, operation.column_index, operation.values_to_delete)
+        return df[~mask].reset_index(drop=True), f"deleted {int(mask.sum())} rows"
+    if operation.op == "rename_column":
+        old_name = df.columns[operation.column_index]
+        df = df.copy()
+        df.columns = _columns_after_rename(df.columns.tolist(), operation.column_index, operation.new_name)
+        return df, f"renamed '{old_name}' to '{operation.new_name}'"
+    if operation.op == "move_column":
+        df = df[_columns_after_move(df.columns.tolist(), operation.column_name, operation.new_index)]
+        return df, f"moved '{operation.column_name}' to index {operation.new_index}"
+    df = df.copy()
+    df.columns = _columns_after_normalize(df.columns.tolist())
+    return df, f"normalized {len(df.columns)} columns"
 
+@function_tool
+def apply_csv_operations(file_path: str, operations: List[CsvOperation]) -> str:
+    """
+    Applies an ordered list of edits to a CSV file in a single transaction: the file is loaded once,
+    every operation is validated up front, all of them run on the same table, and the file is saved once.
+    If any operation is invalid, nothing is changed.
+    
+    Supported operations (field `op` plus its arguments):
+    - "delete_columns": column_names (list of column names).
+    - "delete_rows": column_index (0-based), values_to_delete (exact values).
+    - "rename_column": column_index (0-based), new_name.
+    - "move_column": column_name, new_index (0-based).
+    - "normalize_columns": no arguments (snake_case for every column name).
+    Column names and indices refer to the table as it is right before that operation runs.
+    
+    Args:
+        file_path: The path to the CSV file.
+        operations: The ordered list of operations to apply.
+        
+    Returns:
+        A per-operation report and the final shape.
+    """
+    log(f"🧾 Applying {len(operations)} operations to {file_path}")
+    try:
+        df = get_table(file_path)
+        errors = _validate_csv_operations(df.columns.tolist(), operations)
+        if errors:
+            return "No changes applied. Invalid operations:\n" + "\n".join(errors)
+
+        report = []
+        for i, operation in enumerate(operations, start=1):
+            df, summary = _apply_csv_operation(df, operation)
+            report.append(f"{i}. {operation.op}: {summary}")
+
+        put_table(file_path, df)
+        flush_tables([file_path])
+        rows, cols = df.shape
+        return "\n".join(report) + f"\nFinal shape: Rows: {rows}, Columns: {cols}"
+    except Exception as e:
+        return f"Error applying operations: {str(e)}"
+
+@function_tool
+def flush_csv(file_path: str = None) -> str:
+    """
+    Writes pending in-memory edits to disk. Edits made by the CSV tools are kept in memory
+    and saved automatically when the agent finishes; call this to persist them earlier.
+    
+    Args:
+        file_path: The CSV file to save. If omitted, every edited file is saved.
+        
+    Returns:
+        A success message with the saved files.
+    """
+    log(f"💾 Flushing CSV edits ({file_path or 'all files'})")
+    try:
+        written = flush_tables([file_path] if file_path else None)
+        if not written:
+            return "No pending edits to save."
+        return f"Successfully saved {len(written)} file(s): {written}"
+    except Exception as e:
+        return f"Error saving CSV: {str(e)}"
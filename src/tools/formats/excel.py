@@ -1,4 +1,5 @@
 import pandas as pd
+import openpyxl
 import os
 import json
 import warnings
@@ -6,6 +7,9 @@ from typing import List, Any
 from agents import function_tool
 from tools.shared import log
 from tools.utils.parsing import normalize_feature_name
+from tools.formats.workbook_cache import get_sheet, peek_sheet
+from tools.utils.archive import open_source
+from tools.formats.table_store import write_csv_atomic
 warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
 
 @function_tool
@@ -14,18 +18,64 @@ def get_excel_sheet_names(file_path: str) -> List[str]:
     Gets the names of all sheets in an Excel file.
     
     Args:
-        file_path: The path to the Excel file.
+        file_path: The path to the Excel file, or to a workbook inside a zip ("archive.zip::member.xlsm").
+          All Excel tools accept this form.
         
     Returns:
         A list of sheet names.
     """
     log(f"📑 Getting sheet names from {file_path}")
     try:
-        xls = pd.ExcelFile(file_path)
+        xls = pd.ExcelFile(open_source(file_path))
         return xls.sheet_names
     except Exception as e:
         return [f"Error reading excel file: {str(e)}"]
 
+def _clamp_range(shape, start_row: int, start_col: int, end_row: int, end_col: int):
+    max_row, max_col = shape
+    s_row = max(0, start_row)
+    e_row = min(max_row, end_row + 1)
+    s_col = max(0, start_col)
+    e_col = min(max_col, end_col + 1)
+    return s_row, e_row, s_col, e_col
+
+def _read_range_streaming(file_path: str, sheet_name: str, start_row: int, start_col: int, end_row: int, end_col: int) -> List[List[Any]]:
+    """
+    Reads only the requested rectangle using openpyxl's read-only mode.
+    Rows are parsed as a stream and only the window is kept, so memory stays flat regardless of the sheet size.
+    Cell objects and styles are never materialized (values_only).
+
+    The result matches slicing `pd.read_excel(header=None)`: the window is clamped to the sheet's real extent
+    (last row and column holding a value), never trimmed on its own. The `<dimension>` recorded in the file
+    is ignored because it is often stale; the extent is measured while streaming, and parsing stops early
+    once a value past the window's bottom-right corner proves no clamping is needed.
+    """
+    s_row, s_col = max(0, start_row), max(0, start_col)
+    if end_row < s_row or end_col < s_col:
+        return []
+
+    rows, last_row, last_col = [], -1, -1
+    wb = openpyxl.load_workbook(open_source(file_path), read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb[sheet_name]
+        ws.reset_dimensions()
+        for index, row in enumerate(ws.iter_rows(values_only=True)):
+            filled = [col for col, value in enumerate(row) if value is not None]
+            if filled:
+                last_row, last_col = index, max(last_col, filled[-1])
+            if s_row <= index <= end_row:
+                rows.append(list(row[s_col:end_col + 1]))
+            if index >= end_row and last_row >= end_row and last_col >= end_col:
+                break
+    finally:
+        wb.close()
+
+    e_row, e_col = min(end_row, last_row), min(end_col, last_col)
+    if s_row > e_row or s_col > e_col:
+        return []
+    width = e_col - s_col + 1
+    return [r[:width] + [None] * (width - len(r)) for r in rows[:e_row - s_row + 1]]
+
 @function_tool
 def read_excel_range(file_path: str, sheet_name: str, start_row: int, start_col: int, end_row: int, end_col: int) -> List[List[Any]]:
     """
@@ -44,18 +94,17 @@ def read_excel_range(file_path: str, sheet_name: str, start_row: int, start_col:
     """
     log(f"🔍 Reading range {start_row},{start_col} to {end_row},{end_col} from {sheet_name} in {file_path}")
     try:
-        df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-        max_row, max_col = df.shape
-        
-        s_row = max(0, start_row)
-        e_row = min(max_row, end_row + 1)
-        s_col = max(0, start_col)
-        e_col = min(max_col, end_col + 1)
+        values = peek_sheet(file_path, sheet_name)
+        if values is None:
+            return _read_range_streaming(file_path, sheet_name, start_row, start_col, end_row, end_col)
+
+        max_row, max_col = values.shape
+        s_row, e_row, s_col, e_col = _clamp_range(values.shape, start_row, start_col, end_row, end_col)
         
         if s_row >= max_row or s_col >= max_col:
             return []
 
-        subset = df.iloc[s_row:e_row, s_col:e_col]
+        subset = pd.DataFrame(values[s_row:e_row, s_col:e_col])
         return subset.where(pd.notnull(subset), None).values.tolist()
     except Exception as e:
         log(f"Error reading range: {str(e)}")
@@ -91,15 +140,10 @@ def extract_range_to_csv(
     """
     log(f"💾 Extracting range {start_row},{start_col} to {end_row},{end_col} from {sheet_name} to {output_csv_path} (Transpose={transpose})")
     try:
-        df = pd.read_excel(excel_path, sheet_name=sheet_name, header=None)
-        
-        max_row, max_col = df.shape
-        s_row = max(0, start_row)
-        e_row = min(max_row, end_row + 1)
-        s_col = max(0, start_col)
-        e_col = min(max_col, end_col + 1)
+        values = get_sheet(excel_path, sheet_name)
+        s_row, e_row, s_col, e_col = _clamp_range(values.shape, start_row, start_col, end_row, end_col)
         
-        subset = df.iloc[s_row:e_row, s_col:e_col]
+        subset = pd.DataFrame(values[s_row:e_row, s_col:e_col])
         
         if transpose:
             subset = subset.transpose()
@@ -146,13 +190,13 @@ def extract_features_to_csv(
                 feature_name_map = json.loads(feature_name_map_json)
             except Exception as e:
                 log(f"Warning: Failed to parse feature_name_map_json: {e}")
-        df = pd.read_excel(excel_path, sheet_name=sheet_name, header=None)
+        values = get_sheet(excel_path, sheet_name)
         os.makedirs(os.path.dirname(output_csv_path), exist_ok=True)
         if not os.path.exists(output_csv_path):
             
-            entities = df.iloc[header_row_index, start_col + 1 : end_col + 1].tolist()
+            entities = values[header_row_index, start_col + 1 : end_col + 1].tolist()
             df_out = pd.DataFrame({"cooperativa": entities})
-            df_out.to_csv(output_csv_path, index=False, encoding='utf-8-sig')
+            write_csv_atomic(output_csv_path, df_out)
             log(f"Initialized CSV with {len(entities)} entities.")
         df_out = pd.read_csv(output_csv_path, encoding='utf-8-sig')
         for row_idx in feature_row_indices:
@@ -160,9 +204,9 @@ def extract_features_to_csv(
             if str_idx in feature_name_map:
                 feature_name = feature_name_map[str_idx]
             else:
-                raw_name = str(df.iloc[row_idx, start_col]).strip()
+                raw_name = str(values[row_idx, start_col]).strip()
                 feature_name = normalize_feature_name(raw_name)
-            feature_data = df.iloc[row_idx, start_col + 1 : end_col + 1].tolist()
+            feature_data = values[row_idx, start_col + 1 : end_col + 1].tolist()
             if len(feature_data) != len(df_out):
                 if len(feature_data) < len(df_out):
                     feature_data.extend([None] * (len(df_out) - len(feature_data)))
@@ -175,7 +219,7 @@ def extract_features_to_csv(
                 feature_name = f"{feature_name}_{count}"
             
             df_out[feature_name] = feature_data
-        df_out.to_csv(output_csv_path, index=False, encoding='utf-8-sig')
+        write_csv_atomic(output_csv_path, df_out)
         return f"Successfully appended {len(feature_row_indices)} features."
         
     except Exception as e:
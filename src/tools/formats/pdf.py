@@ -1,12 +1,51 @@
 import pdfplumber
+import pypdfium2
 import base64
+import csv
+import hashlib
+import json
 import os
+import re
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from agents import function_tool
 from tools.shared import log
+from tools.utils.cache import cache_path, atomic_write_bytes, file_sha256
 
-def file_to_base64(file_path: str) -> str:
+PDF_TEXT_WORKERS = int(os.getenv("PDF_TEXT_WORKERS", str(os.cpu_count() or 1)))
+
+_page_text_cache: Dict[str, Dict] = {}
+
+TABLE_SETTINGS = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+    "snap_tolerance": 3,
+    "join_tolerance": 3,
+    "intersection_tolerance": 5,
+}
+MIN_FILL_RATIO = 0.8
+RATING_TOKEN = re.compile(r'\b(?:AAA|AA|A|BBB|BB|B|C|D|E)[+-]?(?=\s|$|/|\*)')
+NUMBER_TOKEN = re.compile(r'^-?[\d.,%]+$')
+
+PAGE_KEYWORDS = ("CALIFICACION", "SEGMENTO", "COOPERATIVA", "RIESGO", "INSTITUCION FINANCIERA", "RUC")
+MIN_PAGE_SCORE = float(os.getenv("PDF_MIN_PAGE_SCORE", "3"))
+# A multiple of 3 so each chunk encodes to base64 without padding and chunks can be concatenated.
+BASE64_CHUNK_BYTES = 3 * 256 * 1024
+
+def iter_base64_chunks(file_path: str, chunk_size: int = BASE64_CHUNK_BYTES) -> Iterator[str]:
+    """Yields the base64 encoding of a file chunk by chunk, reading at most `chunk_size` bytes at a time."""
     with open(file_path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            yield base64.b64encode(chunk).decode("ascii")
+
+def file_to_base64(file_path: str) -> str:
+    """
+    The whole base64 encoding of a file as one string. The chunks only bound the read buffer: the result
+    (~4/3 of the file) is held in memory, because the model input (`input_file.file_data`) must be a single
+    string inside the request. What keeps it small is uploading only the relevant pages (`prepare_pdf_for_model`).
+    """
+    return "".join(iter_base64_chunks(file_path))
 
 @function_tool
 def save_csv_from_pdf(content: str, output_filename: str) -> str:
@@ -60,27 +99,232 @@ def update_csv_with_correction(content: str, output_filename: str) -> str:
     
     return f"Successfully updated CSV with {diff_count} line changes."
 
+def _extract_pages_text(file_path: str, page_numbers: List[int]) -> Dict[int, str]:
+    with pdfplumber.open(file_path) as pdf:
+        return {n: pdf.pages[n - 1].extract_text() or "" for n in page_numbers}
+
+def _load_page_cache(digest: str) -> Dict:
+    """The cache record of a PDF: {"page_count": int or None, "pages": {page number: text}}."""
+    record = _page_text_cache.get(digest)
+    if record is None:
+        record = {"page_count": None, "pages": {}}
+        path = cache_path("pdf_text", f"{digest}.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if "pages" in data:
+                record = {"page_count": data.get("page_count"), "pages": {int(k): v for k, v in data["pages"].items()}}
+        _page_text_cache[digest] = record
+    return record
+
+def get_pdf_pages_text(file_path: str, start_page: Optional[int] = None, end_page: Optional[int] = None) -> Dict[int, str]:
+    """
+    Returns the text of each page in a range, keyed by 1-based page number.
+    Page text is cached in memory and on disk by (file SHA-256, page number); pages that are not
+    cached yet are extracted in parallel across a process pool.
+
+    Args:
+        file_path: The path to the PDF file.
+        start_page: First page to include (1-based). Defaults to the first page.
+        end_page: Last page to include (1-based, inclusive). Defaults to the last page.
+    """
+    digest = file_sha256(file_path)
+    record = _load_page_cache(digest)
+    pages = record["pages"]
+    if record["page_count"] is None:
+        with pdfplumber.open(file_path) as pdf:
+            record["page_count"] = len(pdf.pages)
+    page_count = record["page_count"]
+    first = 1 if start_page is None else max(1, start_page)
+    last = page_count if end_page is None else min(page_count, end_page)
+    wanted = list(range(first, last + 1))
+
+    missing = [n for n in wanted if n not in pages]
+    if missing:
+        workers = max(1, min(PDF_TEXT_WORKERS, len(missing)))
+        if workers == 1:
+            pages.update(_extract_pages_text(file_path, missing))
+        else:
+            batches = [missing[i::workers] for i in range(workers)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for result in pool.map(_extract_pages_text, [file_path] * workers, batches):
+                    pages.update(result)
+        # The page count is stored too, so later calls can skip opening the PDF.
+        data = json.dumps({"page_count": page_count, "pages": {str(k): v for k, v in pages.items()}}, ensure_ascii=False)
+        atomic_write_bytes(cache_path("pdf_text", f"{digest}.json"), data.encode("utf-8"))
+        log(f"   -> Extracted {len(missing)} pages ({len(wanted) - len(missing)} from cache)")
+    return {n: pages[n] for n in wanted}
+
+def _clean_cell(value) -> str:
+    if value is None:
+        return ""
+    return re.sub(r'\s+', ' ', str(value)).strip()
+
+def _is_header_row(row: List[str]) -> bool:
+    filled = [c for c in row if c]
+    if not row or len(filled) < 0.6 * len(row):
+        return False
+    numeric = [c for c in filled if NUMBER_TOKEN.match(c)]
+    return len(numeric) < 0.3 * len(filled)
+
+def looks_tabular(text: str) -> bool:
+    """Heuristic: a page whose text has many rating tokens or numeric-dense lines probably holds table data."""
+    if not text:
+        return False
+    lines = [l for l in text.splitlines() if l.strip()]
+    dense = sum(1 for l in lines if sum(ch.isdigit() for ch in l) >= 4)
+    return len(RATING_TOKEN.findall(text)) >= 5 or dense >= 5
+
+def score_page_text(text: str) -> float:
+    """
+    Scores how likely a page is to hold the cooperatives table: 2 points per keyword found
+    (e.g. "Calificación", "Segmento"), plus rating tokens and numeric-dense lines (capped at 5 each).
+    """
+    if not text:
+        return 0.0
+    plain = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('ASCII').upper()
+    keywords = sum(1 for k in PAGE_KEYWORDS if k in plain)
+    ratings = len(RATING_TOKEN.findall(text))
+    lines = [l for l in text.splitlines() if l.strip()]
+    dense = sum(1 for l in lines if sum(ch.isdigit() for ch in l) >= 4)
+    return 2 * keywords + min(ratings, 5) + min(dense, 5)
+
+def select_relevant_pages(file_path: str, min_score: float = MIN_PAGE_SCORE) -> List[int]:
+    """
+    Returns the 1-based pages whose text scores at least `min_score` with `score_page_text`.
+    Every page is returned if none qualifies (e.g. scanned PDFs without a text layer).
+    """
+    pages = get_pdf_pages_text(file_path)
+    relevant = [n for n, text in pages.items() if score_page_text(text) >= min_score]
+    return relevant or sorted(pages)
+
+def build_reduced_pdf(file_path: str, pages: List[int]) -> str:
+    """
+    Writes a PDF containing only `pages` (1-based, in the given order) of `file_path` to the cache and returns
+    its path. Reduced files are keyed by the source file's SHA-256 and the page list, so they are built once.
+    """
+    page_key = ",".join(str(p) for p in pages)
+    digest = hashlib.sha1(f"{file_sha256(file_path)}|{page_key}".encode("utf-8")).hexdigest()
+    output_path = cache_path("pdf_pruned", f"{digest}.pdf")
+    if os.path.exists(output_path):
+        return output_path
+
+    source = pypdfium2.PdfDocument(file_path)
+    reduced = pypdfium2.PdfDocument.new()
+    try:
+        reduced.import_pages(source, [p - 1 for p in pages])
+        tmp_path = f"{output_path}.tmp"
+        reduced.save(tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        reduced.close()
+        source.close()
+    return output_path
+
+def prepare_pdf_for_model(file_path: str, pages: Optional[List[int]] = None) -> Tuple[str, List[int]]:
+    """
+    Chooses what to upload to the model: a reduced PDF with only the relevant pages (or the given `pages`),
+    or the original file when every page is kept.
+
+    Returns:
+        The path of the file to upload and the original page numbers it contains, in order.
+    """
+    with pdfplumber.open(file_path) as pdf:
+        page_count = len(pdf.pages)
+    kept = sorted(set(pages)) if pages else select_relevant_pages(file_path)
+    kept = [p for p in kept if 1 <= p <= page_count]
+    if not kept or len(kept) == page_count:
+        return file_path, list(range(1, page_count + 1))
+
+    reduced_path = build_reduced_pdf(file_path, kept)
+    log(
+        f"✂️ Uploading {len(kept)}/{page_count} pages of {os.path.basename(file_path)} "
+        f"(pages {kept}, {os.path.getsize(file_path)} -> {os.path.getsize(reduced_path)} bytes)"
+    )
+    return reduced_path, kept
+
+def extract_pdf_tables(file_path: str, output_path: Optional[str] = None) -> Dict:
+    """
+    Extracts the main table of a PDF with pdfplumber's table finder, stitching tables that continue across
+    pages (repeated header rows are dropped) and checking each page's confidence.
+
+    A page passes when its table has the same width as the header and at least MIN_FILL_RATIO of its data
+    cells are filled. Pages without a table are skipped, unless their text looks tabular (then they fail).
+
+    Args:
+        file_path: The path to the PDF file.
+        output_path: Where to write the stitched CSV. Nothing is written if omitted or no header was found.
+
+    Returns:
+        A dict with header, rows_by_page (page number -> rows), pages_ok, pages_failed and pages_skipped.
+    """
+    header: Optional[List[str]] = None
+    rows_by_page: Dict[int, List[List[str]]] = {}
+    pages_ok, pages_failed, pages_skipped = [], [], []
+
+    with pdfplumber.open(file_path) as pdf:
+        for page in pdf.pages:
+            number = page.page_number
+            tables = page.extract_tables(TABLE_SETTINGS)
+            if not tables:
+                (pages_failed if looks_tabular(page.extract_text() or "") else pages_skipped).append(number)
+                continue
+
+            table = max(tables, key=len)
+            rows = [[_clean_cell(c) for c in row] for row in table]
+            rows = [r for r in rows if any(r)]
+            if header is None:
+                header = next((r for r in rows if _is_header_row(r)), None)
+                if header is None:
+                    pages_failed.append(number)
+                    continue
+
+            data = [r for r in rows if r != header and not (_is_header_row(r) and r[:2] == header[:2])]
+            cells = sum(len(r) for r in data)
+            filled = sum(1 for r in data for c in r if c)
+            if not data or any(len(r) != len(header) for r in data) or filled < MIN_FILL_RATIO * cells:
+                pages_failed.append(number)
+                continue
+
+            rows_by_page[number] = data
+            pages_ok.append(number)
+
+    if output_path and header is not None:
+        write_table_csv(output_path, header, [r for n in sorted(rows_by_page) for r in rows_by_page[n]])
+
+    return {
+        "header": header,
+        "rows_by_page": rows_by_page,
+        "pages_ok": pages_ok,
+        "pages_failed": pages_failed,
+        "pages_skipped": pages_skipped,
+    }
+
+def write_table_csv(output_path: str, header: List[str], rows: List[List[str]]):
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
 @function_tool
-def extract_text_from_pdf(file_path: str) -> str:
+def extract_text_from_pdf(file_path: str, start_page: Optional[int] = None, end_page: Optional[int] = None) -> str:
     """
     Extracts all text from a PDF file using pdfplumber for high accuracy.
+    Results are cached per page, so repeated calls on the same file are instant.
     
     Args:
         file_path: The path to the PDF file.
+        start_page: Optional first page to extract (1-based).
+        end_page: Optional last page to extract (1-based, inclusive).
         
     Returns:
         A string containing all the text extracted from the PDF.
     """
     log(f"📖 Extracting text from PDF: {file_path}")
     try:
-        text_content = []
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    text_content.append(text)
-        
-        full_text = "\n".join(text_content)
+        pages = get_pdf_pages_text(file_path, start_page, end_page)
+        full_text = "\n".join(text for text in pages.values() if text)
         return full_text
     except Exception as e:
         return f"Error extracting text from PDF: {str(e)}"
@@ -0,0 +1,147 @@
+import atexit
+import os
+import tempfile
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import pandas as pd
+from agents import AgentHooks
+from tools.shared import log
+
+@dataclass
+class _ResidentTable:
+    df: pd.DataFrame
+    mtime_ns: int
+    dirty: bool = False
+
+_tables: Dict[str, _ResidentTable] = {}
+_lock = threading.RLock()
+
+def _key(file_path: str) -> str:
+    return os.path.abspath(file_path)
+
+def dedup_column_names(names: List[str]) -> List[str]:
+    """
+    Renames duplicated column names the same way `pd.read_csv` does ("x", "x.1", "x.2", ...),
+    so a resident frame always looks like the file would after a save and reload.
+    """
+    names = list(names)
+    counts = defaultdict(int)
+    for i, col in enumerate(names):
+        cur_count = counts[col]
+        while cur_count > 0:
+            counts[col] = cur_count + 1
+            col = f"{col}.{cur_count}"
+            cur_count = counts[col]
+        names[i] = col
+        counts[col] = cur_count + 1
+    return names
+
+def get_table(file_path: str) -> pd.DataFrame:
+    """
+    Returns the resident DataFrame for a CSV file, loading it from disk on first use.
+    A clean table is reloaded if the file changed on disk since it was loaded.
+
+    Args:
+        file_path: The path to the CSV file.
+
+    Returns:
+        The resident DataFrame. Treat it as read-only; use `put_table` to store edits.
+    """
+    key = _key(file_path)
+    with _lock:
+        entry = _tables.get(key)
+        disk_mtime = os.stat(key).st_mtime_ns if os.path.exists(key) else None
+        if entry is not None:
+            if entry.dirty or disk_mtime is None or disk_mtime == entry.mtime_ns:
+                if entry.dirty and disk_mtime is not None and disk_mtime != entry.mtime_ns:
+                    log(f"⚠️ {file_path} changed on disk while it had unsaved edits; keeping the in-memory version.")
+                return entry.df
+
+        df = pd.read_csv(key, encoding='utf-8-sig')
+        _tables[key] = _ResidentTable(df=df, mtime_ns=os.stat(key).st_mtime_ns)
+        return df
+
+def put_table(file_path: str, df: pd.DataFrame):
+    """
+    Replaces the resident DataFrame for a CSV file and marks it for a write-behind flush.
+    """
+    key = _key(file_path)
+    with _lock:
+        entry = _tables.get(key)
+        mtime_ns = entry.mtime_ns if entry else 0
+        _tables[key] = _ResidentTable(df=df, mtime_ns=mtime_ns, dirty=True)
+
+def write_csv_atomic(file_path: str, df: pd.DataFrame):
+    """
+    Writes a DataFrame as utf-8-sig CSV through a temporary file + rename, so readers never see a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".csv")
+    os.close(fd)
+    try:
+        df.to_csv(tmp_path, index=False, encoding='utf-8-sig')
+        os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def flush_tables(file_paths: Optional[List[str]] = None, folder: Optional[str] = None) -> List[str]:
+    """
+    Persists resident tables with unsaved edits. Each written table is reloaded from the file, so its dtypes
+    are inferred again instead of keeping the object columns left by cell edits.
+
+    Args:
+        file_paths: Only flush these files. If None, every dirty table is a candidate.
+        folder: Only flush files located inside this folder.
+
+    Returns:
+        The list of files that were written.
+    """
+    with _lock:
+        keys = [_key(p) for p in file_paths] if file_paths is not None else list(_tables)
+        if folder is not None:
+            folder_key = _key(folder)
+            keys = [k for k in keys if os.path.dirname(k) == folder_key]
+
+        written = []
+        for key in keys:
+            entry = _tables.get(key)
+            if entry is None or not entry.dirty:
+                continue
+            write_csv_atomic(key, entry.df)
+            entry.df = pd.read_csv(key, encoding='utf-8-sig')
+            entry.mtime_ns = os.stat(key).st_mtime_ns
+            entry.dirty = False
+            written.append(key)
+
+    if written:
+        log(f"💾 Flushed {len(written)} resident table(s) to disk")
+    return written
+
+def discard_tables(file_paths: Optional[List[str]] = None, folder: Optional[str] = None):
+    """
+    Drops resident tables (unsaved edits are lost): the given files, every table under `folder`
+    (recursively), or all of them if neither is given.
+    """
+    with _lock:
+        if folder is not None:
+            prefix = os.path.join(_key(folder), "")
+            for key in [k for k in _tables if k.startswith(prefix)]:
+                del _tables[key]
+        elif file_paths is None:
+            _tables.clear()
+        else:
+            for p in file_paths:
+                _tables.pop(_key(p), None)
+
+class FlushTablesHooks(AgentHooks):
+    """Agent hooks that persist every resident table once the agent produces its final output."""
+
+    async def on_end(self, context, agent, output):
+        flush_tables()
+
+atexit.register(flush_tables)
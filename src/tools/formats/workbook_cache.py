@@ -0,0 +1,136 @@
+import hashlib
+import io
+import os
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from tools.shared import log
+from tools.utils.cache import cache_path, atomic_write_bytes
+from tools.utils.archive import open_source, source_key
+warnings.filterwarnings("ignore", category=UserWarning, module="openpyxl")
+
+MAX_CACHED_SHEETS = int(os.getenv("WORKBOOK_CACHE_MAX_SHEETS", "16"))
+SPILL_TO_DISK = os.getenv("WORKBOOK_CACHE_SPILL", "1") == "1"
+
+_sheets: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+_lock = threading.Lock()
+
+def _cache_key(file_path: str, sheet_name: str) -> Tuple:
+    return (*source_key(file_path), sheet_name)
+
+def _sidecar_path(key: Tuple) -> str:
+    digest = hashlib.sha1("|".join(str(k) for k in key).encode("utf-8")).hexdigest()
+    return cache_path("workbooks", f"{digest}.npy")
+
+def _remember(key: Tuple, values: np.ndarray):
+    with _lock:
+        _sheets[key] = values
+        _sheets.move_to_end(key)
+        while len(_sheets) > MAX_CACHED_SHEETS:
+            _sheets.popitem(last=False)
+
+def _load_sidecar(key: Tuple) -> Optional[np.ndarray]:
+    if not SPILL_TO_DISK:
+        return None
+    path = _sidecar_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        return np.load(path, allow_pickle=True)
+    except Exception as e:
+        log(f"⚠️ Ignoring unreadable workbook sidecar {path}: {e}")
+        return None
+
+def _save_sidecar(key: Tuple, values: np.ndarray):
+    if not SPILL_TO_DISK:
+        return
+    try:
+        buffer = io.BytesIO()
+        np.save(buffer, values, allow_pickle=True)
+        atomic_write_bytes(_sidecar_path(key), buffer.getvalue())
+    except Exception as e:
+        log(f"⚠️ Could not write workbook sidecar: {e}")
+
+def parse_sheet(file_path: str, sheet_name: str) -> np.ndarray:
+    """
+    Parses a whole sheet into a 2D object array, with the same shape and cell values as
+    `pd.read_excel(file_path, sheet_name=sheet_name, header=None)`.
+    """
+    df = pd.read_excel(open_source(file_path), sheet_name=sheet_name, header=None)
+    return df.to_numpy(dtype=object)
+
+def peek_sheet(file_path: str, sheet_name: str) -> Optional[np.ndarray]:
+    """
+    Returns the cached array for a sheet (memory first, then disk sidecar) without parsing the workbook.
+    Returns None if the sheet has not been parsed yet for the current version of the file.
+    """
+    key = _cache_key(file_path, sheet_name)
+    with _lock:
+        values = _sheets.get(key)
+        if values is not None:
+            _sheets.move_to_end(key)
+            return values
+    values = _load_sidecar(key)
+    if values is not None:
+        _remember(key, values)
+    return values
+
+def get_sheet(file_path: str, sheet_name: str) -> np.ndarray:
+    """
+    Returns the parsed contents of a sheet as a 2D object array (NaN for empty cells).
+    Each (path, mtime, sheet) is parsed only once; later calls are served from a bounded
+    in-memory LRU or from the disk sidecar written on the first parse.
+
+    Args:
+        file_path: The path to the Excel file.
+        sheet_name: The name of the sheet.
+
+    Returns:
+        A numpy object array indexed as [row, col] (0-based).
+    """
+    values = peek_sheet(file_path, sheet_name)
+    if values is not None:
+        return values
+
+    key = _cache_key(file_path, sheet_name)
+    log(f"📥 Parsing sheet '{sheet_name}' from {file_path} into workbook cache")
+    values = parse_sheet(file_path, sheet_name)
+    _remember(key, values)
+    _save_sidecar(key, values)
+    return values
+
+def prefetch_sheets(file_path: str, sheet_names: List[str], max_workers: Optional[int] = None) -> List[str]:
+    """
+    Parses several sheets of a workbook in parallel worker processes and stores them in the cache,
+    so later tool calls on those sheets are served from memory or from the disk sidecars.
+
+    Args:
+        file_path: The path to the Excel file.
+        sheet_names: The sheets to parse. Sheets already cached are skipped.
+        max_workers: Size of the process pool (defaults to the number of CPUs).
+
+    Returns:
+        The list of sheets that were parsed by this call.
+    """
+    pending = [name for name in sheet_names if peek_sheet(file_path, name) is None]
+    if not pending:
+        return []
+
+    log(f"⚙️ Parsing {len(pending)} sheets from {file_path} in parallel")
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: pool.submit(parse_sheet, file_path, name) for name in pending}
+        for name, future in futures.items():
+            key = _cache_key(file_path, name)
+            values = future.result()
+            _remember(key, values)
+            _save_sidecar(key, values)
+    return pending
+
+def clear_workbook_cache():
+    """Drops every sheet held in memory. Disk sidecars are kept."""
+    with _lock:
+        _sheets.clear()
@@ -4,8 +4,8 @@ import subprocess
 from agents import function_tool
 from tools.shared import log
 
-@function_tool
-def push_to_public_repo(local_file_path: str) -> str:
+def publish_dataset(local_file_path: str) -> str:
+    """Replaces the contents of the public dataset repo with `local_file_path` and pushes it (no-op if unchanged)."""
     USER = os.getenv("GITHUB_USER")
     TOKEN = os.getenv("GITHUB_TOKEN")
     REPO_NAME = os.getenv("GITHUB_REPO")
@@ -79,4 +79,8 @@ def push_to_public_repo(local_file_path: str) -> str:
             try:
                 shutil.rmtree(repo_dir, onexc=handle_remove_readonly)
             except Exception as e:
-                log(f"⚠️ Warning: Could not remove temp dir: {e}")
\ No newline at end of file
+                log(f"⚠️ Warning: Could not remove temp dir: {e}")
+
+@function_tool
+def push_to_public_repo(local_file_path: str) -> str:
+    return publish_dataset(local_file_path)
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import re
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urldefrag, urlparse, unquote
+import httpx
+import lxml.html
+from agents import function_tool
+from tools.shared import log
+from tools.utils.http import USER_AGENT
+from tools.utils import replay
+
+CRAWL_CONCURRENCY = int(os.getenv("CRAWL_CONCURRENCY", "4"))
+CRAWL_HOST_DELAY = float(os.getenv("CRAWL_HOST_DELAY", "0.5"))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "200"))
+DOWNLOAD_EXTENSIONS = {"zip", "xlsx", "xlsm", "xls", "csv", "pdf"}
+TIMEOUT = httpx.Timeout(20.0, connect=10.0)
+
+class _HostThrottle:
+    """Spaces consecutive requests to the same host by at least `delay` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._next_slot: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, host: str):
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.delay
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+def _host(url: str) -> str:
+    host = urlparse(url).netloc.lower()
+    return host[4:] if host.startswith("www.") else host
+
+def _extension(url: str) -> str:
+    name = unquote(urlparse(url).path).rsplit("/", 1)[-1]
+    return name.rsplit(".", 1)[-1].lower() if "." in name else ""
+
+def _extract_links(html: str, base_url: str) -> List[tuple]:
+    """Returns (absolute_url, anchor_text) for every http(s) `<a href>` in the page, fragments removed."""
+    try:
+        document = lxml.html.fromstring(html)
+    except (lxml.etree.ParserError, ValueError):
+        return []
+    links = []
+    for anchor in document.iter("a"):
+        href = (anchor.get("href") or "").strip()
+        if not href or href.startswith(("javascript:", "mailto:", "tel:")):
+            continue
+        url = urldefrag(urljoin(base_url, href))[0]
+        if urlparse(url).scheme in ("http", "https"):
+            text = " ".join(anchor.text_content().split()) or anchor.get("title", "")
+            links.append((url, text))
+    return links
+
+async def crawl(start_url: str, max_depth: int = 2, allow_patterns: Optional[List[str]] = None,
+                concurrency: int = CRAWL_CONCURRENCY, host_delay: float = CRAWL_HOST_DELAY,
+                max_pages: int = CRAWL_MAX_PAGES, client: Optional[httpx.AsyncClient] = None) -> Dict:
+    """
+    Breadth-first crawl of the HTML pages on the same domain as `start_url`, up to `max_depth` links away.
+
+    - At most `concurrency` requests are in flight; requests to one host are spaced by `host_delay` seconds.
+    - Pages are fetched once each (URLs without fragment), and at most `max_pages` pages are fetched.
+    - Only pages whose URL matches one of `allow_patterns` (regular expressions) are followed, if given;
+      the start page is always fetched.
+    - Links whose path ends in one of DOWNLOAD_EXTENSIONS are collected, not fetched.
+
+    Returns:
+        A dict with pages_crawled, pages_failed (url -> error) and files: one entry per distinct file URL
+        with url, extension, text (anchor text) and found_on (page where it was first seen).
+    """
+    patterns = [re.compile(p, re.IGNORECASE) for p in allow_patterns or []]
+    domain = _host(start_url)
+    throttle = _HostThrottle(host_delay)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    seen = {urldefrag(start_url)[0]}
+    files: Dict[str, Dict] = {}
+    failed: Dict[str, str] = {}
+    crawled = 0
+
+    owns_client = client is None
+    if owns_client:
+        client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=TIMEOUT,
+            follow_redirects=True,
+            transport=replay.async_transport(limits=httpx.Limits(max_connections=max(1, concurrency))),
+        )
+
+    async def fetch(url: str) -> Optional[tuple]:
+        # Links without a file extension can still serve a file: the body is only read once the
+        # headers say it is HTML, so such downloads are not pulled in full just to be discarded.
+        async with semaphore:
+            await throttle.wait(_host(url))
+            try:
+                async with client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    if "html" not in response.headers.get("content-type", "html"):
+                        return None
+                    await response.aread()
+            except httpx.HTTPError as e:
+                failed[url] = str(e) or type(e).__name__
+                return None
+        return str(response.url), response.text
+
+    try:
+        frontier = [urldefrag(start_url)[0]]
+        for depth in range(max_depth + 1):
+            if not frontier:
+                break
+            frontier = frontier[:max(0, max_pages - crawled)]
+            pages = await asyncio.gather(*(fetch(url) for url in frontier))
+            crawled += len(frontier)
+            next_frontier = []
+            for page_url, page in zip(frontier, pages):
+                if page is None:
+                    continue
+                final_url, html = page
+                for url, text in _extract_links(html, final_url):
+                    extension = _extension(url)
+                    if extension in DOWNLOAD_EXTENSIONS:
+                        files.setdefault(url, {"url": url, "extension": extension, "text": text, "found_on": page_url})
+                    elif (
+                        depth < max_depth
+                        and url not in seen
+                        and _host(url) == domain
+                        and (not patterns or any(p.search(url) for p in patterns))
+                    ):
+                        seen.add(url)
+                        next_frontier.append(url)
+            frontier = next_frontier
+    finally:
+        if owns_client:
+            await client.aclose()
+
+    return {"pages_crawled": crawled, "pages_failed": failed, "files": list(files.values())}
+
+@function_tool
+async def crawl_links(start_url: str, max_depth: int = 2, allow_patterns: List[str] = None):
+    """
+    Recorre un sitio SIN navegador (HTTP + HTML estático), en anchura, desde `start_url` y solo dentro del
+    mismo dominio, y devuelve un índice de los enlaces a archivos descargables (zip, xlsx, xlsm, xls, csv, pdf)
+    con su texto de enlace y la página donde aparecen. Úsalo ANTES de navegar con el navegador: solo hace
+    falta el navegador si la página genera sus enlaces con JavaScript o tras interacciones.
+
+    Args:
+        start_url: URL desde la que empezar (ej: la página de estadísticas del portal).
+        max_depth: Cuántos clics de distancia seguir desde la página inicial (0 = solo esa página).
+        allow_patterns: (Opcional) Expresiones regulares; solo se siguen las páginas cuya URL coincida con alguna
+            (ej: ["estadistic", "boletin"]). La página inicial siempre se visita.
+    """
+    log(f"🕸️ Rastreando {start_url} (profundidad {max_depth})")
+    result = await crawl(start_url, max_depth=max_depth, allow_patterns=allow_patterns)
+    log(f"   {result['pages_crawled']} páginas visitadas, {len(result['files'])} archivos encontrados")
+    return result
@@ -1,18 +1,114 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 from agents import function_tool
 from ddgs import DDGS
 from tools.shared import log
+from tools.utils.cache import cache_path, atomic_write_bytes
 
-@function_tool
-def internet_search(query: str):
-    log(f"🌍 Buscando → {query}")
-    results = []
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(24 * 3600)))
+SEARCH_MAX_RESULTS = 8
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", "4"))
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+def normalize_query(query: str) -> str:
+    """Cache key of a query: Unicode-normalized, lowercased, with whitespace collapsed."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", query)).strip().lower()
+
+def _cache_file(normalized: str) -> str:
+    return cache_path("search", f"{hashlib.sha256(normalized.encode('utf-8')).hexdigest()}.json")
+
+def _load_cached(normalized: str):
+    path = _cache_file(normalized)
+    if SEARCH_CACHE_TTL <= 0 or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if time.time() - entry["fetched_at"] > SEARCH_CACHE_TTL:
+        return None
+    return entry["results"]
+
+def _count(event: str):
+    with _stats_lock:
+        _stats[event] += 1
+
+def search_cache_stats() -> Dict[str, int]:
+    """Hits and misses of the search cache since the process started."""
+    with _stats_lock:
+        return {"hits": _stats["hits"], "misses": _stats["misses"]}
+
+def search(query: str) -> List[Dict]:
+    """
+    DuckDuckGo text search (title, url, snippet of up to SEARCH_MAX_RESULTS results). Results are cached on disk
+    per normalized query for SEARCH_CACHE_TTL seconds; empty answers are not cached.
+    """
+    normalized = normalize_query(query)
+    cached = _load_cached(normalized)
+    if cached is not None:
+        _count("hits")
+        return cached
 
+    _count("misses")
+    results = []
     with DDGS() as ddgs:
-        for r in ddgs.text(query, max_results=8):
+        for r in ddgs.text(query, max_results=SEARCH_MAX_RESULTS):
             results.append({
                 "title": r.get("title"),
                 "url": r.get("href"),
                 "snippet": r.get("body")
             })
 
+    if results:
+        entry = {"query": normalized, "fetched_at": time.time(), "results": results}
+        atomic_write_bytes(_cache_file(normalized), json.dumps(entry, ensure_ascii=False).encode("utf-8"))
     return results
+
+@function_tool
+def internet_search(query: str):
+    log(f"🌍 Buscando → {query}")
+    return search(query)
+
+@function_tool
+def internet_search_many(queries: List[str]):
+    """
+    Ejecuta varias búsquedas a la vez: las que ya están en caché se responden al instante y el resto se
+    lanzan en paralelo. Devuelve, en el mismo orden, un objeto por consulta con `query` y `results`
+    (o `error` si esa búsqueda falló), más los contadores de la caché.
+
+    Args:
+        queries: Lista de consultas de búsqueda.
+    """
+    log(f"🌍 Buscando {len(queries)} consultas → {queries}")
+    unique = {}
+    for query in queries:
+        unique.setdefault(normalize_query(query), query)
+
+    def run(query: str):
+        try:
+            return {"results": search(query)}
+        except Exception as e:
+            return {"error": str(e)}
+
+    answers = {}
+    if unique:
+        with ThreadPoolExecutor(max_workers=max(1, min(SEARCH_WORKERS, len(unique)))) as pool:
+            answers = dict(zip(unique, pool.map(run, unique.values())))
+
+    stats = search_cache_stats()
+    log(f"   Caché de búsqueda: {stats['hits']} aciertos, {stats['misses']} fallos")
+    return {
+        "searches": [{"query": q, **answers[normalize_query(q)]} for q in queries],
+        "cache": stats,
+    }
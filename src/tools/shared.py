@@ -31,7 +31,9 @@ def report_agent_start(title: str, description: str):
 
 @function_tool
 def report_agent_completion(title: str, output: str):
+    from tools.formats.table_store import flush_tables
     try:
+        flush_tables()
         with open(LOG_FILE_PATH, "a", encoding="utf-8") as f:
             f.write(f"\n{'='*40}\n")
             f.write(f"AGENT: {title}\n")
@@ -1,8 +1,13 @@
+import hashlib
+import json
 import os
 from typing import List
+import numpy as np
 import pandas as pd
 from agents import function_tool
 from tools.shared import log
+from tools.utils.stage_cache import run_cached_stage
+from tools.utils.cache import cache_path, file_sha256, atomic_write_bytes
 
 RATING_ORDER = ["AAA","AA","A","BBB","BB","B","C","D","E"]
 RATING_MAP = {r: i for i, r in enumerate(RATING_ORDER)}
@@ -77,16 +82,19 @@ def append_aligned_columns(file_path: str, index_mapping: List[int], output_path
         df_target = pd.read_csv(output_path, encoding='utf-8-sig')
         if len(index_mapping) != len(df_target):
             return f"Error: Mapping length {len(index_mapping)} != Target length {len(df_target)}"
-        aligned_rows = []
-        for src_idx in index_mapping:
-            if src_idx == -1:
-                aligned_rows.append({col: None for col in df_source_data.columns})
-            elif 0 <= src_idx < len(df_source):
-                aligned_rows.append(df_source_data.iloc[src_idx].to_dict())
-            else:
-                return f"Error: Source index {src_idx} out of bounds (0-{len(df_source)-1})"
-                
-        df_aligned = pd.DataFrame(aligned_rows)
+        mapping = np.asarray(index_mapping, dtype=np.int64)
+        invalid = (mapping < -1) | (mapping >= len(df_source))
+        if invalid.any():
+            src_idx = int(mapping[np.argmax(invalid)])
+            return f"Error: Source index {src_idx} out of bounds (0-{len(df_source)-1})"
+
+        # -1 is not a row label of the RangeIndex, so reindex fills those rows with nulls.
+        # Integer columns become nullable Int64 instead of being upcast to float.
+        df_source_data = df_source_data.reset_index(drop=True)
+        if (mapping == -1).any():
+            int_cols = df_source_data.select_dtypes(include="integer").columns
+            df_source_data = df_source_data.astype({c: "Int64" for c in int_cols})
+        df_aligned = df_source_data.reindex(mapping)
         df_target.reset_index(drop=True, inplace=True)
         df_aligned.reset_index(drop=True, inplace=True)
         
@@ -135,10 +143,9 @@ def append_cleaned_risk_column(file_path: str, column_name: str, index_mapping:
     except Exception as e:
         return f"Error appending risk column: {str(e)}"
 
-@function_tool
-def finalize_and_clean_dataset(file_path: str) -> str:
+def _finalize_dataset(file_path: str) -> str:
     """
-    Performs professional cleaning and normalization on the consolidated dataset.
+    Performs professional cleaning and normalization on the consolidated dataset, in place.
     Steps:
     1. Correct data types (remove symbols, convert to float).
     2. Remove garbage columns (>50% nulls, constant).
@@ -198,3 +205,50 @@ def finalize_and_clean_dataset(file_path: str) -> str:
         
     except Exception as e:
         return f"Error in final cleaning: {str(e)}"
+
+def _finalized_record_path(file_path: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+    return cache_path("finalized", f"{digest}.json")
+
+def finalize_dataset(file_path: str) -> str:
+    """
+    Runs the final cleaning of `finalize_and_clean_dataset` through the stage cache. The cleaning rewrites
+    `file_path` in place, so the SHA-256 of every file it produces is recorded: a file that is already the
+    output of a previous run (e.g. `--from-stage finalize` after a failed publish) is left untouched instead
+    of being imputed and standardized a second time.
+    """
+    record_path = _finalized_record_path(file_path)
+    if os.path.exists(file_path) and os.path.exists(record_path):
+        with open(record_path, "r", encoding="utf-8") as f:
+            record = json.load(f)
+        if record["sha256"] == file_sha256(file_path):
+            log(f"♻️ {file_path} is already finalized; skipping the final cleaning")
+            return record["result"]
+
+    result = run_cached_stage(
+        "finalize",
+        inputs=[file_path],
+        params={},
+        outputs=[file_path],
+        run=lambda: _finalize_dataset(file_path),
+    )
+    if not result.startswith("Error"):
+        record = {"sha256": file_sha256(file_path), "result": result}
+        atomic_write_bytes(record_path, json.dumps(record, ensure_ascii=False).encode("utf-8"))
+    return result
+
+@function_tool
+def finalize_and_clean_dataset(file_path: str) -> str:
+    """
+    Performs professional cleaning and normalization on the consolidated dataset.
+    Steps:
+    1. Correct data types (remove symbols, convert to float).
+    2. Remove garbage columns (>50% nulls, constant).
+    3. Impute nulls with median.
+    4. Remove duplicates.
+    5. Normalize features (StandardScaler logic), excluding 'cooperativa', 'abreviacion', 'Label'.
+    
+    Args:
+        file_path: Path to the consolidated dataset CSV.
+    """
+    return finalize_dataset(file_path)
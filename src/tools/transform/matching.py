@@ -0,0 +1,162 @@
+import os
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from agents import function_tool
+from tools.shared import log
+from tools.utils.parsing import normalize_entity_name
+
+MATCH_THRESHOLD = 0.85
+REVIEW_THRESHOLD = 0.95
+MAX_CANDIDATES = 10
+
+def _read_names(file_path: str) -> List[Optional[str]]:
+    """Reads the first column positionally (one entry per data row, None for empty cells)."""
+    df = pd.read_csv(file_path, usecols=[0], encoding='utf-8-sig')
+    return [str(v).strip() if pd.notnull(v) else None for v in df.iloc[:, 0].tolist()]
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _similarity(a: str, b: str, grams_a: set, grams_b: set) -> float:
+    if a == b:
+        return 1.0
+    dice = 2 * len(grams_a & grams_b) / (len(grams_a) + len(grams_b))
+    token_ratio = SequenceMatcher(None, " ".join(sorted(a.split())), " ".join(sorted(b.split()))).ratio()
+    return (dice + token_ratio) / 2
+
+def match_names(reference: List[Optional[str]], source: List[Optional[str]], threshold: float = MATCH_THRESHOLD) -> List[Tuple[int, float]]:
+    """
+    Matches each reference name to at most one source row.
+    Candidates come from a character-trigram inverted index over the normalized source names,
+    are scored with trigram Dice + token-sorted sequence similarity, and are assigned one-to-one
+    greedily from the best score down.
+
+    Args:
+        reference: Names to align (the destination order).
+        source: Names in the source file, in row order (None for empty rows).
+        threshold: Minimum similarity (0-1) to accept a match.
+
+    Returns:
+        One (source_index, score) tuple per reference name; (-1, 0.0) when there is no match.
+    """
+    norm_source = [normalize_entity_name(s) if s else "" for s in source]
+    grams_source = [_trigrams(s) if s else set() for s in norm_source]
+    exact = defaultdict(list)
+    index = defaultdict(list)
+    for j, (name, grams) in enumerate(zip(norm_source, grams_source)):
+        if not name:
+            continue
+        exact[name].append(j)
+        for gram in grams:
+            index[gram].append(j)
+
+    pairs = []
+    for i, ref in enumerate(reference):
+        name = normalize_entity_name(ref) if ref else ""
+        if not name:
+            continue
+        if name in exact:
+            pairs.extend((1.0, i, j) for j in exact[name])
+            continue
+        grams = _trigrams(name)
+        overlaps = Counter(j for gram in grams for j in index.get(gram, ()))
+        for j, _ in overlaps.most_common(MAX_CANDIDATES):
+            score = _similarity(name, norm_source[j], grams, grams_source[j])
+            if score >= threshold:
+                pairs.append((score, i, j))
+
+    result = [(-1, 0.0)] * len(reference)
+    used_ref, used_src = set(), set()
+    for score, i, j in sorted(pairs, key=lambda p: (-p[0], p[1], p[2])):
+        if i in used_ref or j in used_src:
+            continue
+        result[i] = (j, score)
+        used_ref.add(i)
+        used_src.add(j)
+    return result
+
+@function_tool
+def build_index_mapping(reference_csv: str, source_csv: str, threshold: float = MATCH_THRESHOLD) -> Dict:
+    """
+    Aligns the cooperatives of a source CSV to the rows of a reference CSV (e.g., the dataset being built),
+    matching the names in their first columns. Names are normalized (accents, punctuation, "LTDA",
+    "COOPERATIVA DE AHORRO Y CREDITO", etc.) and compared with a similarity score.
+
+    Args:
+        reference_csv: CSV whose row order defines the mapping (e.g., 'data/processed/dataset.csv').
+        source_csv: CSV whose rows are being aligned.
+        threshold: Minimum similarity (0-1) to accept a match. Default 0.85.
+
+    Returns:
+        A dict with:
+        - index_mapping: list (one per reference row) with the source row index, or -1. Ready for
+          `append_aligned_columns` / `append_cleaned_risk_column`.
+        - intersection: reference names that were matched.
+        - unmatched_reference / unmatched_source: names without a counterpart.
+        - to_review: accepted matches with a score below 0.95, to double-check.
+    """
+    log(f"🔗 Matching cooperatives of {source_csv} against {reference_csv}")
+    try:
+        reference = _read_names(reference_csv)
+        source = _read_names(source_csv)
+        matches = match_names(reference, source, threshold)
+
+        matched_sources = {j for j, _ in matches if j != -1}
+        to_review = [
+            {"reference": reference[i], "source": source[j], "score": round(score, 3)}
+            for i, (j, score) in enumerate(matches)
+            if j != -1 and score < REVIEW_THRESHOLD
+        ]
+        result = {
+            "index_mapping": [j for j, _ in matches],
+            "intersection": [reference[i] for i, (j, _) in enumerate(matches) if j != -1],
+            "unmatched_reference": [r for r, (j, _) in zip(reference, matches) if j == -1 and r],
+            "unmatched_source": [s for j, s in enumerate(source) if j not in matched_sources and s],
+            "to_review": to_review,
+        }
+        log(f"   -> Matched {len(result['intersection'])}/{len(reference)} rows ({len(to_review)} to review)")
+        return result
+    except Exception as e:
+        return {"error": f"Error building index mapping: {str(e)}"}
+
+@function_tool
+def intersect_cooperatives(csv_files: List[str], threshold: float = MATCH_THRESHOLD) -> Dict:
+    """
+    Finds the cooperatives present in ALL the given CSV files (first column), using the file with the
+    fewest names as the reference list. Use the returned names to initialize the dataset.
+
+    Args:
+        csv_files: CSV paths to intersect (include the risk CSV).
+        threshold: Minimum similarity (0-1) to accept a match. Default 0.85.
+
+    Returns:
+        A dict with the reference file, the intersected names (in reference order) and, per file,
+        the reference names that were not found in it.
+    """
+    log(f"🧮 Intersecting cooperatives across {len(csv_files)} files")
+    try:
+        names = {path: _read_names(path) for path in csv_files}
+        reference_csv = min(csv_files, key=lambda p: sum(1 for n in names[p] if n))
+        reference = [n for n in names[reference_csv] if n]
+
+        keep = [True] * len(reference)
+        missing = {}
+        for path in csv_files:
+            if path == reference_csv:
+                continue
+            matches = match_names(reference, names[path], threshold)
+            missing[os.path.basename(path)] = [r for r, (j, _) in zip(reference, matches) if j == -1]
+            keep = [k and j != -1 for k, (j, _) in zip(keep, matches)]
+
+        cooperatives = [r for r, k in zip(reference, keep) if k]
+        log(f"   -> {len(cooperatives)} cooperatives present in all files (reference: {reference_csv})")
+        return {
+            "reference_csv": reference_csv,
+            "cooperatives": cooperatives,
+            "missing_by_file": missing,
+        }
+    except Exception as e:
+        return {"error": f"Error intersecting cooperatives: {str(e)}"}
@@ -2,10 +2,10 @@ import pandas as pd
 import os
 from agents import function_tool
 from tools.shared import log
+from tools.formats.table_store import flush_tables
+from tools.utils.stage_cache import run_cached_stage
 
-
-@function_tool
-def merge_and_clean_csvs(temp_folder: str, output_folder: str, output_filename: str) -> str:
+def merge_csvs(temp_folder: str, output_folder: str, output_filename: str) -> str:
     """
     Merges all CSV files in a temporary folder into a single consolidated CSV file.
     
@@ -27,6 +27,7 @@ def merge_and_clean_csvs(temp_folder: str, output_folder: str, output_filename:
     
     output_path = os.path.join(output_folder, output_filename)
     try:
+        flush_tables(folder=temp_folder)
         files = [f for f in os.listdir(temp_folder) if f.endswith('.csv')]
         files.sort()
         
@@ -93,3 +94,30 @@ def merge_and_clean_csvs(temp_folder: str, output_folder: str, output_filename:
         return f"Successfully merged and cleaned data. Saved to {output_path}"
     except Exception as e:
         return f"❌ Error saving file: {str(e)}"
+
+@function_tool
+def merge_and_clean_csvs(temp_folder: str, output_folder: str, output_filename: str) -> str:
+    """
+    Merges all CSV files in a temporary folder into a single consolidated CSV file.
+    The first column is the merge key (Left Join from the first CSV), and empty, all-zero and constant
+    columns are removed afterwards.
+    
+    Args:
+        temp_folder: Path to the folder containing CSVs to merge (e.g., 'data/preprocessed/temp/').
+        output_folder: Path where the final CSV will be saved (e.g., 'data/preprocessed/').
+        output_filename: The name of the final CSV file (e.g., '2025-EEFF-MEN.csv').
+        
+    Returns:
+        A success message with the path of the created file.
+    """
+    flush_tables(folder=temp_folder)
+    csv_files = sorted(
+        os.path.join(temp_folder, f) for f in os.listdir(temp_folder) if f.endswith('.csv')
+    ) if os.path.isdir(temp_folder) else []
+    return run_cached_stage(
+        "merge",
+        inputs=csv_files,
+        params={"output_filename": output_filename},
+        outputs=[os.path.join(output_folder, output_filename)],
+        run=lambda: merge_csvs(temp_folder, output_folder, output_filename),
+    )
@@ -0,0 +1,126 @@
+import fnmatch
+import hashlib
+import io
+import json
+import os
+import zipfile
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from tools.utils.cache import cache_path, atomic_write_bytes
+
+# "data/raw/EEFF.zip::Segmento 1/Balance.xlsm" names a member inside a zip without extracting it.
+MEMBER_SEPARATOR = "::"
+
+def split_member_path(path: str) -> Tuple[str, Optional[str]]:
+    """Splits "archive.zip::member" into (archive path, member name); plain paths give (path, None)."""
+    if MEMBER_SEPARATOR in path:
+        zip_path, member = path.split(MEMBER_SEPARATOR, 1)
+        return zip_path, member
+    return path, None
+
+def is_member_path(path: str) -> bool:
+    return split_member_path(path)[1] is not None
+
+def member_path(zip_path: str, member: str) -> str:
+    return f"{zip_path}{MEMBER_SEPARATOR}{member}"
+
+def list_members(zip_path: str) -> List[Dict]:
+    """Lists the files of a zip from its central directory (nothing is decompressed)."""
+    with zipfile.ZipFile(zip_path) as zf:
+        return [
+            {
+                "name": info.filename,
+                "path": member_path(zip_path, info.filename),
+                "size": info.file_size,
+                "compressed_size": info.compress_size,
+                "crc": f"{info.CRC:08x}",
+                "modified": datetime(*info.date_time).isoformat(),
+            }
+            for info in zf.infolist()
+            if not info.is_dir()
+        ]
+
+def member_info(path: str) -> zipfile.ZipInfo:
+    zip_path, member = split_member_path(path)
+    with zipfile.ZipFile(zip_path) as zf:
+        return zf.getinfo(member)
+
+def open_member(path: str) -> io.BytesIO:
+    """Reads a zip member ("archive.zip::member") into memory and returns it as a seekable file object."""
+    zip_path, member = split_member_path(path)
+    with zipfile.ZipFile(zip_path) as zf:
+        return io.BytesIO(zf.read(member))
+
+def open_source(path: str):
+    """What file readers (pandas, openpyxl) should open: the path itself, or the member's bytes for a zip member path."""
+    return open_member(path) if is_member_path(path) else path
+
+def source_key(path: str) -> Tuple:
+    """
+    Identity of a file for caches: (absolute path, mtime_ns, size). For a zip member, the archive's identity
+    plus the member name and CRC.
+    """
+    zip_path, member = split_member_path(path)
+    abs_path = os.path.abspath(zip_path)
+    stat = os.stat(abs_path)
+    if member is None:
+        return (abs_path, stat.st_mtime_ns, stat.st_size)
+    return (abs_path, stat.st_mtime_ns, stat.st_size, member, member_info(path).CRC)
+
+def select_members(names: List[str], patterns: Optional[List[str]]) -> List[str]:
+    """Member names matching any of the glob `patterns` (case-insensitive; all names if no patterns)."""
+    if not patterns:
+        return list(names)
+    lowered = [p.lower() for p in patterns]
+    return [
+        name for name in names
+        if any(fnmatch.fnmatchcase(name.lower(), p) or fnmatch.fnmatchcase(os.path.basename(name).lower(), p) for p in lowered)
+    ]
+
+def _state_path(extract_to: str) -> str:
+    digest = hashlib.sha1(os.path.abspath(extract_to).encode("utf-8")).hexdigest()
+    return cache_path("unzip", f"{digest}.json")
+
+def _load_state(extract_to: str) -> Dict:
+    path = _state_path(extract_to)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def _save_state(extract_to: str, state: Dict):
+    atomic_write_bytes(_state_path(extract_to), json.dumps(state, ensure_ascii=False, indent=2).encode("utf-8"))
+
+def extract_members(zip_path: str, extract_to: str, patterns: Optional[List[str]] = None) -> Dict[str, List[str]]:
+    """
+    Extracts the members of `zip_path` matching `patterns` (all if None) into `extract_to`. A member is skipped
+    when the file on disk is the one extracted last time: same CRC and size in the zip, and the extracted file
+    still has the size and mtime it had right after extraction.
+
+    Returns:
+        {"extracted": [...], "up_to_date": [...]} with the member names.
+    """
+    os.makedirs(extract_to, exist_ok=True)
+    state = _load_state(extract_to)
+    summary = {"extracted": [], "up_to_date": []}
+    with zipfile.ZipFile(zip_path) as zf:
+        infos = {info.filename: info for info in zf.infolist() if not info.is_dir()}
+        for name in select_members(list(infos), patterns):
+            info = infos[name]
+            target = os.path.join(extract_to, name)
+            recorded = state.get(name)
+            if recorded and os.path.exists(target):
+                stat = os.stat(target)
+                if (recorded["crc"], recorded["size"], recorded["mtime_ns"]) == (info.CRC, stat.st_size, stat.st_mtime_ns) \
+                        and stat.st_size == info.file_size:
+                    summary["up_to_date"].append(name)
+                    continue
+            target = zf.extract(info, extract_to)
+            stat = os.stat(target)
+            state[name] = {"crc": info.CRC, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            summary["extracted"].append(name)
+    _save_state(extract_to, state)
+    return summary
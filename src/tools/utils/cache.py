@@ -0,0 +1,54 @@
+import hashlib
+import os
+import tempfile
+
+CACHE_DIR = os.getenv("PIPELINE_CACHE_DIR", "data/cache")
+
+def cache_path(*parts: str) -> str:
+    """
+    Builds a path inside the pipeline cache directory, creating its parent folder.
+
+    Args:
+        *parts: Path components relative to the cache root (e.g., 'workbooks', 'abc.npy').
+
+    Returns:
+        The full path to the cache entry.
+    """
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+_sha256_by_stat = {}
+
+def file_sha256(path: str) -> str:
+    """
+    Returns the SHA-256 hex digest of a file. Digests are memoized per (path, mtime, size),
+    so repeated calls on an unchanged file do not re-read it.
+    """
+    stat = os.stat(path)
+    stat_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    digest = _sha256_by_stat.get(stat_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        _sha256_by_stat[stat_key] = digest
+    return digest
+
+def atomic_write_bytes(path: str, data: bytes):
+    """
+    Writes bytes to a file atomically (temporary file + rename), so readers never see partial content.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
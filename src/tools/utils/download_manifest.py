@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+from tools.utils.cache import cache_path, atomic_write_bytes
+
+_lock = threading.Lock()
+
+def _manifest_path() -> str:
+    return cache_path("downloads", "manifest.json")
+
+def _blob_path(sha256: str) -> str:
+    return cache_path("downloads", "blobs", sha256[:2], sha256)
+
+def _load() -> Dict[str, Dict]:
+    path = _manifest_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def get_entry(url: str) -> Optional[Dict]:
+    """
+    Returns the manifest entry of a URL (etag, last_modified, size, sha256, filename, fetched_at),
+    or None if it was never downloaded or its cached copy is gone.
+    """
+    with _lock:
+        entry = _load().get(url)
+    if entry is None or not os.path.exists(_blob_path(entry["sha256"])):
+        return None
+    return entry
+
+def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+    """Builds If-None-Match / If-Modified-Since headers from a manifest entry."""
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+def is_unchanged(entry: Optional[Dict], etag: Optional[str], last_modified: Optional[str]) -> bool:
+    """True if the validators a server sent back match the recorded ones (for servers that ignore conditional requests)."""
+    if not entry:
+        return False
+    if etag and entry.get("etag"):
+        return etag == entry["etag"]
+    if last_modified and entry.get("last_modified"):
+        return last_modified == entry["last_modified"]
+    return False
+
+def record(url: str, path: str, sha256: str, etag: Optional[str], last_modified: Optional[str]):
+    """Stores a downloaded file as a content-addressed blob and records its validators for `url`."""
+    blob = _blob_path(sha256)
+    if not os.path.exists(blob):
+        tmp_path = f"{blob}.tmp"
+        shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, blob)
+    with _lock:
+        manifest = _load()
+        manifest[url] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "size": os.path.getsize(path),
+            "sha256": sha256,
+            "filename": os.path.basename(path),
+            "fetched_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        atomic_write_bytes(_manifest_path(), json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+def restore(entry: Dict, path: str):
+    """Copies the cached blob of a manifest entry to `path`."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.restore-tmp"
+    shutil.copyfile(_blob_path(entry["sha256"]), tmp_path)
+    os.replace(tmp_path, path)
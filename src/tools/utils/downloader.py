@@ -0,0 +1,297 @@
+import glob
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import requests
+import urllib3
+from tools.shared import log
+from tools.utils.cache import file_sha256
+from tools.utils.http import get_session, probe_url, total_size
+from tools.utils import download_manifest
+
+MIN_CHUNK_BYTES = 64 * 1024
+MAX_CHUNK_BYTES = 4 * 1024 * 1024
+DOWNLOAD_SEGMENTS = int(os.getenv("DOWNLOAD_SEGMENTS", "4"))
+PARALLEL_MIN_BYTES = int(os.getenv("DOWNLOAD_PARALLEL_MIN_BYTES", str(8 * 1024 * 1024)))
+DOWNLOAD_ATTEMPTS = int(os.getenv("DOWNLOAD_ATTEMPTS", "5"))
+TIMEOUT = (10, 60)
+
+class DownloadError(Exception):
+    """Raised when a download cannot be completed or fails size/checksum verification."""
+
+class RemoteChanged(DownloadError):
+    """Raised when the server answers a resumed range with the full (changed) file instead of the range."""
+
+@dataclass
+class DownloadResult:
+    path: str
+    url_final: str
+    size: int
+    sha256: str
+    seconds: float
+    segments: int
+    resumed_bytes: int
+    not_modified: bool = False
+
+    @property
+    def throughput_mbps(self) -> float:
+        return self.size / (1024 * 1024) / max(self.seconds, 1e-6)
+
+    def summary(self) -> str:
+        if self.not_modified:
+            return f"{self.path}: not modified on the server, restored from the download cache ({self.size} bytes), sha256={self.sha256}"
+        return (
+            f"{self.path}: {self.size / (1024 * 1024):.2f} MB in {self.seconds:.1f}s "
+            f"({self.throughput_mbps:.2f} MB/s, {self.segments} segment(s), resumed {self.resumed_bytes} bytes), "
+            f"sha256={self.sha256}"
+        )
+
+def _probe(url: str, session: requests.Session, entry: Optional[Dict] = None) -> Dict:
+    """
+    Asks the server about `url` with a (conditional, if `entry` is given) HEAD request, falling back to a
+    one-byte ranged GET when HEAD is rejected (the same probe as `inspect_url`).
+
+    Returns:
+        A dict with url_final, size (or None), ranges, etag, last_modified and not_modified.
+    """
+    headers = {"Accept-Encoding": "identity", **download_manifest.conditional_headers(entry)}
+    info = {"url_final": url, "size": None, "ranges": False, "etag": None, "last_modified": None, "not_modified": False}
+    try:
+        response = probe_url(url, headers, session=session, timeout=TIMEOUT)
+        if response.status_code == 304:
+            info["not_modified"] = True
+            return info
+        if response.status_code < 400:
+            info.update(
+                url_final=response.url,
+                size=total_size(response),
+                ranges=response.status_code == 206 or response.headers.get("accept-ranges", "").lower() == "bytes",
+                etag=response.headers.get("etag"),
+                last_modified=response.headers.get("last-modified"),
+            )
+            info["not_modified"] = download_manifest.is_unchanged(entry, info["etag"], info["last_modified"])
+    except requests.RequestException as e:
+        log(f"   HEAD failed ({e}); downloading without size information")
+    return info
+
+def _stream_into(response: requests.Response, f, budget: Optional[int] = None) -> int:
+    """
+    Copies a response body into `f` with adaptive chunk sizes: the chunk doubles while reads are fast
+    (< 0.1s) and halves when they are slow (> 1s), between MIN_CHUNK_BYTES and MAX_CHUNK_BYTES.
+    """
+    chunk = MIN_CHUNK_BYTES
+    written = 0
+    while budget is None or written < budget:
+        size = chunk if budget is None else min(chunk, budget - written)
+        started = time.monotonic()
+        data = response.raw.read(size)
+        if not data:
+            break
+        f.write(data)
+        written += len(data)
+        elapsed = time.monotonic() - started
+        if elapsed < 0.1:
+            chunk = min(chunk * 2, MAX_CHUNK_BYTES)
+        elif elapsed > 1.0:
+            chunk = max(chunk // 2, MIN_CHUNK_BYTES)
+    return written
+
+def _if_range(info: Dict) -> Optional[str]:
+    """If-Range validator for resumed requests: a strong ETag, else Last-Modified (None if the server sent neither)."""
+    etag = info.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return info.get("last_modified")
+
+def _meta_path(part_path: str) -> str:
+    return f"{part_path}.meta"
+
+def _discard_parts(part_path: str):
+    for leftover in [part_path, _meta_path(part_path), *glob.glob(glob.escape(part_path) + "[0-9]*")]:
+        if os.path.exists(leftover):
+            os.remove(leftover)
+
+def _prepare_parts(url: str, part_path: str, info: Dict):
+    """
+    Keeps the part files of an interrupted download only if they belong to the same remote file: the
+    validators (ETag, Last-Modified, size) saved next to them must match the ones the server sends now.
+    Then records the current validators for the next resume.
+    """
+    validators = {"url": url, "etag": info["etag"], "last_modified": info["last_modified"], "size": info["size"]}
+    leftovers = os.path.exists(part_path) or glob.glob(glob.escape(part_path) + "[0-9]*")
+    if leftovers:
+        try:
+            with open(_meta_path(part_path), "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            saved = None
+        if saved != validators or not (info["etag"] or info["last_modified"]):
+            log(f"   Discarding partial download of {os.path.basename(part_path)}: the remote file changed or cannot be validated")
+            _discard_parts(part_path)
+    with open(_meta_path(part_path), "w", encoding="utf-8") as f:
+        json.dump(validators, f)
+
+def _fetch_range(url: str, part_path: str, start: int, end: Optional[int], session: requests.Session,
+                 if_range: Optional[str] = None) -> int:
+    """
+    Downloads bytes [start, end] of `url` into `part_path` (`end=None` means until EOF), resuming from
+    whatever the part file already holds. Retries up to DOWNLOAD_ATTEMPTS times, each attempt resuming
+    where the previous one stopped. Resumed requests carry `If-Range`, so a server whose file changed answers
+    200 with the new content: a part starting at byte 0 is then restarted from scratch, any other segment
+    raises RemoteChanged.
+
+    Returns:
+        The number of bytes reused from a previous (interrupted) run.
+    """
+    resumed = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    expected = None if end is None else end - start + 1
+    last_error = None
+
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+        have = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if expected is not None and have >= expected:
+            return resumed
+        headers = {"Accept-Encoding": "identity"}
+        if start + have > 0 or end is not None:
+            headers["Range"] = f"bytes={start + have}-{'' if end is None else end}"
+            if if_range:
+                headers["If-Range"] = if_range
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=TIMEOUT) as r:
+                if r.status_code == 416 and expected is None and have:
+                    return resumed
+                r.raise_for_status()
+                if r.status_code == 206:
+                    mode, have_kept = "ab", have
+                elif start == 0:
+                    if have:
+                        log(f"   Server ignored the Range header; restarting {os.path.basename(part_path)}")
+                    mode, have_kept, resumed = "wb", 0, 0
+                else:
+                    raise RemoteChanged(f"Server sent the whole file for the segment starting at byte {start}")
+                with open(part_path, mode) as f:
+                    _stream_into(r, f, None if expected is None else expected - have_kept)
+            if expected is None or os.path.getsize(part_path) >= expected:
+                return resumed
+            last_error = DownloadError(f"connection closed at {os.path.getsize(part_path)}/{expected} bytes")
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            last_error = e
+        log(f"   Attempt {attempt}/{DOWNLOAD_ATTEMPTS} interrupted ({last_error}); resuming")
+        time.sleep(min(2 ** attempt, 30) * 0.25)
+    raise DownloadError(f"Download of {url} failed after {DOWNLOAD_ATTEMPTS} attempts: {last_error}")
+
+def _segment_bounds(size: int, segments: int) -> List[Tuple[int, int]]:
+    step = -(-size // segments)
+    return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+def _fetch_parts(url: str, part_path: str, size: Optional[int], ranges: bool, segments: int,
+                 if_range: Optional[str], session: requests.Session) -> Tuple[int, int]:
+    """
+    Fetches `url` into `part_path`, as parallel segments when possible.
+
+    Returns:
+        (bytes reused from a previous run, number of segments used).
+    """
+    if not (ranges and size and segments > 1 and size >= PARALLEL_MIN_BYTES):
+        return _fetch_range(url, part_path, 0, size - 1 if size else None, session, if_range), 1
+
+    bounds = _segment_bounds(size, segments)
+    part_paths = [f"{part_path}{i}" for i in range(len(bounds))]
+    with ThreadPoolExecutor(max_workers=len(bounds)) as pool:
+        resumed = sum(pool.map(
+            lambda args: _fetch_range(url, args[0], args[1][0], args[1][1], session, if_range),
+            zip(part_paths, bounds),
+        ))
+    with open(part_path, "wb") as out:
+        for segment_path in part_paths:
+            with open(segment_path, "rb") as f:
+                shutil.copyfileobj(f, out, MAX_CHUNK_BYTES)
+    for segment_path in part_paths:
+        os.remove(segment_path)
+    return resumed, len(bounds)
+
+def download(url: str, path: str, expected_sha256: Optional[str] = None, expected_size: Optional[int] = None,
+             segments: int = DOWNLOAD_SEGMENTS, session: Optional[requests.Session] = None,
+             use_cache: bool = True) -> DownloadResult:
+    """
+    Downloads `url` to `path` through the pooled session.
+
+    - Data goes to `path + '.part'`; an interrupted download (in this call or a previous run) resumes from it
+      with an HTTP Range + If-Range request. The server's validators are saved in `path + '.part.meta'`, and
+      leftover parts are discarded when they no longer match the remote file.
+    - Files of at least PARALLEL_MIN_BYTES from servers advertising `Accept-Ranges: bytes` are fetched as
+      `segments` parallel ranged requests (`.part0`, `.part1`, ...), each resumable on its own.
+    - The final size is checked against Content-Length (or `expected_size`) and the SHA-256 against
+      `expected_sha256` before the file is moved into place.
+    - With `use_cache`, the request is conditional (If-None-Match / If-Modified-Since from the download
+      manifest); if the server answers 304 (or the same validators), the cached copy is restored instead.
+
+    Raises:
+        DownloadError: If the transfer fails or the verification does not match.
+    """
+    session = session or get_session()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    started = time.monotonic()
+    entry = download_manifest.get_entry(url) if use_cache else None
+    if entry and expected_sha256 and entry["sha256"].lower() != expected_sha256.lower():
+        entry = None
+    info = _probe(url, session, entry)
+
+    if entry and info["not_modified"]:
+        download_manifest.restore(entry, path)
+        result = DownloadResult(
+            path=path,
+            url_final=info["url_final"],
+            size=entry["size"],
+            sha256=entry["sha256"],
+            seconds=time.monotonic() - started,
+            segments=0,
+            resumed_bytes=0,
+            not_modified=True,
+        )
+        log(f"   {result.summary()}")
+        return result
+
+    part_path = f"{path}.part"
+    for attempt in (1, 2):
+        url_final, size, ranges = info["url_final"], info["size"], info["ranges"]
+        _prepare_parts(url, part_path, info)
+        try:
+            resumed, used_segments = _fetch_parts(url_final, part_path, size, ranges, segments, _if_range(info), session)
+            break
+        except RemoteChanged:
+            if attempt == 2:
+                raise
+            log("   The remote file changed during the download; starting over")
+            _discard_parts(part_path)
+            info = _probe(url, session)
+
+    expected_size = expected_size or size
+    actual_size = os.path.getsize(part_path)
+    if expected_size is not None and actual_size != expected_size:
+        _discard_parts(part_path)
+        raise DownloadError(f"Size mismatch for {url}: got {actual_size} bytes, expected {expected_size}")
+    digest = file_sha256(part_path)
+    if expected_sha256 and digest.lower() != expected_sha256.lower():
+        _discard_parts(part_path)
+        raise DownloadError(f"SHA-256 mismatch for {url}: got {digest}, expected {expected_sha256}")
+    os.replace(part_path, path)
+    os.remove(_meta_path(part_path))
+    if use_cache:
+        download_manifest.record(url, path, digest, info["etag"], info["last_modified"])
+
+    result = DownloadResult(
+        path=path,
+        url_final=url_final,
+        size=actual_size,
+        sha256=digest,
+        seconds=time.monotonic() - started,
+        segments=used_segments,
+        resumed_bytes=resumed,
+    )
+    log(f"   {result.summary()}")
+    return result
@@ -1,9 +1,13 @@
+import glob
+import hashlib
 import os
 import json
-import zipfile
 from typing import List, Any
 from agents import function_tool
 from tools.shared import log
+from tools.utils.cache import cache_path
+from tools.utils import archive
+from tools.formats.table_store import discard_tables
 
 import shutil
 
@@ -20,28 +24,15 @@ def clear_directories(directory_paths: List[str]) -> str:
     """
     log(f"🧹 Clearing directories: {directory_paths}")
     results = []
-    try:
-        for directory_path in directory_paths:
-            if not os.path.exists(directory_path):
-                os.makedirs(directory_path, exist_ok=True)
-                results.append(f"{directory_path}: Created (was missing)")
-                continue
-                
-            for filename in os.listdir(directory_path):
-                file_path = os.path.join(directory_path, filename)
-                try:
-                    if os.path.isfile(file_path) or os.path.islink(file_path):
-                        os.unlink(file_path)
-                    elif os.path.isdir(file_path):
-                        shutil.rmtree(file_path)
-                except Exception as e:
-                    results.append(f"{directory_path}: Failed to delete {filename} ({e})")
-            
-            results.append(f"{directory_path}: Cleared")
-                
-        return f"Operation completed. Results: {', '.join(results)}"
-    except Exception as e:
-        return f"Error clearing directories: {str(e)}"
+    for directory_path in directory_paths:
+        existed = os.path.exists(directory_path)
+        try:
+            clear_directory_contents(directory_path)
+        except Exception as e:
+            results.append(f"{directory_path}: Failed to clear ({e})")
+            continue
+        results.append(f"{directory_path}: Cleared" if existed else f"{directory_path}: Created (was missing)")
+    return f"Operation completed. Results: {', '.join(results)}"
 
 @function_tool
 def list_files_recursive(directory_path: str) -> List[str]:
@@ -97,27 +88,40 @@ def read_json_file(file_path: str) -> Any:
     except Exception as e:
         return f"Error reading JSON file: {str(e)}"
 
-@function_tool
-def unzip_file(zip_path: str, extract_to: str) -> str:
+def materialize_member(path: str) -> str:
     """
-    Unzips a file to a specified directory.
-    
-    Args:
-        zip_path: The path to the zip file.
-        extract_to: The directory to extract the files to.
-        
-    Returns:
-        A message indicating success or failure.
+    Returns a real file path for `path`: plain paths are returned as is; a zip member ("archive.zip::member")
+    is extracted alone under data/cache/unzip/members/ and that path returned. The folder is outside the work
+    folders the `index` stage clears, so an unchanged member (same CRC/size, file untouched since) is not
+    written again. For readers that cannot open a zip member from memory, e.g. the PDF tools.
+
+    Raises:
+        RuntimeError: If the member cannot be extracted.
     """
-    log(f"📦 Unzipping {zip_path} to {extract_to}")
+    zip_path, member = archive.split_member_path(path)
+    if member is None:
+        return path
+    stem = os.path.splitext(os.path.basename(zip_path))[0]
+    digest = hashlib.sha1(os.path.abspath(zip_path).encode("utf-8")).hexdigest()[:12]
+    extract_to = os.path.dirname(cache_path("unzip", "members", f"{stem}-{digest}", ""))
     try:
-        if os.path.exists(extract_to) and os.listdir(extract_to):
-            log(f"Directory {extract_to} already exists and is not empty. Skipping unzip.")
-            return f"Directory {extract_to} already exists and is not empty. Skipping unzip."
-
-        os.makedirs(extract_to, exist_ok=True)
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_to)
-        return f"Successfully extracted {zip_path} to {extract_to}"
+        summary = archive.extract_members(zip_path, extract_to, [glob.escape(member)])
     except Exception as e:
-        return f"Error unzipping file: {str(e)}"
+        raise RuntimeError(f"Error extracting {path}: {e}") from e
+    if member not in summary["extracted"] + summary["up_to_date"]:
+        raise RuntimeError(f"Error extracting {path}: no such member")
+    return os.path.join(extract_to, member)
+
+def clear_directory_contents(directory_path: str):
+    """
+    Deletes everything inside a directory (creating it if missing). Resident tables under it are dropped
+    first, so a later flush (e.g. at exit) cannot write them back into the cleared folder.
+    """
+    discard_tables(folder=directory_path)
+    os.makedirs(directory_path, exist_ok=True)
+    for filename in os.listdir(directory_path):
+        file_path = os.path.join(directory_path, filename)
+        if os.path.isfile(file_path) or os.path.islink(file_path):
+            os.unlink(file_path)
+        elif os.path.isdir(file_path):
+            shutil.rmtree(file_path)
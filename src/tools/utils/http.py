@@ -1,41 +1,123 @@
+import os
+import threading
+import time
 import requests
 import mimetypes
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
 from urllib.parse import urlparse, unquote
 from tools.shared import log
 from tools.utils.parsing import parse_content_disposition
+from tools.utils import download_manifest, replay
 from agents import function_tool
 
-@function_tool
-def inspect_download_url(url: str) -> dict:
-    log(f"🔍 Inspeccionando URL de descarga → {url}")
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "3"))
+USER_AGENT = "Mozilla/5.0 (compatible; ProyectoML-202510/1.0)"
+INSPECT_CACHE_TTL = float(os.getenv("INSPECT_CACHE_TTL", "600"))
+INSPECT_WORKERS = int(os.getenv("INSPECT_WORKERS", "8"))
+
+_session = None
+_session_lock = threading.Lock()
+_inspect_cache = {}
+_inspect_lock = threading.Lock()
+
+def get_session() -> requests.Session:
+    """
+    Returns the process-wide requests Session: keep-alive connections pooled per host (HTTP_POOL_SIZE)
+    and automatic retries with backoff on connection errors and 429/5xx answers (HTTP_RETRIES).
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=HTTP_RETRIES,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["HEAD", "GET"],
+                raise_on_status=False,
+            )
+            adapter = replay.adapter_class()(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update({"User-Agent": USER_AGENT})
+            _session = session
+        return _session
+
+def probe_url(url: str, headers: dict, session: requests.Session = None, timeout=20) -> requests.Response:
+    """HEAD request; if the server rejects HEAD (e.g. 403/405), a GET for the first byte only (`Range: bytes=0-0`)."""
+    session = session or get_session()
+    response = session.head(url, allow_redirects=True, timeout=timeout, headers=headers)
+    if response.status_code < 400 or response.status_code in (404, 410):
+        return response
+    with session.get(url, allow_redirects=True, timeout=timeout, stream=True, headers={**headers, "Range": "bytes=0-0"}) as response:
+        return response
+
+def total_size(response: requests.Response):
+    content_range = response.headers.get("content-range", "")
+    if "/" in content_range and content_range.rsplit("/", 1)[-1].isdigit():
+        return int(content_range.rsplit("/", 1)[-1])
+    length = response.headers.get("content-length", "")
+    return int(length) if length.isdigit() and response.status_code == 200 else None
+
+def inspect_url(url: str) -> dict:
+    """
+    Inspects a download URL (final URL, content type, filename, extension, size, not_modified).
+    Answers are cached per URL for INSPECT_CACHE_TTL seconds; errors are not cached.
+    """
+    with _inspect_lock:
+        cached = _inspect_cache.get(url)
+        if cached is not None and time.monotonic() - cached[0] < INSPECT_CACHE_TTL:
+            return dict(cached[1])
 
     try:
-        head = requests.head(url, allow_redirects=True, timeout=20)
-        final_url = head.url
-        content_type = head.headers.get("content-type", "").lower()
-        content_disp = head.headers.get("content-disposition", "")
-
-        filename = ""
-        if content_disp:
-            _, params = parse_content_disposition(content_disp)
-            filename = params.get("filename") or params.get("filename*") or ""
-
-        if not filename:
-            parsed = urlparse(final_url)
-            filename = unquote(parsed.path.split("/")[-1])
-
-        ext = ""
-        if "." in filename:
-            ext = filename.split(".")[-1].lower()
-        elif content_type:
-            ext = (mimetypes.guess_extension(content_type) or "").lstrip(".")
+        entry = download_manifest.get_entry(url)
+        head = probe_url(url, download_manifest.conditional_headers(entry))
+        head.raise_for_status()
+        not_modified = bool(entry) and (
+            head.status_code == 304
+            or download_manifest.is_unchanged(entry, head.headers.get("etag"), head.headers.get("last-modified"))
+        )
+        if not_modified:
+            result = {
+                "url_final": head.url,
+                "content_type": "",
+                "filename": entry["filename"],
+                "extension": entry["filename"].rsplit(".", 1)[-1].lower() if "." in entry["filename"] else "",
+                "size": entry["size"],
+                "not_modified": True,
+                "note": "Sin cambios desde la última descarga; download_file restaurará la copia local sin volver a descargarla.",
+            }
+        else:
+            final_url = head.url
+            content_type = head.headers.get("content-type", "").lower()
+            content_disp = head.headers.get("content-disposition", "")
 
-        return {
-            "url_final": final_url,
-            "content_type": content_type,
-            "filename": filename,
-            "extension": ext,
-        }
+            filename = ""
+            if content_disp:
+                _, params = parse_content_disposition(content_disp)
+                filename = params.get("filename") or params.get("filename*") or ""
+
+            if not filename:
+                parsed = urlparse(final_url)
+                filename = unquote(parsed.path.split("/")[-1])
+
+            ext = ""
+            if "." in filename:
+                ext = filename.split(".")[-1].lower()
+            elif content_type:
+                ext = (mimetypes.guess_extension(content_type) or "").lstrip(".")
+
+            result = {
+                "url_final": final_url,
+                "content_type": content_type,
+                "filename": filename,
+                "extension": ext,
+                "size": total_size(head),
+                "not_modified": False,
+            }
 
     except Exception as e:
         return {
@@ -44,4 +126,29 @@ def inspect_download_url(url: str) -> dict:
             "filename": "",
             "extension": "",
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+    with _inspect_lock:
+        _inspect_cache[url] = (time.monotonic(), result)
+    return dict(result)
+
+@function_tool
+def inspect_download_url(url: str) -> dict:
+    log(f"🔍 Inspeccionando URL de descarga → {url}")
+    return inspect_url(url)
+
+@function_tool
+def inspect_download_urls(urls: List[str]) -> List[dict]:
+    """
+    Inspecciona varias URLs de descarga a la vez (en paralelo, reutilizando conexiones) y devuelve, en el
+    mismo orden, lo mismo que `inspect_download_url` para cada una, más el campo `url` consultado.
+
+    Args:
+        urls: Lista de URLs candidatas (ej: todos los enlaces de descarga de una página).
+    """
+    log(f"🔍 Inspeccionando {len(urls)} URLs de descarga")
+    if not urls:
+        return []
+    with ThreadPoolExecutor(max_workers=min(INSPECT_WORKERS, len(urls))) as pool:
+        results = list(pool.map(inspect_url, urls))
+    return [{"url": url, **result} for url, result in zip(urls, results)]
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import xml.etree.ElementTree as ET
+import zipfile
+from datetime import datetime
+from typing import Dict, List, Optional
+import pypdfium2
+from agents import function_tool
+from tools.shared import log
+from tools.utils import archive
+from tools.utils.cache import cache_path, file_sha256, atomic_write_bytes
+
+MANIFEST_FOLDERS = ["data/raw", "data/preprocessed"]
+DOWNLOAD_SUMMARY = "data/raw/download_summary.json"
+WORKBOOK_EXTENSIONS = (".xlsx", ".xlsm")
+# Bumped when the entry format changes, so older manifests are rebuilt instead of reused.
+MANIFEST_VERSION = 1
+
+_lock = threading.Lock()
+
+def _manifest_path() -> str:
+    return cache_path("manifest", "manifest.json")
+
+def sniff_type(head: bytes, name: str) -> str:
+    """File type from the first bytes (magic numbers), falling back to the extension for text formats."""
+    extension = os.path.splitext(name)[1].lower().lstrip(".")
+    if head.startswith(b"%PDF"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04") or head.startswith(b"PK\x05\x06"):
+        return extension if extension in ("xlsx", "xlsm", "docx") else "zip"
+    if head.startswith(b"\xd0\xcf\x11\xe0"):
+        return "xls" if extension == "xls" else "ole"
+    text = head.lstrip(b"\xef\xbb\xbf").lstrip()
+    if text.startswith((b"{", b"[")):
+        return "json"
+    if text[:15].lower().startswith((b"<!doctype html", b"<html")):
+        return "html"
+    return extension or "unknown"
+
+def workbook_sheet_names(source) -> List[str]:
+    """Sheet names of an .xlsx/.xlsm (path or file object), read from xl/workbook.xml without loading any sheet."""
+    with zipfile.ZipFile(source) as zf:
+        root = ET.fromstring(zf.read("xl/workbook.xml"))
+    return [el.get("name") for el in root.iter() if el.tag.rsplit("}", 1)[-1] == "sheet"]
+
+def pdf_page_count(file_path: str) -> int:
+    document = pypdfium2.PdfDocument(file_path)
+    try:
+        return len(document)
+    finally:
+        document.close()
+
+def _describe(file_path: str) -> Dict:
+    """Builds the manifest entry of one file: size, mtime, sha256, sniffed type and type-specific details."""
+    stat = os.stat(file_path)
+    with open(file_path, "rb") as f:
+        head = f.read(64)
+    entry = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(timespec="seconds"),
+        "sha256": file_sha256(file_path),
+        "type": sniff_type(head, file_path),
+    }
+    try:
+        if entry["type"] in ("xlsx", "xlsm"):
+            entry["sheets"] = workbook_sheet_names(file_path)
+        elif entry["type"] == "pdf":
+            entry["pages"] = pdf_page_count(file_path)
+        elif entry["type"] == "zip":
+            members = archive.list_members(file_path)
+            for member in members:
+                if member["name"].lower().endswith(WORKBOOK_EXTENSIONS):
+                    try:
+                        member["sheets"] = workbook_sheet_names(archive.open_member(member["path"]))
+                    except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
+                        member["error"] = str(e)
+            entry["members"] = members
+    except Exception as e:
+        entry["error"] = f"{type(e).__name__}: {e}"
+    return entry
+
+def _load() -> Dict:
+    path = _manifest_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    return manifest if manifest.get("version") == MANIFEST_VERSION else {}
+
+def _download_descriptions() -> Dict[str, str]:
+    if not os.path.exists(DOWNLOAD_SUMMARY):
+        return {}
+    try:
+        with open(DOWNLOAD_SUMMARY, "r", encoding="utf-8") as f:
+            return {item["filename"]: item.get("description", "") for item in json.load(f)}
+    except (OSError, json.JSONDecodeError, KeyError, TypeError):
+        return {}
+
+def build_manifest(folders: Optional[List[str]] = None) -> Dict[str, Dict]:
+    """
+    Indexes every file under `folders` (default: data/raw and data/preprocessed), keyed by normalized path
+    (so "./data/raw" and "data/raw/" share entries).
+    The index is kept in data/cache/manifest/manifest.json: files whose size and mtime did not change
+    reuse their previous entry, so only new or modified files are hashed and inspected.
+    Descriptions from download_summary.json are attached to the files they name.
+    """
+    folders = [os.path.normpath(folder) for folder in folders or MANIFEST_FOLDERS]
+    with _lock:
+        previous = _load().get("files", {})
+        descriptions = _download_descriptions()
+        files, refreshed = {}, 0
+        for folder in folders:
+            for root, _, names in os.walk(folder):
+                for name in sorted(names):
+                    file_path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(file_path)
+                        entry = previous.get(file_path)
+                        if entry is None or (entry["size"], entry["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+                            entry = _describe(file_path)
+                            refreshed += 1
+                    except FileNotFoundError:
+                        # Deleted since os.walk listed it (e.g. a .part renamed by a finishing download).
+                        continue
+                    entry.pop("description", None)
+                    if name in descriptions:
+                        entry["description"] = descriptions[name]
+                    files[file_path] = entry
+
+        # Entries of other folders stay in the index; files deleted from the scanned folders are dropped.
+        scanned = tuple(os.path.join(folder, "") for folder in folders)
+        kept = {path: entry for path, entry in previous.items() if not path.startswith(scanned)}
+        manifest = {"version": MANIFEST_VERSION, "files": {**kept, **files}}
+        atomic_write_bytes(_manifest_path(), json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    log(f"🗂️ Manifest: {len(files)} archivos, {refreshed} actualizados")
+    return files
+
+@function_tool
+def get_manifest(folders: List[str] = None) -> Dict[str, Dict]:
+    """
+    Devuelve en UNA sola llamada el índice de todos los archivos de `data/raw/` y `data/preprocessed/`
+    (o de las carpetas indicadas): tamaño, fecha, SHA-256, tipo real detectado por contenido, la
+    descripción de `download_summary.json` si existe, y además:
+      - Excel (.xlsx/.xlsm): nombres de las hojas (`sheets`).
+      - PDF: número de páginas (`pages`).
+      - ZIP: lista de archivos internos (`members`) con tamaño, CRC, `path` utilizable directamente
+        ("archivo.zip::miembro") y las hojas de los Excel que contiene.
+    Solo se vuelven a inspeccionar los archivos que cambiaron desde la última llamada.
+
+    Args:
+        folders: (Opcional) Carpetas a indexar. Lista vacía = ["data/raw", "data/preprocessed"].
+    """
+    return build_manifest(folders)
@@ -27,3 +27,30 @@ def normalize_feature_name(name: str) -> str:
     name = name.strip('_')
     
     return name
+
+_ENTITY_STOP_PHRASES = [
+    "COOPERATIVA DE AHORRO Y CREDITO",
+    "COOPERATIVA DE AHORRO CREDITO",
+    "DE AHORRO Y CREDITO",
+    "COOPERATIVA",
+    "LIMITADA",
+    "LTDA",
+    "COAC",
+    "CAC",
+    "CIA",
+]
+_ENTITY_STOP_PATTERN = re.compile(r'\b(?:' + '|'.join(re.escape(p) for p in _ENTITY_STOP_PHRASES) + r')\b')
+# PDF text layers sometimes drop the spaces of the legal prefix ("COOPERATIVADEAHORROYCREDITOJARDIN").
+_GLUED_PREFIX_PATTERN = re.compile(r'\bCOOPERATIVA\s*DE\s*AHORRO\s*Y?\s*CREDITO')
+
+def normalize_entity_name(name: str) -> str:
+    if not name:
+        return ""
+    name = unicodedata.normalize('NFKD', str(name)).encode('ASCII', 'ignore').decode('ASCII')
+    name = name.upper()
+    name = re.sub(r'[^A-Z0-9]+', ' ', name)
+    name = _GLUED_PREFIX_PATTERN.sub(' ', name)
+    name = _ENTITY_STOP_PATTERN.sub(' ', name)
+    name = re.sub(r'\s+', ' ', name).strip()
+
+    return name
@@ -0,0 +1,153 @@
+import hashlib
+import io
+import json
+import os
+import re
+from typing import Dict, Optional
+import httpx
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from tools.utils.cache import cache_path, atomic_write_bytes
+
+# off: normal network access. record: hit the network and store every response. replay: serve stored responses only.
+REPLAY_MODE = os.getenv("HTTP_REPLAY_MODE", "off").lower()
+REPLAY_MODES = ("off", "record", "replay")
+if REPLAY_MODE not in REPLAY_MODES:
+    raise ValueError(f"HTTP_REPLAY_MODE must be one of {REPLAY_MODES}, got '{REPLAY_MODE}'")
+
+# The stored body is already decoded, so these no longer describe it.
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+def _body_headers(method: str, headers: Dict[str, str], body: bytes) -> Dict[str, str]:
+    """Headers describing the stored (decoded) body; HEAD answers keep the Content-Length of the resource."""
+    if method.upper() == "HEAD":
+        return {k: v for k, v in headers.items() if k.lower() not in _DROPPED_HEADERS - {"content-length"}}
+    kept = {k: v for k, v in headers.items() if k.lower() not in _DROPPED_HEADERS}
+    kept["Content-Length"] = str(len(body))
+    return kept
+
+class ReplayMiss(requests.ConnectionError):
+    """Raised in replay mode when no response was recorded for a request."""
+
+def _key(method: str, url: str, range_header: Optional[str]) -> str:
+    text = f"{method.upper()} {url}" + (f" [{range_header}]" if range_header else "")
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _paths(key: str):
+    return cache_path("replay", "http", key[:2], f"{key}.json"), cache_path("replay", "http", key[:2], f"{key}.body")
+
+def save_response(method: str, url: str, range_header: Optional[str], status: int, headers: Dict[str, str], body: bytes):
+    """Stores a response under its (method, URL, Range) key."""
+    meta_path, body_path = _paths(_key(method, url, range_header))
+    atomic_write_bytes(body_path, body)
+    meta = {
+        "method": method.upper(),
+        "url": url,
+        "range": range_header,
+        "status": status,
+        "headers": _body_headers(method, headers, body),
+    }
+    atomic_write_bytes(meta_path, json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8"))
+
+def load_response(method: str, url: str, range_header: Optional[str]):
+    """Returns (status, headers, body) of a recorded response, or None."""
+    meta_path, body_path = _paths(_key(method, url, range_header))
+    if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(body_path, "rb") as f:
+        body = f.read()
+    return meta["status"], meta["headers"], body
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    requests transport adapter that records responses to, or replays them from, the replay store (HTTP_REPLAY_MODE).
+    In record mode the whole body is read before it is returned, so streamed downloads are buffered in memory.
+    """
+
+    def send(self, request, **kwargs):
+        range_header = request.headers.get("Range")
+        if REPLAY_MODE == "replay":
+            stored = load_response(request.method, request.url, range_header)
+            if stored is None:
+                raise ReplayMiss(f"No recorded response for {request.method} {request.url}", request=request)
+            return self._build(request, *stored)
+
+        response = super().send(request, **kwargs)
+        if REPLAY_MODE != "record":
+            return response
+        body = response.content
+        save_response(request.method, request.url, range_header, response.status_code, dict(response.headers), body)
+        headers = _body_headers(request.method, dict(response.headers), body)
+        return self._build(request, response.status_code, headers, body, response)
+
+    def _build(self, request, status, headers, body, original=None):
+        raw = urllib3.HTTPResponse(
+            body=io.BytesIO(body),
+            headers=headers,
+            status=status,
+            request_method=request.method,
+            preload_content=False,
+            decode_content=False,
+        )
+        response = self.build_response(request, raw)
+        if original is not None:
+            response.history = original.history
+        return response
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """httpx async transport that records responses to, or replays them from, the replay store (HTTP_REPLAY_MODE)."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        range_header = request.headers.get("Range")
+        if REPLAY_MODE == "replay":
+            stored = load_response(request.method, url, range_header)
+            if stored is None:
+                raise httpx.ConnectError(f"No recorded response for {request.method} {url}", request=request)
+            status, headers, body = stored
+            return httpx.Response(status, headers=headers, content=body, request=request)
+
+        response = await self._transport.handle_async_request(request)
+        if REPLAY_MODE != "record":
+            return response
+        body = await response.aread()
+        await response.aclose()
+        save_response(request.method, url, range_header, response.status_code, dict(response.headers), body)
+        headers = _body_headers(request.method, dict(response.headers), body)
+        return httpx.Response(response.status_code, headers=headers, content=body, request=request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+def adapter_class():
+    """The requests adapter class to mount on sessions: HTTPAdapter, or ReplayAdapter when record/replay is on."""
+    return HTTPAdapter if REPLAY_MODE == "off" else ReplayAdapter
+
+def async_transport(**kwargs) -> httpx.AsyncBaseTransport:
+    """An httpx AsyncHTTPTransport built with `kwargs`, wrapped in a ReplayTransport when record/replay is on."""
+    transport = httpx.AsyncHTTPTransport(**kwargs)
+    return transport if REPLAY_MODE == "off" else ReplayTransport(transport)
+
+def _har_path(page_id: str) -> str:
+    return cache_path("replay", "browser", f"{re.sub(r'[^A-Za-z0-9_-]+', '_', page_id)}.har.zip")
+
+async def attach_to_context(context, page_id: str):
+    """
+    Routes a Playwright browser context through a HAR archive per page id: in record mode every response is
+    written to it when the context closes; in replay mode requests are served from it and unknown ones are aborted.
+    """
+    if REPLAY_MODE == "off":
+        return
+    har_path = _har_path(page_id)
+    if REPLAY_MODE == "record":
+        await context.route_from_har(har_path, update=True, update_content="attach", update_mode="full")
+    elif os.path.exists(har_path):
+        await context.route_from_har(har_path, not_found="abort")
+    else:
+        raise FileNotFoundError(f"No recorded browser session for page '{page_id}' ({har_path}); run with HTTP_REPLAY_MODE=record first.")
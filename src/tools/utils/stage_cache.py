@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from tools.shared import log
+from tools.utils.cache import cache_path, file_sha256, atomic_write_bytes
+from tools.utils.archive import split_member_path
+
+STAGE_CACHE_ENABLED = os.getenv("STAGE_CACHE", "1") == "1"
+ERROR_PREFIXES = ("Error", "❌")
+
+def _expand_files(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names)
+        elif os.path.exists(path):
+            files.append(path)
+    return sorted(files)
+
+def stage_key(stage: str, inputs: List[str], params: Optional[Dict] = None) -> str:
+    """
+    Computes the cache key of a stage run: SHA-256 over the stage name, its parameters and the
+    content hash of every input file (folders are expanded recursively).
+
+    Args:
+        stage: The stage name (e.g., 'pdf_extraction').
+        inputs: Input files or folders. Missing paths are part of the key as missing.
+        params: Parameters that change the output (segment, output name, ...).
+    """
+    sha = hashlib.sha256()
+    sha.update(stage.encode("utf-8"))
+    sha.update(json.dumps(params or {}, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    for path in inputs:
+        sha.update(b"\0" + os.path.normpath(path).encode("utf-8"))
+        zip_path, member = split_member_path(path)
+        if member is not None:
+            # A zip member ("archive.zip::member") changes whenever its archive does.
+            path = zip_path
+        if not os.path.exists(path):
+            sha.update(b"<missing>")
+        for file in _expand_files([path]):
+            sha.update(os.path.relpath(file, path).encode("utf-8") + file_sha256(file).encode("ascii"))
+    return sha.hexdigest()
+
+def _manifest_path(stage: str, key: str) -> str:
+    return cache_path("stages", stage, f"{key}.json")
+
+def _blob_path(digest: str) -> str:
+    return cache_path("stages", "blobs", digest[:2], digest)
+
+def restore_stage(stage: str, key: str) -> Optional[str]:
+    """
+    Restores the outputs recorded for (stage, key) to their original paths.
+
+    Returns:
+        The stage's recorded result message, or None on a cache miss (or if a blob is missing).
+    """
+    path = _manifest_path(stage, key)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if not all(os.path.exists(_blob_path(d)) for d in manifest["files"].values()):
+        return None
+
+    for output, digest in manifest["files"].items():
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        tmp_path = f"{output}.restore-tmp"
+        shutil.copyfile(_blob_path(digest), tmp_path)
+        os.replace(tmp_path, output)
+    return manifest["result"]
+
+def save_stage(stage: str, key: str, outputs: List[str], result: str):
+    """
+    Stores the output files of a stage run as content-addressed blobs and records them under (stage, key).
+    """
+    files = {}
+    for output in _expand_files(outputs):
+        digest = file_sha256(output)
+        blob = _blob_path(digest)
+        if not os.path.exists(blob):
+            shutil.copyfile(output, f"{blob}.tmp")
+            os.replace(f"{blob}.tmp", blob)
+        files[output] = digest
+    manifest = {"stage": stage, "result": result, "files": files}
+    atomic_write_bytes(_manifest_path(stage, key), json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+def _lookup(stage: str, inputs: List[str], params: Optional[Dict]) -> Tuple[str, Optional[str]]:
+    key = stage_key(stage, inputs, params)
+    result = restore_stage(stage, key)
+    if result is not None:
+        log(f"♻️ Stage '{stage}' restored from cache ({key[:12]})")
+    return key, result
+
+def _store(stage: str, key: str, outputs: List[str], result: str):
+    if str(result).startswith(ERROR_PREFIXES):
+        return
+    if not _expand_files(outputs):
+        log(f"⚠️ Stage '{stage}' produced no outputs; not caching it")
+        return
+    save_stage(stage, key, outputs, result)
+
+def run_cached_stage(stage: str, inputs: List[str], params: Optional[Dict], outputs: List[str], run: Callable[[], str]) -> str:
+    """
+    Runs `run()` unless an identical stage run (same inputs and params) is cached, in which case its outputs
+    are restored instead. Only successful runs (no error message) that leave at least one output file are cached.
+
+    Args:
+        stage: The stage name.
+        inputs: Input files or folders the stage reads.
+        params: Parameters that change the output.
+        outputs: Output files or folders the stage writes.
+        run: Callable that executes the stage and returns its result message.
+    """
+    if not STAGE_CACHE_ENABLED:
+        return run()
+    key, result = _lookup(stage, inputs, params)
+    if result is not None:
+        return result
+    result = run()
+    _store(stage, key, outputs, result)
+    return result
+
+async def run_cached_stage_async(stage: str, inputs: List[str], params: Optional[Dict], outputs: List[str], run: Callable[[], Awaitable[str]]) -> str:
+    """Async variant of `run_cached_stage` for stages that run agents."""
+    if not STAGE_CACHE_ENABLED:
+        return await run()
+    key, result = _lookup(stage, inputs, params)
+    if result is not None:
+        return result
+    result = await run()
+    _store(stage, key, outputs, result)
+    return result
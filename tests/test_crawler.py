@@ -0,0 +1,94 @@
+import asyncio
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+import httpx
+from tools.internet import crawler
+
+class _GuardedStream(httpx.AsyncByteStream):
+    """A response body that records whether anyone read it."""
+
+    def __init__(self, site, content: bytes):
+        self.site = site
+        self.content = content
+
+    async def __aiter__(self):
+        self.site.bodies_read.append(self.content)
+        yield self.content
+
+class _Site:
+    """In-memory site served through httpx.MockTransport: path -> (status, content type, body)."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+        self.bodies_read = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request.url.path)
+        if request.url.host != "example.org":
+            return httpx.Response(500)
+        status, content_type, body = self.pages.get(request.url.path, (404, "text/html", b"not found"))
+        return httpx.Response(status, headers={"content-type": content_type}, stream=_GuardedStream(self, body))
+
+def _html(*links: str) -> bytes:
+    return ("<html><body>" + "".join(f'<a href="{href}">{text}</a>' for href, text in links) + "</body></html>").encode()
+
+class CrawlerTest(unittest.TestCase):
+    def setUp(self):
+        self.site = _Site({
+            "/": (200, "text/html; charset=utf-8", _html(
+                ("/estadisticas", "Estadísticas"),
+                ("/otros", "Otros"),
+                ("/reporte.pdf", "Reporte"),
+                ("/descargar?id=7", "Descarga sin extensión"),
+                ("/roto", "Roto"),
+                ("https://other.org/externo", "Externo"),
+                ("#top", "Arriba"),
+            )),
+            "/estadisticas": (200, "text/html", _html(("/boletines/2024.zip", "Boletín 2024"), ("/estadisticas/detalle", "Detalle"))),
+            "/estadisticas/detalle": (200, "text/html", _html(("/detalle.xlsx", "Detalle"))),
+            "/otros": (200, "text/html", _html(("/otros.csv", "Otros"))),
+            "/descargar": (200, "application/zip", b"PK\x03\x04" + b"\0" * 1024),
+            "/roto": (500, "text/html", b"error"),
+        })
+
+    def _crawl(self, **kwargs):
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(self.site.handle)) as client:
+                return await crawler.crawl("https://example.org/", host_delay=0, client=client, **kwargs)
+        return asyncio.run(run())
+
+    def test_collects_file_links_without_fetching_them(self):
+        result = self._crawl(max_depth=2)
+        urls = {f["url"]: f for f in result["files"]}
+        self.assertEqual(set(urls), {
+            "https://example.org/reporte.pdf",
+            "https://example.org/boletines/2024.zip",
+            "https://example.org/detalle.xlsx",
+            "https://example.org/otros.csv",
+        })
+        self.assertEqual(urls["https://example.org/boletines/2024.zip"]["text"], "Boletín 2024")
+        self.assertEqual(urls["https://example.org/boletines/2024.zip"]["found_on"], "https://example.org/estadisticas")
+        self.assertNotIn("/reporte.pdf", self.site.requests)
+        self.assertNotIn("/externo", self.site.requests)
+        self.assertEqual(list(result["pages_failed"]), ["https://example.org/roto"])
+
+    def test_non_html_body_is_not_read(self):
+        self._crawl(max_depth=1)
+        self.assertIn("/descargar", self.site.requests)
+        self.assertNotIn(self.site.pages["/descargar"][2], self.site.bodies_read)
+
+    def test_depth_and_allow_patterns_limit_the_crawl(self):
+        result = self._crawl(max_depth=1, allow_patterns=["estadistic"])
+        self.assertEqual(sorted(self.site.requests), ["/", "/estadisticas"])
+        self.assertEqual(
+            sorted(f["url"] for f in result["files"]),
+            ["https://example.org/boletines/2024.zip", "https://example.org/reporte.pdf"],
+        )
+
+if __name__ == "__main__":
+    unittest.main()
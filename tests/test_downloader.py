@@ -0,0 +1,141 @@
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+os.environ.setdefault("PIPELINE_CACHE_DIR", tempfile.mkdtemp(prefix="downloader-cache-"))
+
+import requests
+from tools.utils import downloader
+
+class _FileHandler(BaseHTTPRequestHandler):
+    """Serves `server.content` with ETag, Range and If-Range support; can cut bodies short or ignore Range."""
+
+    def log_message(self, *args):
+        pass
+
+    def _etag(self):
+        return '"' + hashlib.sha1(self.server.content).hexdigest() + '"'
+
+    def _headers(self, status, start, end):
+        self.send_response(status)
+        self.send_header("ETag", self._etag())
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(self.server.content)}")
+        self.end_headers()
+
+    def do_HEAD(self):
+        self._headers(200, 0, len(self.server.content) - 1)
+
+    def do_GET(self):
+        content = self.server.content
+        start, end, status = 0, len(content) - 1, 200
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and not self.server.ignore_range and (if_range is None or if_range == self._etag()):
+            first, last = range_header.split("=", 1)[1].split("-")
+            start, end, status = int(first), int(last) if last else len(content) - 1, 206
+        self._headers(status, start, end)
+        body = content[start:end + 1]
+        if self.server.cut_after is not None:
+            body = body[:self.server.cut_after]
+        self.wfile.write(body)
+        self.wfile.flush()
+        if self.server.cut_after is not None:
+            self.connection.shutdown(2)
+
+class DownloaderTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _FileHandler)
+        self.server.content = os.urandom(256 * 1024)
+        self.server.ignore_range = False
+        self.server.cut_after = None
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/file.zip"
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, "file.zip")
+        self.session = requests.Session()
+        patches = [
+            mock.patch.object(downloader, "PARALLEL_MIN_BYTES", 64 * 1024),
+            mock.patch.object(downloader.time, "sleep"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.session.close()
+        self.folder.cleanup()
+
+    def _interrupted_download(self, segments):
+        """Runs a download that is cut after 10 KB per request, leaving part files behind."""
+        self.server.cut_after = 10 * 1024
+        with mock.patch.object(downloader, "DOWNLOAD_ATTEMPTS", 1):
+            with self.assertRaises(downloader.DownloadError):
+                downloader.download(self.url, self.path, segments=segments, session=self.session, use_cache=False)
+        self.server.cut_after = None
+
+    def _download(self, segments):
+        return downloader.download(self.url, self.path, segments=segments, session=self.session, use_cache=False)
+
+    def _assert_matches_server(self, result):
+        expected = hashlib.sha256(self.server.content).hexdigest()
+        self.assertEqual(result.sha256, expected)
+        with open(self.path, "rb") as f:
+            self.assertEqual(hashlib.sha256(f.read()).hexdigest(), expected)
+        self.assertEqual(sorted(os.listdir(self.folder.name)), ["file.zip"])
+
+    def test_resumes_interrupted_download(self):
+        for segments in (1, 4):
+            with self.subTest(segments=segments):
+                self._interrupted_download(segments)
+                result = self._download(segments)
+                self.assertGreater(result.resumed_bytes, 0)
+                self.assertEqual(result.segments, segments)
+                self._assert_matches_server(result)
+                os.remove(self.path)
+
+    def test_restarts_when_server_ignores_range(self):
+        self._interrupted_download(segments=1)
+        self.server.ignore_range = True
+        result = self._download(segments=1)
+        self.assertEqual(result.resumed_bytes, 0)
+        self._assert_matches_server(result)
+
+    def test_discards_parts_when_remote_changed_with_same_size(self):
+        for segments in (1, 4):
+            with self.subTest(segments=segments):
+                self.server.content = os.urandom(256 * 1024)
+                self._interrupted_download(segments)
+                self.server.content = os.urandom(len(self.server.content))
+                result = self._download(segments)
+                self.assertEqual(result.resumed_bytes, 0)
+                self._assert_matches_server(result)
+                os.remove(self.path)
+
+    def test_if_range_mismatch_restarts_instead_of_mixing_versions(self):
+        self._interrupted_download(segments=1)
+        real_probe = downloader._probe
+
+        def stale_probe(url, session, entry=None):
+            # The remote changes between the probe and the resumed GET, so only If-Range can catch it.
+            info = real_probe(url, session, entry)
+            self.server.content = os.urandom(len(self.server.content))
+            return info
+
+        with mock.patch.object(downloader, "_probe", side_effect=[stale_probe(self.url, self.session)]):
+            result = self._download(segments=1)
+        self.assertEqual(result.resumed_bytes, 0)
+        self._assert_matches_server(result)
+
+if __name__ == "__main__":
+    unittest.main()